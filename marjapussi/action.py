@@ -1,4 +1,5 @@
-from marjapussi.card import Card, Color
+from marjapussi.card import Card, Color, CARDS, COLORS
+from marjapussi.gamerules import DEFAULT_RULES
 
 
 class Talk:
@@ -7,10 +8,33 @@ class Talk:
     - possible question pronouns: my, yours, our (yours doesn't come with a color)
     - possible answer pronouns: my (i have a pair), nmy (no to your pair), no (to our), ou (yes to ours)
     - possible call pronouns: we (we have a pair together), nwe (we have no pair together)
+    Talks are interned like cards: Talk(pronoun, color) always returns the same shared instance of TALKS with a stable
+    id, so they can be hashed and compared by identity. Any other pronoun and color raise a ValueError.
     """
-    def __init__(self, pronoun: str, color: Color | None):
-        self.pronoun = pronoun
-        self.color = color
+    __slots__ = ("pronoun", "color", "id")
+
+    _by_key: dict = {}
+    _by_id: list = []
+
+    def __new__(cls, pronoun: str, color: Color | None):
+        try:
+            return cls._by_key[pronoun, color]
+        except KeyError:
+            raise ValueError(f"There is no talk {pronoun!r} with color {color!r}.") from None
+
+    @classmethod
+    def _intern(cls, pronoun: str, color: Color | None) -> "Talk":
+        talk = object.__new__(cls)
+        talk.pronoun = pronoun
+        talk.color = color
+        talk.id = len(cls._by_id)
+        cls._by_id.append(talk)
+        cls._by_key[pronoun, color] = talk
+        return talk
+
+    @classmethod
+    def from_id(cls, talk_id: int) -> "Talk":
+        return cls._by_id[talk_id]
 
     def __str__(self):
         if self.color is None:
@@ -19,7 +43,24 @@ class Talk:
             return f"{self.pronoun.capitalize()} {str(self.color)}"
 
     def __eq__(self, other):
-        return self.pronoun == other.pronoun and self.color == other.color
+        if isinstance(other, Talk):
+            return self.pronoun == other.pronoun and self.color == other.color
+        return NotImplemented
+
+    def __hash__(self):
+        return self.id
+
+    def __reduce__(self):
+        return Talk, (self.pronoun, self.color)
+
+
+# the phases of a game in the order they are played, questions and answers can occur before every trick but the first
+PHASES: tuple[str, ...] = ("PROV", "PASS", "PBCK", "PRMO", "QUES", "ANSW", "ANSA", "TRCK", "DONE")
+
+# all talks that can occur in a game, in the order of their ids
+TALKS: tuple[Talk, ...] = (Talk._intern("yours", None), Talk._intern("nmy", None),
+                           *(Talk._intern(pronoun, col) for pronoun in ("my", "our", "ou", "no", "we", "nwe")
+                             for col in COLORS))
 
 
 class Action:
@@ -35,11 +76,41 @@ class Action:
     ANSS - Answering if questioning player too has a half
     TRCK - Playing cards into the Trick
     DONE - After the game is done
+
+    Actions are interned: Action(player_number, phase, content) returns the shared instance of a fixed universe with
+    a stable id, which is built at import for the default rules. Actions outside of it (e.g. bids above the default
+    maximum) get a new instance with the id -1 every time, so arbitrary input can't grow the universe. The instances
+    are shared between engine, agents and backend and must not be changed.
     """
-    def __init__(self, player_number: int, phase: str, content: int | Card | Talk):
-        self.player_number = player_number
-        self.phase = phase
-        self.content = content
+    __slots__ = ("player_number", "phase", "content", "id")
+
+    _by_key: dict = {}
+    _by_id: list = []
+
+    def __new__(cls, player_number: int, phase: str, content: int | Card | Talk):
+        try:
+            return cls._by_key[player_number, phase, content]
+        except KeyError:
+            return cls._new(player_number, phase, content, -1)
+
+    @classmethod
+    def _new(cls, player_number: int, phase: str, content: int | Card | Talk, action_id: int) -> "Action":
+        action = object.__new__(cls)
+        action.player_number = player_number
+        action.phase = phase
+        action.content = content
+        action.id = action_id
+        return action
+
+    @classmethod
+    def _intern(cls, player_number: int, phase: str, content: int | Card | Talk) -> None:
+        action = cls._new(player_number, phase, content, len(cls._by_id))
+        cls._by_id.append(action)
+        cls._by_key[player_number, phase, content] = action
+
+    @classmethod
+    def from_id(cls, action_id: int) -> "Action":
+        return cls._by_id[action_id]
 
     def __repr__(self):
         return f"Action(player_number={self.player_number}, phase='{self.phase}', content='{self.content}')"
@@ -48,4 +119,36 @@ class Action:
         return self.__repr__()
 
     def __eq__(self, other):
-        return self.player_number == other.player_number and self.phase == other.phase and self.content == other.content
+        if isinstance(other, Action):
+            return self is other or (self.player_number == other.player_number and self.phase == other.phase
+                                     and self.content == other.content)
+        return NotImplemented
+
+    def __hash__(self):
+        # actions outside the universe are never equal to one in it
+        return self.id if self.id >= 0 else hash((self.player_number, self.phase, self.content))
+
+    def __reduce__(self):
+        return Action, (self.player_number, self.phase, self.content)
+
+
+def _intern_actions() -> None:
+    bids = [0, *DEFAULT_RULES.bids]
+    talks_in_phase = {
+        "QUES": [talk for talk in TALKS if talk.pronoun in ("my", "yours", "our")],
+        "ANSW": [talk for talk in TALKS if talk.pronoun in ("my", "nmy", "ou", "no")],
+        "ANSA": [talk for talk in TALKS if talk.pronoun in ("we", "nwe")],
+    }
+    for player_number in range(4):
+        for phase in ("PROV", "PRMO"):
+            for value in bids:
+                Action._intern(player_number, phase, value)
+        for phase in ("PASS", "PBCK", "TRCK"):
+            for card in CARDS:
+                Action._intern(player_number, phase, card)
+        for phase, talks in talks_in_phase.items():
+            for talk in talks:
+                Action._intern(player_number, phase, talk)
+
+
+_intern_actions()
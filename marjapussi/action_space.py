@@ -0,0 +1,65 @@
+from functools import lru_cache
+import numpy as np
+
+from marjapussi.action import Action, Talk, TALKS
+from marjapussi.card import Card, CARDS
+
+
+_CARD_BITS = np.arange(len(CARDS), dtype=np.uint64)
+
+
+def mask_to_bools(mask: int, out: np.ndarray | None = None) -> np.ndarray:
+    """Unpacks a 36 bit card mask into a boolean vector indexed by card id."""
+    bits = (np.uint64(mask) >> _CARD_BITS) & np.uint64(1)
+    if out is None:
+        return bits.astype(bool)
+    out[:] = bits
+    return out
+
+
+class ActionSpace:
+    """
+    A fixed integer index for every possible move, independent of the player who makes it:
+    [0, 36)                 the cards by id, used for PASS, PBCK and TRCK (the phase follows from the game)
+    [36, 36 + len(bids))    the bids for PROV and PRMO, first folding (0), then start_game_value + 5 to max_game_value
+    [talk_offset, size)     the talks by Talk.id, used for QUES, ANSW and ANSA
+    """
+    def __init__(self, start_game_value: int, max_game_value: int):
+        self.bids: tuple[int, ...] = (0,) + tuple(range(start_game_value + 5, max_game_value + 1, 5))
+        self.bid_offset = len(CARDS)
+        self.talk_offset = self.bid_offset + len(self.bids)
+        self.size = self.talk_offset + len(TALKS)
+        self._bid_index = {bid: self.bid_offset + i for i, bid in enumerate(self.bids)}
+
+    def encode(self, action: Action) -> int:
+        """Returns the index of the action."""
+        content = action.content
+        if isinstance(content, Card):
+            return content.id
+        if isinstance(content, Talk):
+            return self.talk_offset + content.id
+        try:
+            return self._bid_index[content]
+        except KeyError:
+            raise ValueError(f"{action} is not part of the action space.")
+
+    def decode(self, index: int, player_number: int, phase: str) -> Action:
+        """Returns the action of the index for the player at turn in the given game phase."""
+        if index < self.bid_offset:
+            # cards are played into the trick in the QUES phase as well
+            return Action(player_number, "TRCK" if phase == "QUES" else phase, CARDS[index])
+        if index < self.talk_offset:
+            return Action(player_number, phase, self.bids[index - self.bid_offset])
+        return Action(player_number, phase, TALKS[index - self.talk_offset])
+
+    def bid_slice(self) -> slice:
+        return slice(self.bid_offset, self.talk_offset)
+
+    def new_mask(self) -> np.ndarray:
+        return np.zeros(self.size, dtype=bool)
+
+
+@lru_cache(maxsize=None)
+def action_space(start_game_value: int, max_game_value: int) -> ActionSpace:
+    """Returns the shared action space for the given game values."""
+    return ActionSpace(start_game_value, max_game_value)
@@ -1,10 +1,12 @@
-from marjapussi.game import MarjaPussi
+from marjapussi.game import MarjaPussi, make_rng
 from marjapussi.policy import Policy
 from marjapussi.utils import Card, sorted_cards
 from marjapussi.action import Action, Talk
 from marjapussi.gamestate import GameState
+from marjapussi.gamerules import CompiledRules
 
 from tqdm import trange
+import numpy as np
 import logging
 
 logging.basicConfig(format='%(levelname)s: %(message)s')
@@ -12,12 +14,13 @@ logging.basicConfig(format='%(levelname)s: %(message)s')
 
 class Agent:
     """Implements an agent able to play Marjapussi."""
-    def __init__(self, name: str, all_players: list[str], policy: Policy, start_cards: list[Card], opponent_policy: type, log=False) -> None:
+    def __init__(self, name: str, all_players: list[str], policy: Policy, start_cards: list[Card], opponent_policy: type, log=False,
+                 rules: CompiledRules | None = None) -> None:
         self.name = name
-        self.all_players = all_players
-        self.state = GameState(name, all_players, start_cards, opponent_policy)
         self.policy = policy
-        self.policy.game_start(self.state)
+        self.opponent_policy = opponent_policy
+        self.rules = rules
+        self.new_game(all_players, start_cards)
         self.logger = logging.getLogger("single_agent_logger")
         self.log = log
         if log:
@@ -26,6 +29,12 @@ class Agent:
             self.logger.setLevel(logging.DEBUG)
         self.logger.info(f"Created Agent: {self}")
 
+    def new_game(self, all_players: list[str], start_cards: list[Card]) -> None:
+        """Prepares the agent and its policy for the next game with the same seat and policy."""
+        self.all_players = all_players
+        self.state = GameState(self.name, all_players, start_cards, self.opponent_policy, self.rules)
+        self.policy.game_start(self.state)
+
     def __str__(self):
         return f"<{self.name} Agent, {type(self.policy).__name__}>"
 
@@ -97,20 +106,28 @@ class Agent:
 
 
 def test_agents(policy_a: Policy, policy_b: Policy, log_agent=False, log_game=False,
-                rounds: int = 100, custom_rules: dict = None) -> tuple[tuple[int, ...], tuple[int, ...]]:
+                rounds: int = 100, custom_rules: dict = None, rng=None,
+                deals: np.ndarray | None = None) -> tuple[tuple[int, ...], tuple[int, ...]]:
     """
     Plays specified number of rounds and returns wins and losses of policy_A and policy_B.
+    The deals are drawn from rng, which can be anything accepted by make_rng. If deals (an (n, 4, 9) array from
+    marjapussi.deals) are given instead, one game is played for each of them.
     """
+    if deals is not None:
+        rounds = len(deals)
     print(f"Testing {type(policy_a).__name__} vs {type(policy_b).__name__} in {rounds} games.")
-    players = ['0', '1', '2', '3']  # 0,2 play with policy_A and 1,3 with policy_B
+    players = ['0', '1', '2', '3']  # 0,2 play with policy_A and 1,3 with policy_B, the first one starts
     results = [[0, 0], [0, 0]]
     if not custom_rules:
         custom_rules = {}
+    rng = make_rng(rng)
 
-    for _ in trange(rounds, leave=False):
-        test_game = MarjaPussi(players, log=log_game, fancy=True, override_rules=custom_rules)
+    for round_num in trange(rounds, leave=False):
+        test_game = MarjaPussi(players, log=log_game, fancy=True, override_rules=custom_rules, rng=rng,
+                               deal=None if deals is None else deals[round_num])
         agents = {player.name: Agent(player.name, [p.name for p in test_game.players],
-                                     policy_a if int(player.name) % 2 == 0 else policy_b, player.cards, type(policy_b) if int(player.name) % 2 == 0 else type(policy_a), log=log_agent)
+                                     policy_a if int(player.name) % 2 == 0 else policy_b, player.cards, type(policy_b) if int(player.name) % 2 == 0 else type(policy_a), log=log_agent,
+                                     rules=test_game.rules)
                   for player in test_game.players}
 
         while test_game.phase != "DONE":
@@ -121,7 +138,6 @@ def test_agents(policy_a: Policy, policy_b: Policy, log_agent=False, log_game=Fa
                 agent.observe_action(chosen_action)
         res = test_game.end_info()
         playing_player = res['playing_player']
-        players: list = res['players']
         if playing_player:
             playing_partner = players[(players.index(playing_player) + 2) % 4]
             points_pl = res['players_points'][playing_player] + res['players_points'][playing_partner]
@@ -14,8 +14,7 @@ class Color(Enum):
 
     def __lt__(self, other):
         # Custom less-than comparison logic
-        order = ["g", "e", "s", "r"]
-        return order.index(self.value) < order.index(other.value)
+        return _COLOR_INDEX[self] < _COLOR_INDEX[other]
 
     def fancy_name(self) -> str:
         match self.value:
@@ -46,19 +45,51 @@ class Value(Enum):
 
     def __lt__(self, other):
         # Custom less-than comparison logic
-        order = ["6", "7", "8", "9", "U", "O", "K", "Z", "A"]
-        return order.index(self.value) < order.index(other.value)
+        return _VALUE_RANK[self] < _VALUE_RANK[other]
 
     @property
     def points(self):
         return CardPoints[self.name].value
 
 
+# colors and values in sort order, the index in these tuples is the color index and the rank of a card
+COLORS: tuple[Color, ...] = (Color.Gruen, Color.Eichel, Color.Schell, Color.Rot)
+VALUES: tuple[Value, ...] = (Value.Sechs, Value.Sieben, Value.Acht, Value.Neun, Value.Unter,
+                             Value.Ober, Value.Koenig, Value.Zehn, Value.Ass)
+_COLOR_INDEX: dict[Color, int] = {col: idx for idx, col in enumerate(COLORS)}
+_VALUE_RANK: dict[Value, int] = {val: rank for rank, val in enumerate(VALUES)}
+
+
 class Card:
-    """A generalized Card class"""
-    def __init__(self, color: Color | str, value: Value | str):
-        self.color: Color = self._validate_and_convert(color, Color, "color")
-        self.value: Value = self._validate_and_convert(value, Value, "value")
+    """
+    A generalized Card class
+    There are exactly 36 cards, one per color and value. Every card is a preallocated singleton with an id from 0 to 35,
+    the id is color_idx * 9 + rank, so ordering cards by id is the same as ordering them by (color, value).
+    Card(color, value) looks the singleton up instead of creating a new object.
+    """
+    __slots__ = ("id", "color", "value", "color_idx", "rank", "points")
+
+    _by_key: dict = {}
+    _by_id: list = []
+
+    def __new__(cls, color: Color | str, value: Value | str):
+        try:
+            return cls._by_key[color, value]
+        except (KeyError, TypeError):
+            color = cls._validate_and_convert(color, Color, "color")
+            value = cls._validate_and_convert(value, Value, "value")
+            return cls._by_key[color, value]
+
+    @classmethod
+    def _create(cls, color: Color, value: Value) -> "Card":
+        card = object.__new__(cls)
+        card.color_idx = _COLOR_INDEX[color]
+        card.rank = _VALUE_RANK[value]
+        card.id = card.color_idx * len(VALUES) + card.rank
+        card.color = color
+        card.value = value
+        card.points = value.points
+        return card
 
     @staticmethod
     def _validate_and_convert(value, enum_class, attribute_name):
@@ -73,24 +104,66 @@ class Card:
             raise TypeError(f"Invalid {attribute_name} "
                             f"type. Expected an instance of {enum_class.__name__} or a string.")
 
+    @classmethod
+    def from_id(cls, card_id: int) -> "Card":
+        """Returns the card with the given id (0 to 35)."""
+        if not 0 <= card_id < len(cls._by_id):
+            raise ValueError("Invalid card id.")
+        return cls._by_id[card_id]
+
+    @classmethod
+    def parse(cls, text: str) -> "Card":
+        """Returns the card for its string notation, e.g. 'g-6' or 'rA'."""
+        text = text.strip().replace("-", "")
+        if len(text) != 2:
+            raise ValueError(f"Invalid card notation '{text}'.")
+        return cls(text[0], text[1])
+
     def __str__(self) -> str:
         return f"{self.color}-{self.value}"
-    
+
     def __repr__(self):
         return self.__str__()
 
     def __eq__(self, other) -> bool:
-        return self.color == other.color and self.value == other.value
+        if isinstance(other, Card):
+            return self.id == other.id
+        return NotImplemented
+
+    def __lt__(self, other) -> bool:
+        return self.id < other.id
 
     def __hash__(self):
-        return hash((self.color, self.value))
+        return self.id
+
+    def __reduce__(self):
+        # keep the singletons unique when copying or pickling
+        return Card.from_id, (self.id,)
+
+
+def _intern_cards() -> None:
+    for color in COLORS:
+        for value in VALUES:
+            card = Card._create(color, value)
+            Card._by_id.append(card)
+            Card._by_key[color, value] = card
+            Card._by_key[color.value, value.value] = card
+            Card._by_key[color, value.value] = card
+            Card._by_key[color.value, value] = card
+
+
+_intern_cards()
+
+# all cards, ordered by their id
+CARDS: tuple[Card, ...] = tuple(Card._by_id)
+# all cards in deck order, colors and values as defined in the enums
+_DECK_ORDER: tuple[Card, ...] = tuple(Card(color, value) for color in Color for value in Value)
 
 
 class Deck:
     """A Deck, that by being populated consists of all possible cards there is"""
     def __init__(self):
-        self.cards = [Card(color, value) for color in Color for value in Value]
+        self.cards = list(_DECK_ORDER)
 
     def __str__(self):
         return ", ".join(str(card) for card in self.cards)
-
@@ -0,0 +1,238 @@
+from collections.abc import Iterable, Iterator
+from marjapussi.card import Card, Color, CARDS, COLORS, VALUES
+
+
+RANKS = len(VALUES)
+# mask with all 36 cards and masks with all cards of one color, indexed by color index
+FULL_MASK = (1 << len(CARDS)) - 1
+RANK_MASK = (1 << RANKS) - 1
+COLOR_MASKS: tuple[int, ...] = tuple(RANK_MASK << (RANKS * idx) for idx in range(len(COLORS)))
+_COLOR_SHIFT: dict[Color, int] = {col: RANKS * idx for idx, col in enumerate(COLORS)}
+_COLOR_INDEX: dict[Color, int] = {col: idx for idx, col in enumerate(COLORS)}
+_ACE_BIT = 1 << (RANKS - 1)
+
+
+def mask_of(cards) -> int:
+    """Returns the bitmask of the given cards, bit i is set if the card with id i is contained."""
+    if isinstance(cards, (CardSet, Hand)):
+        return cards.mask
+    if isinstance(cards, Card):
+        return 1 << cards.id
+    mask = 0
+    for card in cards:
+        mask |= 1 << card.id
+    return mask
+
+
+def iter_mask(mask: int) -> Iterator[Card]:
+    """Yields the cards of the mask in sort order (by id)."""
+    while mask:
+        low = mask & -mask
+        yield CARDS[low.bit_length() - 1]
+        mask ^= low
+
+
+class CardSet:
+    """
+    An immutable set of cards backed by a single int bitmask (bit i is the card with id i).
+    Iterating yields the cards in sort order. The operators |, &, - and ^ accept other CardSets,
+    single cards or any iterable of cards and always return a new CardSet.
+    A CardSet only equals other CardSets, to compare it with a set of cards wrap that in CardSet first.
+    """
+    __slots__ = ("mask",)
+
+    def __init__(self, cards: Iterable[Card] | None = None):
+        self.mask: int = mask_of(cards) if cards is not None else 0
+
+    @classmethod
+    def from_mask(cls, mask: int) -> "CardSet":
+        card_set = object.__new__(cls)
+        card_set.mask = mask
+        return card_set
+
+    def __iter__(self) -> Iterator[Card]:
+        return iter_mask(self.mask)
+
+    def __len__(self) -> int:
+        return self.mask.bit_count()
+
+    def __bool__(self) -> bool:
+        return self.mask != 0
+
+    def __contains__(self, card) -> bool:
+        return isinstance(card, Card) and (self.mask >> card.id) & 1 == 1
+
+    def __eq__(self, other) -> bool:
+        if isinstance(other, CardSet):
+            return self.mask == other.mask
+        return NotImplemented
+
+    def __hash__(self):
+        return hash(self.mask)
+
+    def __or__(self, other) -> "CardSet":
+        return CardSet.from_mask(self.mask | mask_of(other))
+
+    def __and__(self, other) -> "CardSet":
+        return CardSet.from_mask(self.mask & mask_of(other))
+
+    def __sub__(self, other) -> "CardSet":
+        return CardSet.from_mask(self.mask & ~mask_of(other))
+
+    def __xor__(self, other) -> "CardSet":
+        return CardSet.from_mask(self.mask ^ mask_of(other))
+
+    __ror__ = __or__
+    __rand__ = __and__
+    __rxor__ = __xor__
+
+    def __rsub__(self, other) -> "CardSet":
+        return CardSet.from_mask(mask_of(other) & ~self.mask)
+
+    def union(self, *others) -> "CardSet":
+        mask = self.mask
+        for other in others:
+            mask |= mask_of(other)
+        return CardSet.from_mask(mask)
+
+    def intersection(self, *others) -> "CardSet":
+        mask = self.mask
+        for other in others:
+            mask &= mask_of(other)
+        return CardSet.from_mask(mask)
+
+    def difference(self, *others) -> "CardSet":
+        mask = self.mask
+        for other in others:
+            mask &= ~mask_of(other)
+        return CardSet.from_mask(mask)
+
+    def issubset(self, other) -> bool:
+        return self.mask & ~mask_of(other) == 0
+
+    def issuperset(self, other) -> bool:
+        return mask_of(other) & ~self.mask == 0
+
+    def isdisjoint(self, other) -> bool:
+        return self.mask & mask_of(other) == 0
+
+    def bucket(self, col: Color) -> int:
+        """Returns the cards of the color as 9 bit mask, bit i is the card with rank i."""
+        return (self.mask >> _COLOR_SHIFT[col]) & RANK_MASK
+
+    def color(self, col: Color) -> "CardSet":
+        """Returns all cards of the given color."""
+        return CardSet.from_mask(self.mask & (RANK_MASK << _COLOR_SHIFT[col]))
+
+    def count(self, col: Color) -> int:
+        """Returns how many cards of the given color are in the set."""
+        return self.bucket(col).bit_count()
+
+    def has_color(self, col: Color) -> bool:
+        return self.bucket(col) != 0
+
+    def has_ace(self, col: Color) -> bool:
+        return self.bucket(col) & _ACE_BIT != 0
+
+    def highest(self, col: Color) -> Card | None:
+        """Returns the highest card of the given color or None if there is none."""
+        bucket = self.bucket(col)
+        return CARDS[_COLOR_SHIFT[col] + bucket.bit_length() - 1] if bucket else None
+
+    def lowest(self, col: Color) -> Card | None:
+        """Returns the lowest card of the given color or None if there is none."""
+        bucket = self.bucket(col)
+        return CARDS[_COLOR_SHIFT[col] + (bucket & -bucket).bit_length() - 1] if bucket else None
+
+    def __str__(self):
+        return " ".join(str(card) for card in self)
+
+    def __repr__(self):
+        return f"CardSet({self.__str__()})"
+
+
+class Hand:
+    """
+    The mutable hand of a player. The cards are kept in one bucket per color, each bucket is a 9 bit mask where
+    bit i is the card with rank i, so the cards of a color are always in rank order. Asking whether the hand has a
+    color, its highest card or its ace is a single lookup.
+    Iterating yields the cards in sort order, like a CardSet.
+    """
+    __slots__ = ("buckets", "mask", "_count")
+
+    def __init__(self, cards: Iterable[Card] | None = None):
+        self.buckets: list[int] = [0] * len(COLORS)
+        self.mask: int = 0
+        self._count = 0
+        if cards is not None:
+            for card in cards:
+                self.add(card)
+
+    def add(self, card: Card) -> None:
+        bit = 1 << card.id
+        if not self.mask & bit:
+            self.mask |= bit
+            self.buckets[card.color_idx] |= 1 << card.rank
+            self._count += 1
+
+    def discard(self, card: Card) -> None:
+        bit = 1 << card.id
+        if self.mask & bit:
+            self.mask ^= bit
+            self.buckets[card.color_idx] ^= 1 << card.rank
+            self._count -= 1
+
+    def set_mask(self, mask: int) -> None:
+        """Replaces all cards of the hand by the cards of the mask."""
+        self.mask = mask
+        self.buckets = [(mask >> (RANKS * idx)) & RANK_MASK for idx in range(len(COLORS))]
+        self._count = mask.bit_count()
+
+    def cardset(self) -> CardSet:
+        """Returns the current cards as immutable CardSet."""
+        return CardSet.from_mask(self.mask)
+
+    def __iter__(self) -> Iterator[Card]:
+        return iter_mask(self.mask)
+
+    def __len__(self) -> int:
+        return self._count
+
+    def __bool__(self) -> bool:
+        return self._count != 0
+
+    def __contains__(self, card) -> bool:
+        return isinstance(card, Card) and (self.mask >> card.id) & 1 == 1
+
+    def bucket(self, col: Color) -> int:
+        """Returns the cards of the color as 9 bit mask, bit i is the card with rank i."""
+        return self.buckets[_COLOR_INDEX[col]]
+
+    def color(self, col: Color) -> CardSet:
+        """Returns all cards of the given color."""
+        return CardSet.from_mask(self.buckets[_COLOR_INDEX[col]] << _COLOR_SHIFT[col])
+
+    def count(self, col: Color) -> int:
+        return self.buckets[_COLOR_INDEX[col]].bit_count()
+
+    def has_color(self, col: Color) -> bool:
+        return self.buckets[_COLOR_INDEX[col]] != 0
+
+    def has_ace(self, col: Color) -> bool:
+        return self.buckets[_COLOR_INDEX[col]] & _ACE_BIT != 0
+
+    def highest(self, col: Color) -> Card | None:
+        """Returns the highest card of the given color or None if there is none."""
+        bucket = self.buckets[_COLOR_INDEX[col]]
+        return CARDS[_COLOR_SHIFT[col] + bucket.bit_length() - 1] if bucket else None
+
+    def lowest(self, col: Color) -> Card | None:
+        """Returns the lowest card of the given color or None if there is none."""
+        bucket = self.buckets[_COLOR_INDEX[col]]
+        return CARDS[_COLOR_SHIFT[col] + (bucket & -bucket).bit_length() - 1] if bucket else None
+
+    def __str__(self):
+        return " ".join(str(card) for card in self)
+
+    def __repr__(self):
+        return f"Hand({self.__str__()})"
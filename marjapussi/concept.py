@@ -48,13 +48,43 @@ class Concept:
             return self.value
 
 
+def _properties_dict() -> defaultdict:
+    return defaultdict(lambda: defaultdict(set))
+
+
 class ConceptStore:
     def __init__(self):
         self.dict_by_name = {}
         self.count_by_name = defaultdict(int)
-        self.dict_by_properties = defaultdict(lambda: defaultdict(set))
+        self.dict_by_properties = _properties_dict()
+        self._shared = False  # the dicts are shared with a fork and have to be copied before they are changed
+
+    def fork(self) -> "ConceptStore":
+        """
+        Returns a store with the same concepts. Both stores share their dicts until one of them changes, only then
+        it copies them (the concepts themselves are never changed and stay shared).
+        """
+        child = ConceptStore.__new__(ConceptStore)
+        child.dict_by_name, child.count_by_name = self.dict_by_name, self.count_by_name
+        child.dict_by_properties = self.dict_by_properties
+        child._shared = self._shared = True
+        return child
+
+    def _own(self) -> None:
+        """Copies the dicts if they are shared with a fork, before they are changed."""
+        if not self._shared:
+            return
+        self.dict_by_name = dict(self.dict_by_name)
+        self.count_by_name = defaultdict(int, self.count_by_name)
+        properties = _properties_dict()
+        for prop, by_value in self.dict_by_properties.items():
+            for value, concepts in by_value.items():
+                properties[prop][value] = set(concepts)
+        self.dict_by_properties = properties
+        self._shared = False
 
     def add(self, concept: Concept) -> None:
+        self._own()
         self.dict_by_name[concept.name] = concept
         self.count_by_name[concept.name] += 1
         for prop, value in concept.properties.items():
@@ -63,6 +93,7 @@ class ConceptStore:
     def remove(self, name):
         obj = self.dict_by_name.get(name)
         if obj is not None:
+            self._own()
             # Remove from dict_by_name
             if self.count_by_name[name] == 1:
                 del self.count_by_name[name]
@@ -85,7 +116,8 @@ class ConceptStore:
     def get_all_by_properties(self, properties: dict) -> set[Concept]:
         matching_concepts = set(self.dict_by_name.values())
         for prop, value in properties.items():
-            property_objects = self.dict_by_properties[prop].get(value, set())
+            # no lookup that inserts, the dicts may be shared with a fork
+            property_objects = self.dict_by_properties.get(prop, {}).get(value, set())
             matching_concepts &= property_objects  # intersect with the current matching concepts
         return matching_concepts
     
@@ -0,0 +1,50 @@
+"""
+Deals in bulk: a batch of n deals is an (n, 4, 9) uint8 array, deals[i, p] are the card ids of player p in deal i,
+sorted ascending. No Card objects are created until a deal is actually played.
+"""
+from collections.abc import Iterator
+import numpy as np
+
+from marjapussi.card import Card, CARDS
+
+
+NUM_CARDS = len(CARDS)
+_ALL_IDS = np.arange(NUM_CARDS, dtype=np.uint8)
+_ONE = np.uint64(1)
+
+
+def _generator(rng: np.random.Generator | int | None) -> np.random.Generator:
+    return rng if isinstance(rng, np.random.Generator) else np.random.default_rng(rng)
+
+
+def deals(n: int, rng: np.random.Generator | int | None = None, out: np.ndarray | None = None) -> np.ndarray:
+    """
+    Returns n random deals as (n, 4, 9) uint8 array of card ids, rng is a numpy Generator or seed.
+    The deals are written into out if it is given, so a buffer can be refilled without allocating.
+    """
+    if out is None:
+        out = np.empty((n, 4, NUM_CARDS // 4), dtype=np.uint8)
+    ids = out.reshape(n, NUM_CARDS)
+    ids[:] = _ALL_IDS
+    _generator(rng).permuted(ids, axis=1, out=ids)
+    out.sort(axis=2)
+    return out
+
+
+def iter_deals(n: int, rng: np.random.Generator | int | None = None, chunk_size: int = 65536) -> Iterator[np.ndarray]:
+    """Yields n random deals in chunks of at most chunk_size deals, all drawn from the same stream."""
+    rng = _generator(rng)
+    while n > 0:
+        size = min(n, chunk_size)
+        yield deals(size, rng)
+        n -= size
+
+
+def deal_masks(hands: np.ndarray) -> np.ndarray:
+    """Returns the card masks of deals (or of a single deal) as uint64 array, one mask per player."""
+    return np.bitwise_or.reduce(_ONE << hands.astype(np.uint64), axis=-1)
+
+
+def hands_of(deal: np.ndarray) -> list[list[Card]]:
+    """Returns the hands of a single (4, 9) deal as card lists."""
+    return [[CARDS[card_id] for card_id in hand] for hand in deal.tolist()]
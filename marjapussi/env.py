@@ -0,0 +1,124 @@
+"""
+A gym style environment around MarjaPussi for training agents: reset starts a game, step takes the index of an action
+in the action space (see ActionSpace) of the player at turn. The observations of every seat are fixed size float32
+vectors built from the GameState of that seat and are written into preallocated buffers.
+"""
+import numpy as np
+
+from marjapussi.action import PHASES
+from marjapussi.action_space import mask_to_bools
+from marjapussi.agent import Agent
+from marjapussi.card import COLORS, CARDS
+from marjapussi.game import MarjaPussi
+from marjapussi.gamestate import GameState, POSSIBLE, SECURE
+from marjapussi.policy import Policy
+
+
+NUM_CARDS = len(CARDS)
+
+# the parts of an observation, all player related parts are ordered relative to the observing seat (0 is the seat
+# itself, 1 the next player, 2 the partner, 3 the previous player)
+OBS_LAYOUT: dict[str, tuple[int, ...]] = {
+    "hand": (NUM_CARDS,),
+    "possible": (4, NUM_CARDS),
+    "secure": (4, NUM_CARDS),
+    "trick": (4, NUM_CARDS),  # the cards of the current trick by the position they were played in
+    "trump": (len(COLORS) + 1,),  # one hot, the last entry means no trump
+    "phase": (len(PHASES),),
+    "bids": (4,),  # the last bid of every player, 0 if they didn't bid or folded
+    "game_value": (1,),
+    "points": (4,),
+}
+OBS_SLICES: dict[str, slice] = {}
+_offset = 0
+for _name, _shape in OBS_LAYOUT.items():
+    OBS_SLICES[_name] = slice(_offset, _offset + int(np.prod(_shape)))
+    _offset += int(np.prod(_shape))
+OBS_SIZE = _offset
+
+_TRUMP_SLOT = {col: idx for idx, col in enumerate(COLORS)} | {None: len(COLORS)}
+_PHASE_SLOT = {phase: idx for idx, phase in enumerate(PHASES)}
+
+
+class MarjaPussiEnv:
+    """
+    reset(seed) -> observation, info
+    step(action_id) -> observation, rewards, done, info
+    The observation is the one of the seat at turn after the step, info holds the seat ("seat") and the legal action
+    mask ("legal"). The rewards of all four seats are given in the step that ends the game: plus the game value for
+    the playing party if it won, minus the game value if it lost. The arrays returned are the buffers of the
+    environment and are overwritten by the next step, copy them if they are kept.
+    """
+
+    def __init__(self, override_rules: dict | None = None, player_names: list[str] | None = None) -> None:
+        self.override_rules = override_rules
+        self.player_names = player_names or ["0", "1", "2", "3"]
+        self.game: MarjaPussi | None = None
+        self.agents: list[Agent] = []
+        self.obs = np.zeros((4, OBS_SIZE), dtype=np.float32)
+        # views of the parts of the observation buffer of every seat
+        self.obs_views: list[dict[str, np.ndarray]] = [
+            {name: self.obs[seat, OBS_SLICES[name]].reshape(shape) for name, shape in OBS_LAYOUT.items()}
+            for seat in range(4)]
+        self.rewards = np.zeros(4, dtype=np.float32)
+        self.legal: np.ndarray | None = None
+
+    def reset(self, seed: int | None = None, deal=None) -> tuple[np.ndarray, dict]:
+        """Starts a new game with cards shuffled by the seed or the given deal (see MarjaPussi)."""
+        self.game = MarjaPussi(self.player_names, self.override_rules, log=False, rng=seed, deal=deal)
+        self.agents = [Agent(player.name, self.player_names, Policy(), player.cards, Policy,
+                             rules=self.game.rules)
+                       for player in self.game.players]
+        if self.legal is None or self.legal.shape[0] != self.game.action_space.size:
+            self.legal = self.game.action_space.new_mask()
+        self.rewards[:] = 0
+        return self._result()
+
+    def step(self, action_id: int) -> tuple[np.ndarray, np.ndarray, bool, dict]:
+        game = self.game
+        action = game.decode_action(int(action_id))
+        if not game.act_action(action):
+            raise ValueError(f"Action {action_id} ({action}) is not legal.")
+        for agent in self.agents:
+            agent.observe_action(action)
+        self.rewards[:] = 0
+        if game.phase == "DONE" and not game.no_one_plays:
+            playing = game.playing_player
+            points = playing.points_made + playing.partner.points_made
+            reward = game.game_value if points >= game.game_value else -game.game_value
+            self.rewards[playing.number] = self.rewards[playing.partner.number] = reward
+        obs, info = self._result()
+        return obs, self.rewards, game.phase == "DONE", info
+
+    def _result(self) -> tuple[np.ndarray, dict]:
+        seat = self.game.player_at_turn.number
+        self.game.legal_action_mask(out=self.legal)
+        return self.observe(seat), {"seat": seat, "legal": self.legal}
+
+    def observe(self, seat: int) -> np.ndarray:
+        """Writes the current observation of the seat into its buffer and returns it."""
+        game, state = self.game, self.agents[seat].state
+        views = self.obs_views[seat]
+        seats = [(seat + offset) % 4 for offset in range(4)]
+        mask_to_bools(state.hand_cards.mask, out=views["hand"])
+        views["possible"][:] = state.knowledge[POSSIBLE, seats]
+        views["secure"][:] = state.knowledge[SECURE, seats]
+        trick = views["trick"]
+        trick[:] = 0
+        for pos, card in enumerate(state.current_trick.cards):
+            trick[pos, card.id] = 1
+        views["trump"][:] = 0
+        views["trump"][_TRUMP_SLOT[state.current_trick.trump_color]] = 1
+        views["phase"][:] = 0
+        views["phase"][_PHASE_SLOT[game.phase]] = 1
+        self._write_bids(state, seats, views["bids"])
+        views["game_value"][0] = state.game_value
+        for row, num in enumerate(seats):
+            views["points"][row] = game.players[num].points_made
+        return self.obs[seat]
+
+    @staticmethod
+    def _write_bids(state: GameState, seats: list[int], out: np.ndarray) -> None:
+        out[:] = 0
+        for action in state.provoking_history:
+            out[seats.index(action.player_number)] = action.content
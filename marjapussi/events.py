@@ -0,0 +1,202 @@
+"""
+Events emitted by MarjaPussi to its subscribers. Players are referenced by their number, cards and colors are the
+shared instances of the game. The engine only builds an event if someone subscribed, so a game without subscribers
+doesn't pay for them.
+"""
+from typing import NamedTuple, Callable
+import logging
+
+import marjapussi.utils as utils
+from marjapussi.action import Action
+from marjapussi.card import Card, Color
+from marjapussi.cardset import iter_mask
+
+
+class Dealt(NamedTuple):
+    hands: tuple[int, ...]  # card masks of the players by player number
+
+
+class ActionActed(NamedTuple):
+    action: Action
+
+
+class IllegalAction(NamedTuple):
+    action: Action
+
+
+class Bid(NamedTuple):
+    player: int
+    value: int
+
+
+class Folded(NamedTuple):
+    player: int
+
+
+class NoOnePlays(NamedTuple):
+    starting_player: int
+
+
+class GameTaken(NamedTuple):
+    player: int
+    value: int
+
+
+class CardsPassed(NamedTuple):
+    player: int
+    cards: tuple[Card, ...]
+    back: bool
+
+
+class PassingDone(NamedTuple):
+    playing_player: int
+
+
+class GameValueRaised(NamedTuple):
+    player: int
+    value: int
+
+
+class GameValueKept(NamedTuple):
+    player: int
+    value: int
+
+
+class CardPlayed(NamedTuple):
+    player: int
+    card: Card
+
+
+class TrickWon(NamedTuple):
+    trick_num: int
+    cards: tuple[Card, ...]
+    player: int
+
+
+class PairCalled(NamedTuple):
+    player: int
+    color: Color
+
+
+class TrumpChanged(NamedTuple):
+    color: Color
+
+
+class PairAsked(NamedTuple):
+    player: int
+
+
+class HalfAsked(NamedTuple):
+    player: int
+    color: Color
+
+
+class NoPair(NamedTuple):
+    player: int
+
+
+class HalfAnswered(NamedTuple):
+    player: int
+    color: Color
+    has_half: bool
+
+
+class HalfCompleted(NamedTuple):
+    player: int
+    color: Color
+    has_half: bool
+
+
+class GameDone(NamedTuple):
+    no_one_plays: bool
+    game_value: int
+    playing_points: int  # 0 for both parties if no one plays
+    not_playing_points: int
+
+
+Event = (Dealt | ActionActed | IllegalAction | Bid | Folded | NoOnePlays | GameTaken | CardsPassed | PassingDone
+         | GameValueRaised | GameValueKept | CardPlayed | TrickWon | PairCalled | TrumpChanged | PairAsked | HalfAsked
+         | NoPair | HalfAnswered | HalfCompleted | GameDone)
+Subscriber = Callable[[Event], None]
+
+
+class LogSubscriber:
+    """Writes the events of a game as human readable messages to the logger of the game."""
+
+    def __init__(self, game) -> None:
+        self.game = game
+        self.logger: logging.Logger = game.logger
+        self.msg = {key: msgs[game.language] for key, msgs in game.INFO_MSG.items()}
+        self.fancy = game.fancy
+
+    def name(self, player_number: int) -> str:
+        return self.game.players[player_number].name
+
+    def color(self, col: Color) -> str:
+        return utils.color_str(col, fancy=self.fancy)
+
+    def __call__(self, event: Event) -> None:
+        msg, info = self.msg, self.logger.info
+        match event:
+            case Dealt(hands):
+                if self.logger.isEnabledFor(logging.DEBUG):
+                    for num, hand in enumerate(hands):
+                        self.logger.debug(f"{self.name(num)}: {utils.cards_str(list(iter_mask(hand)), fancy=self.fancy)}")
+                info(msg["got_their_cards"])
+            case ActionActed(action):
+                if self.logger.isEnabledFor(logging.DEBUG):
+                    player = self.game.players[action.player_number]
+                    self.logger.debug(f"{player.name}: {utils.cards_str(player.cards, fancy=self.fancy)}")
+                    self.logger.debug(
+                        f"Action player={player.name}, phase={action.phase}, content={action.content}")
+            case IllegalAction(_):
+                pass  # the game logs the warning itself
+            case Bid(player, value):
+                info(f"{self.name(player)} {msg['player_says']} {value}.")
+            case Folded(player):
+                info(f"{self.name(player)} {msg['is_gone']}")
+            case NoOnePlays(player):
+                info(f"{msg['noon_plays']}. {self.name(player)} {msg['plays']}")
+            case GameTaken(player, value):
+                info(f"{self.name(player)} {msg['takes_the_game']} {value}.")
+            case CardsPassed(player, cards, back):
+                self.logger.debug(f"{self.name(player)} {msg['gives']} {utils.cards_str(cards, fancy=self.fancy)} "
+                                  f"{msg['back' if back else 'forth']}.")
+            case PassingDone(player):
+                info(f"{self.name(player)} {msg['and']} {self.name((player + 2) % 4)} {msg['passed_cards']}")
+            case GameValueRaised(player, value):
+                info(f"{self.name(player)} {msg['raises_to']} {value}.")
+            case GameValueKept(player, value):
+                info(f"{self.name(player)} {msg['plays_for']} {value}.")
+            case CardPlayed(player, card):
+                info(f"{self.name(player)} {msg['plays']} {str(card)}.")
+            case TrickWon(trick_num, cards, player):
+                info(f"{msg['trick']} {trick_num}: {utils.cards_str(cards, fancy=self.fancy)} "
+                     f"{msg['goes_to']} {self.name(player)}.")
+            case PairCalled(player, col):
+                info(f"{self.name(player)} {msg['has']} {self.color(col)} {msg['pair']}")
+            case TrumpChanged(col):
+                info(f"{self.color(col).capitalize()} {msg['is_trump']}")
+            case PairAsked(player):
+                info(f"{self.name(player)} {msg['asks_for']} {msg['pair']}")
+            case HalfAsked(player, col):
+                info(f"{self.name(player)} {msg['asks_for']} {self.color(col)} {msg['half']}")
+            case NoPair(player):
+                info(f"{self.name(player)} {msg['no_pair']}")
+            case HalfAnswered(player, col, has_half):
+                info(f"{self.name(player)} {msg['has' if has_half else 'doesnt_have']} {self.color(col)} {msg['half']}")
+            case HalfCompleted(player, col, has_half):
+                info(f"{self.name(player)} {msg['has_also' if has_half else 'doesnt_have']} {self.color(col)} "
+                     f"{msg['half']}")
+            case GameDone(no_one_plays, game_value, playing_points, not_playing_points):
+                info(msg["game_done"])
+                if no_one_plays:
+                    return
+                playing = self.game.playing_player
+                partner, notplay = playing.partner, playing.next_player
+                info(f"{playing.name} {msg['and']} {partner.name}: {playing.points_made}+{partner.points_made}"
+                     f"={playing_points}")
+                info(f"{notplay.name} {msg['and']} {notplay.partner.name}: {notplay.points_made}+"
+                     f"{notplay.partner.points_made}={not_playing_points}")
+                info(f"{msg['playing_party']}: {playing_points}/{game_value}")
+                info(utils.bold_str(msg['win' if playing_points >= game_value else 'loose'], fancy=self.fancy))
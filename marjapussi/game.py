@@ -1,25 +1,60 @@
-from random import shuffle, seed, randint
+import random
+import struct
 import marjapussi.utils as utils
 from marjapussi.player import Player
-from marjapussi.card import Card, Deck, Color
-from marjapussi.action import Action, Talk
-from marjapussi.trick import Trick
+from marjapussi.gamerules import CompiledRules, compile_rules
+from marjapussi.card import Card, Deck, Color, CARDS, COLORS
+from marjapussi.cardset import iter_mask, mask_of, FULL_MASK
+from marjapussi.action import Action, Talk, PHASES
+from marjapussi.action_space import ActionSpace, action_space, mask_to_bools
+from marjapussi.trick import Trick, TRUMP_INDEX
+from marjapussi.deals import deal_masks
+from marjapussi import events
+
+import numpy as np
 
 import logging
 logging.basicConfig(format='%(levelname)s: %(message)s')
 
 
+# layout of MarjaPussi.to_bytes: version, phase, player at turn, playing player, game value, still provoking players
+# (bits 0-3) and no one plays (bit 4), asking levels (2 bits per player), trump, pending talk, trump calls
+# (4 bits per player), owner of every card (2 bits per card id, only valid for cards in hand), passed forth and back,
+# colors that have been trump in order, played cards in order, trump (high nibble) and winner of every trick, points
+_SNAPSHOT = struct.Struct("<BBBbHBBBBH9sB4sB4sB4sB36s9s4h")
+_SNAPSHOT_VERSION = 1
+_NONE = 0xFF
+# how many snapshots of versions changes_since keeps to diff against, a game has less than 100 actions
+_VERSION_HISTORY = 128
+_TRUMP_OF_INDEX: tuple[Color | None, ...] = COLORS + (None,)
+
+
+def _pad(ids: list[int], size: int) -> bytes:
+    return bytes(ids) + bytes([_NONE]) * (size - len(ids))
+
+
+def make_rng(rng: random.Random | np.random.Generator | int | None = None) -> random.Random | np.random.Generator:
+    """
+    Returns a random number generator for a game: random.Random and numpy Generators are used as they are,
+    an int is used as seed for a new random.Random, None gives a fresh random.Random seeded by the system.
+    """
+    if isinstance(rng, (random.Random, np.random.Generator)):
+        return rng
+    return random.Random(rng)
+
+
 class MarjaPussi():
     """Implements a single game of MarjaPussi."""
 
-    DEFAULT_RULES = {
-        "start_game_value": 115,
-        "max_game_value": 420,
-        "points": {symb: val for symb, val in zip("rsegAZKOU9876L", [100, 80, 60, 40, 11, 10, 4, 3, 2, 0, 0, 0, 0, 20])},
-        "start_phase": "PROV",
-    } # TODO swap this for a centralised GameRules class
-
-    def __init__(self, player_names: list[str], override_rules =None, log= True, fancy=True, language=1) -> None:
+    def __init__(self, player_names: list[str], override_rules: dict | CompiledRules | None = None, log=True,
+                 fancy=True, language=1,
+                 rng: random.Random | np.random.Generator | int | None = None,
+                 deal: str | list[str] | list[list[Card]] | np.ndarray | None = None) -> None:
+        """
+        The cards are shuffled with rng (see make_rng), every game can get its own independent stream.
+        Alternatively, deal fixes the hands of the four players, given as card lists, in the notation of
+        utils.parse_deal or as (4, 9) array of card ids like the deals of marjapussi.deals, in which case rng is not used.
+        """
         # init logger
         self.logger = logging.getLogger("single_game_logger")
         if log:
@@ -28,39 +63,27 @@ class MarjaPussi():
             self.logger.setLevel(logging.DEBUG)
         self.fancy = fancy
         self.language = language
-        # init rules
-        if not override_rules:
-            override_rules = {}
-        self.rules = MarjaPussi.DEFAULT_RULES | override_rules
+        self._subscribers: list[events.Subscriber] = []
+        if log:
+            self.subscribe(events.LogSubscriber(self))
+        # init rules, override_rules are a rules dict (see compile_rules) or CompiledRules
+        self.rules: CompiledRules = compile_rules(override_rules)
         self.logger.debug(f"Ruleset: {override_rules}")
         # init players and cards
         assert len(player_names) == 4, "There have to be 4 names!"
-        deck = Deck()
-        current_seed = randint(0, 1000)
-        current_seed = 493
-        print("SEED", current_seed)
-        seed(current_seed)
-        shuffle(deck.cards)
-        # the following code was used to reproduce an error for debugging and was left here for the case of needing this again
-        # cards = "g-6 g-O g-K e-9 e-K s-7 s-8 r-6 r-7\ng-A e-7 e-8 e-O e-Z e-A s-O s-A r-O\ng-7 g-9 g-Z e-6 e-U s-U r-8 r-9 r-A\ng-8 g-U s-6 s-9 s-K s-Z r-U r-K r-Z"
-        # card_lists = [[Card(card.split("-")[0], card.split("-")[1]) for card in line.split(" ")] for line in cards.splitlines()]
-        # print([[(str(card.color), str(card.value)) for card in card_list]for card_list in card_lists])
-        # deck.cards = []
-        # card_lists.reverse()
-        # for _ in range(9):
-        #     for card_list in card_lists:
-        #         deck.cards.append(card_list.pop(0))
-        self.players = [Player(name, num, self.rules["points"])
+        self.players = [Player(name, num, self.rules)
                         for num, name in enumerate(player_names)]
         # only used for logging
         self.players_dict = {player.number: player for player in self.players}
-        while deck.cards:
-            for p in self.players:
-                p.give_card(deck.cards.pop())
-        for player in self.players:
-            self.logger.debug(
-                f"{player.name}: {utils.cards_str(player.cards, fancy=self.fancy)}")
-        self.logger.info(MarjaPussi.INFO_MSG["got_their_cards"][self.language])
+        if deal is None:
+            self.rng = make_rng(rng)
+            deal = self._shuffled_hands()
+        else:
+            self.rng = None
+        for player, mask in zip(self.players, self._deal_masks(deal)):
+            player.cards.set_mask(mask)
+        if self._subscribers:
+            self._emit(events.Dealt(tuple(player.cards.mask for player in self.players)))
 
         for i in range(4):
             self.players[i].set_partner(self.players[(i+2) % 4])
@@ -69,15 +92,57 @@ class MarjaPussi():
         self.original_cards = {p.name: [card for card in p.cards] for p in self.players}  # Change this line
         self.player_at_turn: Player = self.players[0]
         self.playing_player: Player | None = None
-        self.game_value = self.rules["start_game_value"]
+        self.game_value = self.rules.start_game_value
         self.no_one_plays = True
-        self.phase = self.rules["start_phase"]
+        self.phase = self.rules.start_phase
         self.passed_cards = {"forth": [], "back": []}
         self.all_actions: list[Action] = []
+        self.pending_talk: Talk | None = None  # the question or half answer that has to be answered
         self.trump: Color | None = None
         self.all_trump: list[Color] = []
         self.tricks: list[Trick] = [Trick()]
         self.card_pool = Deck()
+        self._undo_stack: list[tuple] = []
+        self.action_space: ActionSpace = action_space(self.rules.start_game_value, self.rules.max_game_value)
+        self._reset_versions()
+
+    def _shuffled_hands(self) -> list[list[Card]]:
+        deck = Deck()
+        if isinstance(self.rng, np.random.Generator):
+            deck.cards = [deck.cards[i] for i in self.rng.permutation(len(deck.cards))]
+        else:
+            self.rng.shuffle(deck.cards)
+        # the cards are handed out one by one from the top of the deck
+        return [deck.cards[-1 - num::-4] for num in range(4)]
+
+    @staticmethod
+    def _deal_masks(deal: str | list[str] | list[list[Card]] | np.ndarray) -> list[int]:
+        """Returns the card masks of the four hands of the deal and checks that it is complete."""
+        if isinstance(deal, np.ndarray):
+            if deal.shape != (4, 9):
+                raise ValueError("A deal needs 9 cards for each of the 4 players.")
+            masks = [int(mask) for mask in deal_masks(deal)]
+        else:
+            if isinstance(deal, str) or (deal and isinstance(deal[0], str)):
+                deal = utils.parse_deal(deal)
+            if len(deal) != 4 or any(len(hand) != 9 for hand in deal):
+                raise ValueError("A deal needs 9 cards for each of the 4 players.")
+            masks = [mask_of(hand) for hand in deal]
+        if any(mask.bit_count() != 9 for mask in masks) or masks[0] | masks[1] | masks[2] | masks[3] != FULL_MASK:
+            raise ValueError("Every card has to be dealt exactly once.")
+        return masks
+
+    def subscribe(self, subscriber: events.Subscriber) -> None:
+        """Registers a callable that gets every event of the game, see marjapussi.events."""
+        self._subscribers.append(subscriber)
+
+    def unsubscribe(self, subscriber: events.Subscriber) -> None:
+        self._subscribers.remove(subscriber)
+
+    def _emit(self, event) -> None:
+        # callers check self._subscribers first, so that no event is built if no one listens
+        for subscriber in self._subscribers:
+            subscriber(event)
 
     def legal_actions(self) -> list[Action]:
         """
@@ -109,15 +174,16 @@ class MarjaPussi():
     def act_action(self, action: Action) -> bool:
         """Phases: PROV, PASS, PBCK, PRMO, FTRI, QUES, ANSW, TRCK"""
         # ? there is not a real reason why they are 4 letters long but it looks neat
-        if action not in self.legal_actions():
+        if not self.is_legal(action):
+            # a rare path, so it is always logged, also if no one subscribed
             self.logger.warning("Not a legal action! This is not supposed to happen!")
+            if self._subscribers:
+                self._emit(events.IllegalAction(action))
             return False
 
         self.all_actions.append(action)
-
-        self.logger.debug(f"{self.player_at_turn.name}: {utils.cards_str(self.player_at_turn.cards, fancy=self.fancy)}")
-        self.logger.debug(
-            f"Action player={self.players_dict[action.player_number].name}, phase={action.phase}, content={action.content}")
+        if self._subscribers:
+            self._emit(events.ActionActed(action))
 
         act_in_phase = {
             "PROV": self.act_prov,
@@ -132,36 +198,128 @@ class MarjaPussi():
         assert action.player_number == self.player_at_turn.number, \
             "mismanaged players, the wrong person might be at turn"
         act_in_phase(action.content)
+        self.version += 1
+        return True
+
+    def push(self, action: Action) -> bool:
+        """
+        Acts the action like act_action, but remembers what it changed, so it can be reverted with pop.
+        Only the state an action can change is recorded (hands, trick, points, phase, player at turn and trump),
+        which makes walking a search tree on one game much cheaper than copying the game for every node.
+        """
+        undo = (action, self.phase, self.player_at_turn, self.playing_player, self.game_value, self.no_one_plays,
+                self.trump, self.pending_talk, len(self.all_trump), len(self.all_actions),
+                len(self.passed_cards["forth"]), len(self.passed_cards["back"]), len(self.tricks),
+                self.tricks[-1].snapshot(), tuple(player.snapshot() for player in self.players))
+        if not self.act_action(action):
+            return False
+        self._undo_stack.append(undo)
         return True
 
+    def pop(self) -> Action:
+        """Reverts the last action that was acted with push and returns it."""
+        if not self._undo_stack:
+            raise IndexError("pop from empty undo stack")
+        (action, self.phase, self.player_at_turn, self.playing_player, self.game_value, self.no_one_plays,
+         self.trump, self.pending_talk, num_trump, num_actions, num_forth, num_back, num_tricks, trick,
+         players) = self._undo_stack.pop()
+        del self.all_trump[num_trump:]
+        del self.all_actions[num_actions:]
+        del self.passed_cards["forth"][num_forth:]
+        del self.passed_cards["back"][num_back:]
+        del self.tricks[num_tricks:]
+        self.tricks[-1].restore(trick)
+        for player, snapshot in zip(self.players, players):
+            player.restore(snapshot)
+        self.version += 1
+        return action
+
+    def is_legal(self, action: Action) -> bool:
+        """Checks if the action is legal right now, without building the list of all legal actions."""
+        if self.phase == "DONE" or action.player_number != self.player_at_turn.number:
+            return False
+        content = action.content
+        if action.phase == "TRCK" and self.phase in ("TRCK", "QUES"):
+            legal = utils.legal_trick_mask(self.player_at_turn.cards.mask, self.tricks[-1],
+                                           first=(self.tricks[0].get_status() != 4))
+            return isinstance(content, Card) and legal >> content.id & 1 == 1
+        if action.phase != self.phase:
+            return False
+        match self.phase:
+            case "PROV" | "PRMO":
+                return isinstance(content, int) and (content == 0 or (
+                    self.game_value < content <= self.rules.max_game_value and (content - self.game_value) % 5 == 0))
+            case "PASS":
+                return content in self.playing_player.partner.cards and content not in self.passed_cards["forth"]
+            case "PBCK":
+                return content in self.playing_player.cards and content not in self.passed_cards["back"]
+            case _:
+                # questions and answers only have a handful of legal actions, which are shared instances
+                return action in self.legal_actions()
+
+    def legal_action_mask(self, out: np.ndarray | None = None) -> np.ndarray:
+        """
+        Returns the legal actions as boolean vector over the action space, see ActionSpace for the layout.
+        If out is given, the mask is written into it instead of a new array.
+        """
+        space = self.action_space
+        if out is None:
+            out = space.new_mask()
+        else:
+            out[:] = False
+        cards = out[:space.bid_offset]
+        match self.phase:
+            case "PROV" | "PRMO":
+                bids = out[space.bid_slice()]
+                bids[0] = True
+                bids[(self.game_value - self.rules.start_game_value) // 5 + 1:] = True
+            case "PASS":
+                mask_to_bools(self.playing_player.partner.cards.mask & ~mask_of(self.passed_cards["forth"]), out=cards)
+            case "PBCK":
+                mask_to_bools(self.playing_player.cards.mask & ~mask_of(self.passed_cards["back"]), out=cards)
+            case "TRCK":
+                mask_to_bools(utils.legal_trick_mask(self.player_at_turn.cards.mask, self.tricks[-1],
+                                                     first=(self.tricks[0].get_status() != 4)), out=cards)
+            case "QUES" | "ANSW" | "ANSA":
+                for action in self.legal_actions():
+                    out[space.encode(action)] = True
+        return out
+
+    def encode_action(self, action: Action) -> int:
+        """Returns the index of the action in the action space."""
+        return self.action_space.encode(action)
+
+    def decode_action(self, index: int) -> Action:
+        """Returns the action of the player at turn for the index in the action space."""
+        return self.action_space.decode(index, self.player_at_turn.number, self.phase)
+
     def legal_prov(self) -> list[Action]:
         actions = [Action(self.player_at_turn.number, "PROV", 000)]
-        for poss_val in range(self.game_value + 5, self.rules["max_game_value"] + 1, 5):
+        for poss_val in range(self.game_value + 5, self.rules.max_game_value + 1, 5):
             actions.append(Action(self.player_at_turn.number, "PROV", poss_val))
         return actions
 
     def act_prov(self, value: int) -> None:
         if value > self.game_value:
             self.game_value = value
-            self.logger.info(
-                f"{self.player_at_turn.name} {MarjaPussi.INFO_MSG['player_says'][self.language]} {value}.")
+            if self._subscribers:
+                self._emit(events.Bid(self.player_at_turn.number, value))
         else:
             self.player_at_turn.still_prov = False
-            self.logger.info(
-                f"{self.player_at_turn.name} {MarjaPussi.INFO_MSG['is_gone'][self.language]}")
+            if self._subscribers:
+                self._emit(events.Folded(self.player_at_turn.number))
         players_still_prov = sum([1 for p in self.players if p.still_prov])
         # more than one player or last player still able to provoke
-        if players_still_prov > 1 or (players_still_prov == 1 and self.game_value == self.rules["start_game_value"]):
+        if players_still_prov > 1 or (players_still_prov == 1 and self.game_value == self.rules.start_game_value):
             self.player_at_turn = self.player_at_turn.next_player
             while not self.player_at_turn.still_prov:
                 self.player_at_turn = self.player_at_turn.next_player
         else:
-            if self.game_value == self.rules["start_game_value"]:
+            if self.game_value == self.rules.start_game_value:
                 # noone took the game
                 self.player_at_turn = self.players[0]
-                self.logger.info(
-                    f"{MarjaPussi.INFO_MSG['noon_plays'][self.language]}. {self.player_at_turn.name} "
-                    f"{MarjaPussi.INFO_MSG['plays'][self.language]}")
+                if self._subscribers:
+                    self._emit(events.NoOnePlays(self.player_at_turn.number))
                 self.phase = "TRCK"
             else:
                 # last prov player takes the game
@@ -170,8 +328,8 @@ class MarjaPussi():
                     p for p in self.players if p.still_prov][0]
                 self.playing_player = self.player_at_turn
                 self.player_at_turn = self.playing_player.partner
-                self.logger.info(
-                    f"{self.playing_player.name} {MarjaPussi.INFO_MSG['takes_the_game'][self.language]} {self.game_value}.")
+                if self._subscribers:
+                    self._emit(events.GameTaken(self.playing_player.number, self.game_value))
                 self.phase = "PASS"
 
     def legal_pass(self) -> list[Action]:
@@ -186,9 +344,8 @@ class MarjaPussi():
         if len(self.passed_cards["forth"]) < 4:
             self.passed_cards["forth"].append(card)
         if len(self.passed_cards["forth"]) == 4:
-            self.logger.debug(
-                f"{self.player_at_turn.name} {MarjaPussi.INFO_MSG['gives'][self.language]} {utils.cards_str(self.passed_cards['forth'], fancy=self.fancy)} "
-                f"{MarjaPussi.INFO_MSG['forth'][self.language]}.")
+            if self._subscribers:
+                self._emit(events.CardsPassed(self.player_at_turn.number, tuple(self.passed_cards["forth"]), back=False))
             for c in self.passed_cards["forth"]:
                 self.playing_player.give_card(c)
                 self.playing_player.partner.take_card(c)
@@ -207,22 +364,19 @@ class MarjaPussi():
         if len(self.passed_cards["back"]) < 4:
             self.passed_cards["back"].append(card)
         if len(self.passed_cards["back"]) == 4:
-            self.logger.debug(
-                f"{self.player_at_turn.name} {MarjaPussi.INFO_MSG['gives'][self.language]} "
-                f"{utils.cards_str(self.passed_cards['back'], fancy=self.fancy)} "
-                f"{MarjaPussi.INFO_MSG['back'][self.language]}.")
+            if self._subscribers:
+                self._emit(events.CardsPassed(self.player_at_turn.number, tuple(self.passed_cards["back"]), back=True))
             for c in self.passed_cards["back"]:
                 self.playing_player.take_card(c)
                 self.playing_player.partner.give_card(c)
             self.player_at_turn = self.playing_player
-            self.logger.info(
-                f"{self.player_at_turn.name} {MarjaPussi.INFO_MSG['and'][self.language]} "
-                f"{self.player_at_turn.partner.name} {MarjaPussi.INFO_MSG['passed_cards'][self.language]}")
+            if self._subscribers:
+                self._emit(events.PassingDone(self.playing_player.number))
             self.phase = "PRMO"
 
     def legal_prmo(self) -> list[Action]:
         actions = [Action(self.player_at_turn.number, "PRMO", 0)]
-        for poss_val in range(self.game_value + 5, self.rules["max_game_value"] + 1, 5):
+        for poss_val in range(self.game_value + 5, self.rules.max_game_value + 1, 5):
             actions.append(Action(self.player_at_turn.number, "PRMO", poss_val))
         return actions
 
@@ -230,22 +384,20 @@ class MarjaPussi():
         value = int(value)
         if value > self.game_value:
             self.game_value = value
-            self.logger.info(
-                f"{self.playing_player.name} {MarjaPussi.INFO_MSG['raises_to'][self.language]} {value}.")
-        else:
-            self.logger.info(
-                f"{self.playing_player.name} {MarjaPussi.INFO_MSG['plays_for'][self.language]} {self.game_value}.")
+            if self._subscribers:
+                self._emit(events.GameValueRaised(self.playing_player.number, value))
+        elif self._subscribers:
+            self._emit(events.GameValueKept(self.playing_player.number, self.game_value))
         self.phase = "TRCK"
 
     def legal_trck(self) -> list[Action]:
         return [Action(self.player_at_turn.number, "TRCK", card) for card in
-                utils.allowed_general(self.player_at_turn.cards, self.tricks[-1],
-                                      first=(self.tricks[0].get_status() != 4))]
+                iter_mask(utils.legal_trick_mask(self.player_at_turn.cards.mask, self.tricks[-1],
+                                                 first=(self.tricks[0].get_status() != 4)))]
 
     def act_trck(self, card: Card) -> None:
-        self.logger.info(
-            f"{self.players_dict[self.player_at_turn.number].name} {MarjaPussi.INFO_MSG['plays'][self.language]} "
-            f"{str(card)}.")
+        if self._subscribers:
+            self._emit(events.CardPlayed(self.player_at_turn.number, card))
         self.phase = 'TRCK'
         self.player_at_turn.take_card(card)
         # first not over
@@ -254,15 +406,10 @@ class MarjaPussi():
         # trick over
         if self.tricks[-1].get_status() == 4:
             # find the player who won the trick
-            for c in self.tricks[-1].cards:
-                if c == self.tricks[-1].high_card:
-                    break
+            for _ in range(self.tricks[-1].high_card_idx):
                 self.player_at_turn = self.player_at_turn.next_player
-            self.logger.info(
-                f"{MarjaPussi.INFO_MSG['trick'][self.language]} {len(self.tricks)}: "
-                f"{utils.cards_str(self.tricks[-1].cards, fancy=self.fancy)} "
-                f"{MarjaPussi.INFO_MSG['goes_to'][self.language]} {self.player_at_turn.name}."
-            )
+            if self._subscribers:
+                self._emit(events.TrickWon(len(self.tricks), tuple(self.tricks[-1].cards), self.player_at_turn.number))
             self.player_at_turn.take_trick(
                 self.tricks[-1], last=len(self.tricks) == len(self.card_pool.cards) / 4)
             self.phase = "QUES"
@@ -289,31 +436,29 @@ class MarjaPussi():
         if ques.pronoun == "my":
             self.trump = col = ques.color
             self.tricks[-1].trump_color = self.trump
-            self.logger.info(
-                f"{self.player_at_turn.name} {MarjaPussi.INFO_MSG['has'][self.language]} "
-                f"{utils.color_str(col, fancy=self.fancy)} {MarjaPussi.INFO_MSG['pair'][self.language]}")
-            self.logger.info(
-                f"{col.fancy_name().capitalize()} {MarjaPussi.INFO_MSG['is_trump'][self.language]}")
+            if self._subscribers:
+                self._emit(events.PairCalled(self.player_at_turn.number, col))
+                self._emit(events.TrumpChanged(col))
             self.player_at_turn.call_trump(col)
             self.all_trump.append(col)
             self.phase = "TRCK"
         if ques.pronoun == "yours":
-            self.logger.info(
-                f"{self.player_at_turn.name} {MarjaPussi.INFO_MSG['asks_for'][self.language]} "
-                f"{MarjaPussi.INFO_MSG['pair'][self.language]}")
+            if self._subscribers:
+                self._emit(events.PairAsked(self.player_at_turn.number))
             self.player_at_turn.asking = 1
+            self.pending_talk = ques
             self.player_at_turn = self.player_at_turn.partner
             self.phase = "ANSW"
         if ques.pronoun == "our":
-            self.logger.info(f"{self.player_at_turn.name} {MarjaPussi.INFO_MSG['asks_for'][self.language]} "
-                             f"{utils.color_str(ques.color, fancy=self.fancy)} "
-                             f"{MarjaPussi.INFO_MSG['half'][self.language]}")
+            if self._subscribers:
+                self._emit(events.HalfAsked(self.player_at_turn.number, ques.color))
             self.player_at_turn.asking = 2
+            self.pending_talk = ques
             self.player_at_turn = self.player_at_turn.partner
             self.phase = "ANSW"
 
     def legal_answer(self) -> list[Action]:
-        quest = self.all_actions[-1].content
+        quest = self.pending_talk
         if quest.pronoun == "yours":
             answ = [Action(self.player_at_turn.number, "ANSW", Talk("my", col)) for col in Color
                     if (utils.contains_col_pair(self.player_at_turn.cards, col) and col not in self.all_trump)]
@@ -330,43 +475,39 @@ class MarjaPussi():
         # partner has no pair
         match answ.pronoun:
             case "nmy":
-                self.logger.info(
-                    f"{self.player_at_turn.name} {MarjaPussi.INFO_MSG['no_pair'][self.language]}")
+                if self._subscribers:
+                    self._emit(events.NoPair(self.player_at_turn.number))
             # partner has a pair
             case "my":
                 self.trump = answ.color
                 self.tricks[-1].trump_color = self.trump
-                self.logger.info(
-                    f"{self.player_at_turn.name} {MarjaPussi.INFO_MSG['has'][self.language]} "
-                    f"{utils.color_str(self.trump, fancy=self.fancy)} {MarjaPussi.INFO_MSG['pair'][self.language]}")
+                if self._subscribers:
+                    self._emit(events.PairCalled(self.player_at_turn.number, self.trump))
                 self.player_at_turn.call_trump(self.trump)
             # partner has a half
             case "ou":
-                pot_trump = answ.color
-                self.logger.info(
-                    f"{self.player_at_turn.name} {MarjaPussi.INFO_MSG['has'][self.language]} "
-                    f"{utils.color_str(pot_trump, fancy=self.fancy)} {MarjaPussi.INFO_MSG['half'][self.language]}")
+                self.pending_talk = answ
+                if self._subscribers:
+                    self._emit(events.HalfAnswered(self.player_at_turn.number, answ.color, has_half=True))
                 self.player_at_turn = self.player_at_turn.partner
                 self.phase = "ANSA"
                 return
             # partner doesn't have a half
             case "no":
-                self.logger.info(
-                    f"{self.player_at_turn.name} {MarjaPussi.INFO_MSG['doesnt_have'][self.language]} "
-                    f"{utils.color_str(answ.color, fancy=self.fancy)} {MarjaPussi.INFO_MSG['half'][self.language]}")
+                if self._subscribers:
+                    self._emit(events.HalfAnswered(self.player_at_turn.number, answ.color, has_half=False))
 
         # check if new color is trump
         if self.trump and self.trump not in self.all_trump:
             self.all_trump.append(self.trump)
-            self.logger.info(
-                f"{utils.color_str(self.trump, fancy=self.fancy).capitalize()} "
-                f"{MarjaPussi.INFO_MSG['is_trump'][self.language]}")
+            if self._subscribers:
+                self._emit(events.TrumpChanged(self.trump))
         self.player_at_turn = self.player_at_turn.partner
         self.phase = "TRCK"
 
 
     def legal_anssagen(self) -> list[Action]:
-        answ = self.all_actions[-1].content
+        answ = self.pending_talk
         col = answ.color
         return [Action(self.player_at_turn.number, 'ANSA',
                        Talk('we', col) if utils.contains_col_half(self.player_at_turn.cards, col) else Talk('nwe',
@@ -378,49 +519,185 @@ class MarjaPussi():
             self.trump = pot_trump
             self.tricks[-1].trump_color = self.trump
             self.player_at_turn.call_trump(pot_trump)
-            self.logger.info(
-                f"{self.player_at_turn.name} {MarjaPussi.INFO_MSG['has_also'][self.language]} "
-                f"{utils.color_str(pot_trump, fancy=self.fancy)} {MarjaPussi.INFO_MSG['half'][self.language]}")
-            # check if new color is trump
-        if answ.pronoun == 'nwe':
-            self.logger.info(
-                f"{self.player_at_turn.name} {MarjaPussi.INFO_MSG['doesnt_have'][self.language]} "
-                f"{utils.color_str(pot_trump, fancy=self.fancy)} {MarjaPussi.INFO_MSG['half'][self.language]}")
+        if self._subscribers:
+            self._emit(events.HalfCompleted(self.player_at_turn.number, pot_trump, has_half=answ.pronoun == 'we'))
+        # check if new color is trump
         if self.trump and self.trump not in self.all_trump:
             self.all_trump.append(self.trump)
-            self.logger.info(
-                f"{utils.color_str(self.trump, fancy=self.fancy).capitalize()} "
-                f"{MarjaPussi.INFO_MSG['is_trump'][self.language]}")
+            if self._subscribers:
+                self._emit(events.TrumpChanged(self.trump))
         self.phase = "TRCK"
 
     def eval_game(self) -> None:
-        self.logger.info(MarjaPussi.INFO_MSG["game_done"][self.language])
+        if not self._subscribers:
+            return
         if self.no_one_plays:
+            self._emit(events.GameDone(True, self.game_value, 0, 0))
             return
-        playing, partner = self.playing_player, self.playing_player.partner
-        self.logger.info(
-            f"{playing.name} {MarjaPussi.INFO_MSG['and'][self.language]} {partner.name}: {playing.points_made}+"
-            f"{partner.points_made}={(pl := playing.points_made + partner.points_made)}")
-        notplay, noplaypart = self.playing_player.next_player, self.playing_player.next_player.partner
-        self.logger.info(
-            f"{notplay.name} {MarjaPussi.INFO_MSG['and'][self.language]} {noplaypart.name}: {notplay.points_made}+"
-            f"{noplaypart.points_made}={(npl := notplay.points_made + noplaypart.points_made)}")
-
-        if not self.no_one_plays:
-            self.logger.info(
-                f"{MarjaPussi.INFO_MSG['playing_party'][self.language]}: {pl}/{self.game_value}")
-            if pl >= self.game_value:
-                self.logger.info(utils.bold_str(
-                    MarjaPussi.INFO_MSG['win'][self.language], fancy=self.fancy))
-            else:
-                self.logger.info(utils.bold_str(
-                    MarjaPussi.INFO_MSG['loose'][self.language], fancy=self.fancy))
-        else:
-            self.logger.info("There are only losers this round.")
+        playing, notplay = self.playing_player, self.playing_player.next_player
+        self._emit(events.GameDone(False, self.game_value, playing.points_made + playing.partner.points_made,
+                                   notplay.points_made + notplay.partner.points_made))
+
+    def to_bytes(self) -> bytes:
+        """
+        Returns a snapshot of the game state with a fixed layout of a few dozen bytes, which can be loaded with
+        from_bytes. The rules, the names and the history of actions are not part of the snapshot.
+        """
+        owners = 0
+        for player in self.players:
+            for card in iter_mask(player.cards.mask):
+                owners |= player.number << (2 * card.id)
+        winners = {id(trick): player.number for player in self.players for trick in player.tricks}
+        tricks = [TRUMP_INDEX[trick.trump_color] << 4 | winners.get(id(trick), 0) for trick in self.tricks]
+        flags = sum(1 << player.number for player in self.players if player.still_prov) | self.no_one_plays << 4
+        asking = sum(player.asking << (2 * player.number) for player in self.players)
+        calls = sum(1 << (4 * player.number + COLORS.index(col)) for player in self.players for col in player.trump_calls)
+        played = [card.id for trick in self.tricks for card in trick.cards]
+        forth, back = self.passed_cards["forth"], self.passed_cards["back"]
+        return _SNAPSHOT.pack(
+            _SNAPSHOT_VERSION, PHASES.index(self.phase), self.player_at_turn.number,
+            self.playing_player.number if self.playing_player else -1, self.game_value, flags, asking,
+            TRUMP_INDEX[self.trump], self.pending_talk.id if self.pending_talk else _NONE, calls,
+            owners.to_bytes(9, "little"), len(forth), _pad([card.id for card in forth], 4),
+            len(back), _pad([card.id for card in back], 4), len(self.all_trump),
+            _pad([COLORS.index(col) for col in self.all_trump], 4), len(played), _pad(played, 36), _pad(tricks, 9),
+            *(player.points_made for player in self.players))
+
+    @classmethod
+    def from_bytes(cls, data: bytes, player_names: list[str], override_rules=None, log=False, fancy=True,
+                   language=1) -> "MarjaPussi":
+        """Restores a game from a snapshot of to_bytes, the history of actions starts empty."""
+        (version, phase, at_turn, playing, game_value, flags, asking, trump, pending, calls, owners, num_forth, forth,
+         num_back, back, num_trump, all_trump, num_played, played, tricks, *points) = _SNAPSHOT.unpack(data)
+        if version != _SNAPSHOT_VERSION:
+            raise ValueError(f"Unknown snapshot version {version}.")
+        owners = int.from_bytes(owners, "little")
+        played = played[:num_played]
+        forth, back = forth[:num_forth], back[:num_back]
+        hands = [0] * 4
+        for card_id in range(len(CARDS)):
+            hands[owners >> (2 * card_id) & 3] |= 1 << card_id
+        played_mask = mask_of(CARDS[card_id] for card_id in played)
+        hands = [hand & ~played_mask for hand in hands]
+
+        # undo the tricks and the passing to get the dealt hands, the first trick is started by the playing player
+        original = hands.copy()
+        starter = playing if playing >= 0 else 0
+        for trick_num in range(0, num_played, 4):
+            for pos, card_id in enumerate(played[trick_num:trick_num + 4]):
+                original[(starter + pos) % 4] |= 1 << card_id
+            starter = tricks[trick_num // 4] & 0xF
+        if playing >= 0:
+            partner = (playing + 2) % 4
+            if num_back == 4:
+                original[playing] |= mask_of(CARDS[card_id] for card_id in back)
+                original[partner] &= ~mask_of(CARDS[card_id] for card_id in back)
+            if num_forth == 4:
+                original[partner] |= mask_of(CARDS[card_id] for card_id in forth)
+                original[playing] &= ~mask_of(CARDS[card_id] for card_id in forth)
+
+        game = cls(player_names, override_rules, log=log, fancy=fancy, language=language,
+                   deal=[list(iter_mask(mask)) for mask in original])
+        game.phase = PHASES[phase]
+        game.player_at_turn = game.players[at_turn]
+        game.playing_player = game.players[playing] if playing >= 0 else None
+        game.game_value = game_value
+        game.no_one_plays = bool(flags >> 4 & 1)
+        game.trump = _TRUMP_OF_INDEX[trump]
+        game.pending_talk = Talk.from_id(pending) if pending != _NONE else None
+        game.all_trump = [COLORS[idx] for idx in all_trump[:num_trump]]
+        game.passed_cards = {"forth": [CARDS[card_id] for card_id in forth],
+                             "back": [CARDS[card_id] for card_id in back]}
+        call_order = game.all_trump + [col for col in COLORS if col not in game.all_trump]
+        for player in game.players:
+            player.cards.set_mask(hands[player.number])
+            player.still_prov = bool(flags >> player.number & 1)
+            player.asking = asking >> (2 * player.number) & 3
+            player.points_made = points[player.number]
+            player.trump_calls = [col for col in call_order if calls >> (4 * player.number + COLORS.index(col)) & 1]
+        # after the last trick no new trick is started
+        num_tricks = num_played // 4 if game.phase == "DONE" else num_played // 4 + 1
+        game.tricks = []
+        for trick_num in range(num_tricks):
+            trick = Trick(_TRUMP_OF_INDEX[tricks[trick_num] >> 4])
+            for card_id in played[4 * trick_num:4 * trick_num + 4]:
+                trick.play_card(CARDS[card_id])
+            if trick.get_status() == 4:
+                game.players[tricks[trick_num] & 0xF].tricks.append(trick)
+            game.tricks.append(trick)
+        game._reset_versions()
+        return game
 
     def players_cards(self):
         return {player.name: [str(card) for card in player.cards] for player in self.players}
 
+    def _version_state(self) -> tuple:
+        return (self.phase, self.player_at_turn.number, self.playing_player.number if self.playing_player else -1,
+                self.game_value, self.trump, len(self.tricks), tuple(self.tricks[-1].cards),
+                tuple(player.cards.mask for player in self.players),
+                tuple(player.points_made for player in self.players))
+
+    def _reset_versions(self) -> None:
+        self.version = 0
+        # snapshots of the state by version, only taken for the versions changes_since was asked at, so games
+        # without readers only count the versions
+        self._versions: dict[int, tuple] = {0: self._version_state()}
+
+    def _remember_version(self) -> None:
+        if self.version not in self._versions:
+            if len(self._versions) >= _VERSION_HISTORY:
+                del self._versions[next(iter(self._versions))]
+            self._versions[self.version] = self._version_state()
+
+    def changes_since(self, version: int) -> dict:
+        """
+        Returns the fields of the state that changed since the given version (the version increases with every
+        action): "game_phase", "player_at_turn", "playing_player", "game_value", "trump_color", "cards_removed" and
+        "cards_added" (by player name), "trick_num" and "current_trick" if a new trick started, otherwise
+        "trick_cards_added", and "points" of the players whose points changed. Cards are given as strings.
+        Only versions that changes_since returned before (and the first one) can be diffed against, for any other
+        version the full state_dict is returned with "full" set.
+        """
+        if version > self.version or version < 0:
+            raise ValueError(f"Unknown version {version}, the current version is {self.version}.")
+        old = self._versions.get(version)
+        self._remember_version()
+        if old is None:
+            return {"version": self.version, "full": True} | self.state_dict()
+        (phase, at_turn, playing, game_value, trump, num_tricks, trick, hands, points) = old
+        changes: dict = {"version": self.version}
+        if phase != self.phase:
+            changes["game_phase"] = self.phase
+        if at_turn != self.player_at_turn.number:
+            changes["player_at_turn"] = self.player_at_turn.name
+        if playing != (self.playing_player.number if self.playing_player else -1):
+            changes["playing_player"] = self.playing_player.name if self.playing_player else None
+        if game_value != self.game_value:
+            changes["game_value"] = self.game_value
+        if trump != self.trump:
+            changes["trump_color"] = self.trump
+        removed, added = {}, {}
+        for player, mask in zip(self.players, hands):
+            if mask & ~player.cards.mask:
+                removed[player.name] = [str(card) for card in iter_mask(mask & ~player.cards.mask)]
+            if player.cards.mask & ~mask:
+                added[player.name] = [str(card) for card in iter_mask(player.cards.mask & ~mask)]
+        if removed:
+            changes["cards_removed"] = removed
+        if added:
+            changes["cards_added"] = added
+        current_trick = self.tricks[-1].cards
+        if num_tricks != len(self.tricks) or tuple(current_trick[:len(trick)]) != trick:
+            changes["trick_num"] = len(self.tricks)
+            changes["current_trick"] = [str(card) for card in current_trick]
+        elif len(current_trick) > len(trick):
+            changes["trick_cards_added"] = [str(card) for card in current_trick[len(trick):]]
+        changed_points = {player.name: player.points_made for player, old in zip(self.players, points)
+                          if player.points_made != old}
+        if changed_points:
+            changes["points"] = changed_points
+        return changes
+
     def state_dict(self):
         return {
             "players_names": [player.name for player in self.players],
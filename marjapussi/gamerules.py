@@ -1,4 +1,7 @@
 from enum import Enum
+from functools import lru_cache
+
+import numpy as np
 
 
 class CardPoints(Enum):
@@ -18,12 +21,70 @@ class CardPoints(Enum):
     Sechs = 0
 
 
-class GameRules:
-    def __init__(self):
-        self.start_game_value = 115
-        self.max_game_value = 420
-        self.points = CardPoints
-        self.start_phase = "PROV"
-        self.bonus = 300
-        self.bonus_trigger = 500
-        self.total_rounds = 8
+# points by symbol like in the rules of MarjaPussi: pair colors, card values and "L" for the last trick
+DEFAULT_POINTS: dict[str, int] = {symb: CardPoints[name].value for symb, name in zip(
+    "rsegAZKOU9876L", ["Rot", "Schell", "Eichel", "Gruen", "Ass", "Zehn", "Koenig", "Ober", "Unter",
+                       "Neun", "Acht", "Sieben", "Sechs", "L"])}
+# symbols in the order of card ids (card id = color index * 9 + rank), see marjapussi.card
+_COLOR_SYMBOLS = "gesr"
+_VALUE_SYMBOLS = "6789UOKZA"
+
+
+class CompiledRules:
+    """
+    The rules of a game compiled once into flat tables, the one rules object read by the engines, the game states,
+    the policies and matches: card_points[card_id] (also as numpy array points_array), pair_points[color_idx], the
+    bid ladder and the last trick bonus, and the match rules total_rounds, bonus and bonus_trigger (see Match).
+    mask_points sums the points of the cards in a card mask with one lookup per color.
+    Use compile_rules to get the shared instance of a set of rules.
+    """
+
+    def __init__(self, start_game_value: int = 115, max_game_value: int = 420, points: dict[str, int] | None = None,
+                 start_phase: str = "PROV", total_rounds: int = 8, bonus: int = 300, bonus_trigger: int = 500) -> None:
+        points = DEFAULT_POINTS | (points or {})
+        self.start_game_value = start_game_value
+        self.max_game_value = max_game_value
+        self.start_phase = start_phase
+        self.total_rounds = total_rounds
+        self.bonus = bonus
+        self.bonus_trigger = bonus_trigger
+        self.card_points: tuple[int, ...] = tuple(points[val] for _ in _COLOR_SYMBOLS for val in _VALUE_SYMBOLS)
+        self.points_array = np.array(self.card_points, dtype=np.int32)
+        self.pair_points: tuple[int, ...] = tuple(points[col] for col in _COLOR_SYMBOLS)
+        self.pair_points_array = np.array(self.pair_points, dtype=np.int32)
+        self.last_trick_bonus: int = points["L"]
+        self.bids: tuple[int, ...] = tuple(range(start_game_value + 5, max_game_value + 1, 5))
+        # points of every subset of the 9 cards of a color, indexed by the 9 bit mask of the ranks
+        rank_sums = [0] * 512
+        for ranks in range(1, 512):
+            low = ranks & -ranks
+            rank_sums[ranks] = rank_sums[ranks ^ low] + points[_VALUE_SYMBOLS[low.bit_length() - 1]]
+        self._rank_sums = tuple(rank_sums)
+
+    def mask_points(self, mask: int) -> int:
+        sums = self._rank_sums
+        return sums[mask & 511] + sums[mask >> 9 & 511] + sums[mask >> 18 & 511] + sums[mask >> 27 & 511]
+
+
+# the entries of a rules dict, see compile_rules
+RULE_KEYS = ("start_game_value", "max_game_value", "points", "start_phase", "total_rounds", "bonus", "bonus_trigger")
+
+
+@lru_cache(maxsize=None)
+def _compiled(rules: tuple) -> CompiledRules:
+    return CompiledRules(**{key: dict(value) if key == "points" else value for key, value in rules})
+
+
+def compile_rules(rules: dict | CompiledRules | None = None) -> CompiledRules:
+    """
+    Returns the shared CompiledRules of a rules dict with entries of RULE_KEYS (missing entries are the defaults,
+    other entries are ignored). CompiledRules are returned as they are.
+    """
+    if isinstance(rules, CompiledRules):
+        return rules
+    rules = rules or {}
+    return _compiled(tuple((key, tuple(sorted(rules[key].items())) if key == "points" else rules[key])
+                           for key in RULE_KEYS if rules.get(key) not in (None, {})))
+
+
+DEFAULT_RULES: CompiledRules = compile_rules()
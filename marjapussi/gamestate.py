@@ -1,36 +1,43 @@
-from marjapussi.card import Card, Deck, Color, Value
-from marjapussi.gamerules import GameRules
-from marjapussi.trick import Trick
+from marjapussi.card import Card, Color, Value, CARDS
+from marjapussi.cardset import CardSet, FULL_MASK, COLOR_MASKS, mask_of
+from marjapussi.gamerules import CompiledRules, compile_rules
+from marjapussi.trick import Trick, BEATS, TRUMP_INDEX
 from marjapussi.action import Talk, Action
-from marjapussi.utils import higher_cards, all_color_cards, all_value_cards, standing_in_suite, \
-    calculate_set_in_3set_probability, pairs, small_pairs, big_pairs
+from marjapussi.utils import standing_in_suite, pairs, pair_colors, SMALL_PAIR_COLORS, \
+    BIG_PAIR_COLORS, ACE_MASK, GREEN_MASK, PAIR_MASKS
 from marjapussi.concept import Concept, ConceptStore
+from marjapussi.probability import CardDistribution
 import numpy as np
 
 
+# channels of GameState.knowledge
+IMPOSSIBLE, POSSIBLE, SECURE, PROBABILITY = range(4)
+_MASK_BYTES = (len(CARDS) + 7) // 8
+
+
 class GameState:
-    def __init__(self, name: str, all_players: list[str], start_cards: list[Card], opponent_policy: type):
+    def __init__(self, name: str, all_players: list[str], start_cards: list[Card], opponent_policy: type,
+                 rules: CompiledRules | None = None):
         self.name = name    # name of the gamestate owner
         self.player_num = all_players.index(name)  # number of the gamestate owner
-        self.game_rules = GameRules()
+        self.rules = rules or compile_rules()  # the rules of the game, shared with the engine
         self.provoking_history: list[Action] = []
-        self.game_value = self.game_rules.start_game_value
+        self.game_value = self.rules.start_game_value
         self.current_trick = Trick()
         self.playing_party = None
         self.all_tricks = []
         self.concepts: ConceptStore = ConceptStore()
         self.points = {player: 0 for player in all_players}
-        self.possible_cards = {player: set() if player == name else set(Deck().cards).difference(start_cards)
+        start_set = CardSet(start_cards)
+        self.possible_cards = {player: CardSet() if player == name else CardSet.from_mask(FULL_MASK) - start_set
                                for player in all_players}
-        self.possible_cards_probabilities = {player: set() if player == name else
-        set(Deck().cards).difference(start_cards) for player in all_players}
-        self.secure_cards = {player: set(start_cards) if player == name else set() for player in all_players}
+        self.secure_cards = {player: start_set if player == name else CardSet() for player in all_players}
         self.playing_player = ''
         self.asking_status = {player: 0 for player in all_players}
         self.all_players = all_players
         self.actions: list[Action] = []
         self.phase = 'PROV'
-        self.cards_left = set(Deck().cards)
+        self.cards_left = CardSet.from_mask(FULL_MASK)
         self.player_cards_left: list[int] = [int(len(self.cards_left) / len(self.all_players)) for i in
                                              range(len(self.all_players))]
         self.opponent_policy = opponent_policy
@@ -39,12 +46,48 @@ class GameState:
         self.to_communicate = []    # list of all infos in the original hand cards that we want to communicate
         self.got_cards_passed: list[Card] = []
         self.passed_cards: list[Card] = []
+        self.all_trump: list[Color] = []  # colors that have been trump, in order
+        self.played_cards: list[int] = [0] * len(all_players)  # mask of the cards every player played
+        # answers about halves as (player_num, pair mask, cards the player had played before, at least one or not all)
+        self.half_constraints: list[tuple[int, int, int, bool]] = []
+        # the possible and secure masks after the last _set_logic_check, to find what changed since
+        self._checked = (tuple(self.possible_cards[player].mask for player in all_players),
+                         tuple(self.secure_cards[player].mask for player in all_players))
+        # knowledge[channel, player_num, card_id] mirrors possible_cards and secure_cards (see _sync_knowledge).
+        # The PROBABILITY channel is only valid after card_probabilities() was called since the last change, exact
+        # counting on every action would cost far more than the rest of observing it. Until then it is NaN.
+        self.knowledge = np.zeros((4, len(all_players), len(CARDS)), dtype=np.float32)
+        self._synced: list[int] | None = None
+        self._probabilities_stale = True
+        self._sync_knowledge()
+
+    def fork(self) -> "GameState":
+        """
+        Returns a copy of the state to try actions on, e.g. to see what we would know after a move in a search,
+        without changing this state. Everything that is only ever replaced (card sets, finished tricks, the actions
+        in the lists, the rules) is shared, the containers that are changed in place are copied, the concepts only
+        once one of the two states changes them (see ConceptStore.fork).
+        """
+        child = GameState.__new__(GameState)
+        child.__dict__.update(self.__dict__)
+        child.current_trick = self.current_trick.copy()
+        child.concepts = self.concepts.fork()
+        child.possible_cards = self.possible_cards.copy()
+        child.secure_cards = self.secure_cards.copy()
+        child.asking_status = self.asking_status.copy()
+        for name in ("provoking_history", "all_tricks", "actions", "player_cards_left", "unannouncable_pairs",
+                     "to_communicate", "got_cards_passed", "passed_cards", "all_trump", "played_cards",
+                     "half_constraints"):
+            setattr(child, name, getattr(self, name).copy())
+        # the tensor is small and changes with almost every action, so it is copied right away
+        child.knowledge = self.knowledge.copy()
+        return child
 
     def small_pairs_on_hand(self) -> list[Color]:
-        return [pair.pop().color for pair in small_pairs() if pair.issubset(self.hand_cards)]
+        return pair_colors(self.hand_cards, SMALL_PAIR_COLORS)
     
     def big_pairs_on_hand(self) -> list[Color]:
-        return [pair.pop().color for pair in big_pairs() if pair.issubset(self.hand_cards)]
+        return pair_colors(self.hand_cards, BIG_PAIR_COLORS)
     
     def pairs_on_hand(self) -> list[Color]:
         return self.small_pairs_on_hand() + self.big_pairs_on_hand()
@@ -71,16 +114,15 @@ class GameState:
         """
         secures = []
         # first check if there is one or more pairs in the hand cards
-        for pair in pairs():
-            if pair.issubset(self.hand_cards):
-                secures.append(("MY", pair.pop().color))
+        for color in pair_colors(self.hand_cards):
+            secures.append(("MY", color))
         # now check if the partner announced a pair or if we passed him one
         # TODO
 
     def _set_secure_card(self, card: Card, player_name: str) -> None:
-        self.secure_cards[player_name].add(card)
+        self.secure_cards[player_name] = self.secure_cards[player_name] | card
         for player in self.all_players:
-            self.possible_cards[player].discard(card)
+            self.possible_cards[player] = self.possible_cards[player] - card
 
     def play_card(self, card_played: Card, player_num: int):
         # do the action on the agents representation of the trick
@@ -88,14 +130,22 @@ class GameState:
         # assert card_played in (self.possible_cards[player_name] | self.secure_cards[player_name]), \
         #     (f"Card has to be possible for player {self.name}'s view, if it is played. Cards still possible:"
         #      f" {[str(card) for card in (self.possible_cards[player_name] | self.secure_cards[player_name])]}")
+        # the cards the player would have had to play instead, before the card changes the trick
+        voids = self._follow_suit_voids(card_played)
         self.current_trick.play_card(card_played, player_num)
 
         # remove the card played from all players, it is no longer in the game
-        self.cards_left.discard(card_played)
+        self.cards_left = self.cards_left - card_played
         self.player_cards_left[player_num] -= 1
+        card_bit = 1 << card_played.id
+        self.played_cards[player_num] |= card_bit
         for player in self.all_players:
-            self.possible_cards[player].discard(card_played)
-            self.secure_cards[player].discard(card_played)
+            if self.possible_cards[player].mask & card_bit:
+                self.possible_cards[player] = CardSet.from_mask(self.possible_cards[player].mask & ~card_bit)
+            if self.secure_cards[player].mask & card_bit:
+                self.secure_cards[player] = CardSet.from_mask(self.secure_cards[player].mask & ~card_bit)
+        if voids & self.possible_cards[player_name].mask:
+            self.possible_cards[player_name] = CardSet.from_mask(self.possible_cards[player_name].mask & ~voids)
 
         # apply game logic to deduct information from players pairs and halves in combination with the played card
         self._pair_concepts_check(player_name, card_played)
@@ -146,96 +196,109 @@ class GameState:
         return steps
 
     def pass_card(self, card_pass: Card, player_name: str, player_num: int, partner_num: int):
-        self.secure_cards[player_name].discard(card_pass)
-        self.possible_cards[player_name].discard(card_pass)
+        self.secure_cards[player_name] = self.secure_cards[player_name] - card_pass
+        self.possible_cards[player_name] = self.possible_cards[player_name] - card_pass
         self._set_secure_card(card_pass, self.all_players[partner_num])
-        self.possible_cards[self.all_players[(player_num + 1) % 4]].discard(card_pass)
-        self.possible_cards[self.all_players[(partner_num + 1) % 4]].discard(card_pass)
+        self.remove_possibles(self.all_players[(player_num + 1) % 4], card_pass)
+        self.remove_possibles(self.all_players[(partner_num + 1) % 4], card_pass)
+        self._sync_knowledge()
 
     def ask_question(self, question: Talk, player_name: str):
         match question.pronoun:
             case "my":
-                self.current_trick.trump_color = question.color
+                # only a player with the pair can call it
+                self._set_secure_card(Card(question.color, Value.Koenig), player_name)
+                self._set_secure_card(Card(question.color, Value.Ober), player_name)
+                self._set_trump(question.color)
             case "our":
                 self.asking_status[player_name] = 2
             case "yours":
                 self.asking_status[player_name] = 1
+        self._sync_knowledge()
 
-    def remove_possibles(self, player_name, diff_list: list[Card] | set[Card]) -> None:
-        self.possible_cards[player_name] = self.possible_cards[player_name].difference(set(diff_list))
+    def remove_possibles(self, player_name, diff_list: list[Card] | set[Card] | CardSet | Card) -> None:
+        self.possible_cards[player_name] = self.possible_cards[player_name] - diff_list
+
+    def _set_trump(self, color: Color) -> None:
+        self.current_trick.trump_color = color
+        if color not in self.all_trump:
+            self.all_trump.append(color)
+
+    def _add_half_constraint(self, player_name: str, color: Color, at_least_one: bool) -> None:
+        """The player has at least one half of the pair of the color, or not both halves if at_least_one is False."""
+        player_num = self.all_players.index(player_name)
+        self.half_constraints.append((player_num, PAIR_MASKS[color], self.played_cards[player_num], at_least_one))
+        # no secure mask is -1, so the next _set_logic_check looks at the player again
+        checked_poss, checked_sec = self._checked
+        self._checked = (checked_poss, checked_sec[:player_num] + (-1,) + checked_sec[player_num + 1:])
 
     def answer_question(self, answer: Talk, player_name: str):
         match answer.pronoun:
             case "nmy":
                 self.concepts.add(Concept(f"{player_name}_has_no_pair",
                                           {"player": player_name, "info_type": "no_pair"}))
+                # pairs of colors that were trump already don't count
+                for color in Color:
+                    if color not in self.all_trump:
+                        self._add_half_constraint(player_name, color, False)
             case "no":
-                pair = {Card(answer.color, Value.Koenig), Card(answer.color, Value.Ober)}
+                pair = CardSet((Card(answer.color, Value.Koenig), Card(answer.color, Value.Ober)))
                 self.remove_possibles(player_name, pair)
             case "my":
                 # we know now exactly where these two cards are!
                 self._set_secure_card(Card(answer.color, Value.Koenig), player_name)
                 self._set_secure_card(Card(answer.color, Value.Ober), player_name)
-                self.current_trick.trump_color = answer.color
+                self._set_trump(answer.color)
                 self.concepts.add(Concept(f"{player_name}_has_{answer.color}_pair",
                                           {"color": answer.color, "player": player_name, "info_type": "pair"}))
                 self.unannouncable_pairs.append(answer.color)
             case "ou":
-                pair = {Card(answer.color, Value.Koenig), Card(answer.color, Value.Ober)}
-                poss_update = self.possible_cards[player_name].intersection(pair)
-                if len(poss_update) == 1:
-                    self._set_secure_card(poss_update.pop(), player_name)
-                else:
+                # the color only becomes trump if the partner has the other half (see announce_ansage)
+                self._add_half_constraint(player_name, answer.color, True)
+                if not self.secure_cards[player_name].mask & PAIR_MASKS[answer.color]:
                     self.concepts.add(Concept(f"{player_name}_has_{str(answer.color)}_half",
                                               {"color": answer.color, "player": player_name, "info_type": "half"}))
-                self.current_trick.trump_color = answer.color
                 self.unannouncable_pairs.append(answer.color)
         self._set_logic_check()
 
     def announce_ansage(self, ansage: Talk, player_name: str):
-        pair = {Card(ansage.color, Value.Koenig), Card(ansage.color, Value.Ober)}
+        pair = CardSet((Card(ansage.color, Value.Koenig), Card(ansage.color, Value.Ober)))
         match ansage.pronoun:
             case 'we':
-                poss_update = (self.possible_cards[player_name] | self.secure_cards[player_name]).intersection(pair)
-                if len(poss_update) == 1:
-                    self.remove_possibles(player_name, pair)
-                    self.secure_cards[player_name].add(poss_update.pop())
-                self.current_trick.trump_color = ansage.color
+                self._add_half_constraint(player_name, ansage.color, True)
+                self._set_trump(ansage.color)
             case 'nwe':
                 self.remove_possibles(player_name, pair)
         self._set_logic_check()
 
-    def _possible_player_cards(self, player_name, trick: Trick) -> None:
+    def _follow_suit_voids(self, card: Card) -> int:
         """
-        player_name: The player who is investigated and updated depending their possible cards they still have
-        trick: The trick he just played a card on, the last card is the players card
+        Returns the mask of the cards the player of card can't have, because the rules (see utils.legal_mask) would
+        have made them play one of those instead of card into the current trick.
         """
-
-        trick_col = trick.base_color
-        trump = trick.trump_color
-        card = trick.cards[-1]
-
-        # first card of first trick needs to be an ace or green, else the player has neither
-        if not self.all_tricks and trick.get_status() == 1:
-            if card.value != Value.Ass:
-                self.remove_possibles(player_name, all_value_cards(Value.Ass))
-                if card.color != Color.Gruen:
-                    self.remove_possibles(player_name, all_color_cards(Color.Gruen))
-
-        # need to always go higher if possible, matching base color first, else the player has no higher cards
-        if card.color == trick_col:
-            # if it's a trump color trick or there is no trump, played cards needs to be high
-            if card != trick.high_card and (trump and (trick_col == trump or trick.high_card.color != trump)):
-                self.remove_possibles(player_name, higher_cards(trick, card_pool=all_color_cards(trick_col)))
-
-        else:  # player can't have same color
-            self.remove_possibles(player_name, all_color_cards(trick_col))
-            if trump:
-                if card.color == trump:
-                    if card != trick.high_card:  # card needs to be high
-                        self.remove_possibles(player_name, higher_cards(trick, card_pool=all_color_cards(trump)))
-                else:  # also doesn't have trump
-                    self.remove_possibles(player_name, all_color_cards(trump))
+        trick = self.current_trick
+        first = not self.all_tricks
+        if trick.high_card is None:
+            # the first card of the game has to be an ace, else green
+            if first and not ACE_MASK >> card.id & 1:
+                return ACE_MASK | (0 if GREEN_MASK >> card.id & 1 else GREEN_MASK)
+            return 0
+        base_idx, trump_idx = trick.cards[0].color_idx, TRUMP_INDEX[trick.trump_color]
+        voids = 0
+        # in the first trick the ace of the base color has to be played
+        if first:
+            voids |= COLOR_MASKS[base_idx] & ACE_MASK & ~(1 << card.id)
+        # base color first, then trump
+        if card.color_idx != base_idx:
+            voids |= COLOR_MASKS[base_idx]
+            if trump_idx < len(COLOR_MASKS) and card.color_idx != trump_idx:
+                voids |= COLOR_MASKS[trump_idx]
+        # and higher than the high card, if there is a higher card of the color played
+        if card.color_idx == base_idx or card.color_idx == trump_idx:
+            beating = BEATS[trump_idx][trick.high_card.id]
+            if not beating >> card.id & 1:
+                voids |= COLOR_MASKS[card.color_idx] & beating
+        return voids
 
     def _pair_concepts_check(self, player_name: str, played_card: Card) -> None:
         """
@@ -256,56 +319,128 @@ class GameState:
                 self.concepts.add(Concept(f"{player_name}_has_2_halves", {}, value=1.0))
 
     def _set_logic_check(self):
-        """ruling out possible cards by simple set logic:"""
-        player_count = len(self.all_players)
-        updated = False
-        while True:
-            poss_card_counts = [self.player_cards_left[player_num] -
-                                len(self.secure_cards[self.all_players[player_num]])
-                                for player_num in range(player_count)]
-            possible_cards = [self.possible_cards[player] for player in self.all_players]
-
-            for i in range(player_count):
-                # check for cards that are only possible for one player:
-                only_for_i = possible_cards[i] - possible_cards[(i + 1) % 4] - \
-                             possible_cards[(i + 2) % 4] - possible_cards[(i + 3) % 4]
-                if only_for_i:
-                    updated = True
-                    for card in only_for_i:
-                        self._set_secure_card(card, self.all_players[i])
-                        poss_card_counts[i] -= 1
-
-                # check if there is a possible card set, that is equal in size to the amount of cards the player has
-                if poss_card_counts[i] != 0 and len(possible_cards[i]) == poss_card_counts[i]:
-                    updated = True
-                    while possible_cards[i]:
-                        self._set_secure_card(possible_cards[i].pop(), self.all_players[i])
-                        poss_card_counts[i] -= 1
-            if not updated:
-                break
-            else:
-                updated = False
-
-    def standing_cards(self, player_name: str = None) -> set[Card]:
+        """
+        Deduces secure and impossible cards until nothing changes anymore:
+        - a card still in the game, that is secure for no one and possible for only one player, is secure for them
+        - if the possible cards of a player are exactly as many as the cards they have besides their secure ones,
+          they are all secure, if they have no other cards, none is possible
+        - the half constraints of the answers to questions (see _add_half_constraint)
+        All of it works on card masks with a worklist: only players whose cards changed since the last check and
+        cards that lost a possible holder are looked at again.
+        """
+        names = self.all_players
+        poss = [self.possible_cards[name].mask for name in names]
+        sec = [self.secure_cards[name].mask for name in names]
+        checked_poss, checked_sec = self._checked
+        work = {num for num in range(len(names)) if poss[num] != checked_poss[num] or sec[num] != checked_sec[num]}
+        dirty = 0  # cards that lost a possible holder
+        for num in range(len(names)):
+            dirty |= checked_poss[num] & ~poss[num]
+        cards_left = self.cards_left.mask
+
+        def secure(num: int, mask: int) -> None:
+            sec[num] |= mask
+            work.add(num)
+            for other in range(len(names)):
+                if poss[other] & mask:
+                    poss[other] &= ~mask
+                    work.add(other)
+
+        def remove(num: int, mask: int) -> None:
+            nonlocal dirty
+            removed = poss[num] & mask
+            if removed:
+                poss[num] ^= removed
+                dirty |= removed
+                work.add(num)
+
+        while work or dirty:
+            while dirty:
+                card = dirty & -dirty
+                dirty ^= card
+                if not cards_left & card or any(mask & card for mask in sec):
+                    continue
+                holders = [num for num in range(len(names)) if poss[num] & card]
+                if len(holders) == 1:
+                    secure(holders[0], card)
+            if not work:
+                continue
+            num = work.pop()
+            missing = self.player_cards_left[num] - sec[num].bit_count()
+            if poss[num] and missing == 0:
+                remove(num, poss[num])
+            elif poss[num] and poss[num].bit_count() == missing:
+                secure(num, poss[num])
+            for player_num, pair, played_before, at_least_one in self.half_constraints:
+                if player_num != num:
+                    continue
+                # the cards of the pair the player had when answering
+                had = (sec[num] | self.played_cards[num] & ~played_before) & pair
+                if at_least_one:
+                    if not had and (poss[num] & pair).bit_count() == 1:
+                        secure(num, poss[num] & pair)
+                elif had and had != pair:
+                    remove(num, pair & ~had)
+
+        for num, name in enumerate(names):
+            if poss[num] != self.possible_cards[name].mask:
+                self.possible_cards[name] = CardSet.from_mask(poss[num])
+            if sec[num] != self.secure_cards[name].mask:
+                self.secure_cards[name] = CardSet.from_mask(sec[num])
+        self._checked = (tuple(poss), tuple(sec))
+        self._sync_knowledge()
+
+    def _sync_knowledge(self) -> None:
+        """
+        Writes the possible and secure cards of all players into the knowledge tensor in place, if any of them
+        changed, and marks the PROBABILITY channel as stale.
+        """
+        masks = [self.possible_cards[name].mask for name in self.all_players]
+        masks += [self.secure_cards[name].mask for name in self.all_players]
+        if masks == self._synced:
+            return
+        raw = np.frombuffer(b"".join([mask.to_bytes(_MASK_BYTES, "little") for mask in masks]), dtype=np.uint8)
+        bits = np.unpackbits(raw.reshape(len(masks), _MASK_BYTES), axis=1, count=len(CARDS), bitorder="little")
+        knowledge = self.knowledge
+        knowledge[POSSIBLE:SECURE + 1] = bits.reshape(2, len(self.all_players), len(CARDS))
+        np.subtract(1, knowledge[POSSIBLE], out=knowledge[IMPOSSIBLE])
+        knowledge[IMPOSSIBLE] -= knowledge[SECURE]
+        self._synced = masks
+        knowledge[PROBABILITY] = np.nan
+        self._probabilities_stale = True
+
+    def card_probabilities(self) -> np.ndarray:
+        """
+        Returns knowledge[PROBABILITY], the probability of every player to have every card, counted exactly over
+        the deals that fit what we know (see CardDistribution). It is only computed again if the known cards changed,
+        readers of the tensor have to call this before they use the channel.
+        """
+        out = self.knowledge[PROBABILITY]
+        if self._probabilities_stale:
+            try:
+                CardDistribution.from_state(self).marginals(out=out)
+            except ValueError:
+                # while cards are passed the card counts don't fit the secure cards, the secure cards are all we know
+                out[:] = self.knowledge[SECURE]
+            self._probabilities_stale = False
+        return out
+
+    def standing_cards(self, player_name: str = None) -> CardSet:
         """Returns all cards for the player_name (by default state owner) which can or could win the trick."""
-        standing_cards = set()
+        standing_cards = CardSet()
         if player_name is None:
             player_name = self.name
         trump = self.current_trick.trump_color
-        if trump:
-            trump_cards = [card for card in self.cards_left if card.color == trump]
 
         potential_player_hand = self.secure_cards[player_name] | self.possible_cards[player_name]
         # If there's a trump suit, only the highest trump cards in hand are standing
-        if trump and trump_cards:
-            trump_cards_in_hand = [card for card in potential_player_hand if card.color == trump]
+        if trump and self.cards_left.bucket(trump):
             return standing_in_suite(self.cards_left, trump, potential_player_hand)
 
         # If no trump or all trump colors are out, check each suit in hand
-        for suit in set(card.color for card in potential_player_hand):
-            # Only consider cards in hand of this suit
-            suit_hand_cards = set([card for card in potential_player_hand if card.color == suit])
-            standing_cards |= standing_in_suite(self.cards_left, suit, suit_hand_cards)
+        for suit in Color:
+            if potential_player_hand.bucket(suit):
+                standing_cards |= standing_in_suite(self.cards_left, suit, potential_player_hand)
 
         return standing_cards
 
@@ -322,27 +457,13 @@ class GameState:
             player_num = self.all_players.index(self.name)
         return (player_num + 2) % 4
 
-    def player_has_set_probability(self, player_name: str, sets: list[set[Card]]):
+    def player_has_set_probability(self, player_name: str, sets: list[set[Card]]) -> float:
         """
-        This function is used for calculating the chance for a small pair being in the hand of player_name
-        before we know any of his cards
-        TODO add combinations with secure cards, so we can use this function in the middle of the game as well!
+        Returns the probability that player_name has all cards of at least one of the sets (e.g. one of some pairs),
+        counted exactly over all deals that fit what we know so far (see CardDistribution).
         """
-        probability = 0
-        player_num = self.all_players.index(player_name)
-        possible_cards = [self.possible_cards[player_name]]
-        hand_card_counts = [self.player_cards_left[player_num]]
-        for player in self.all_players:
-            if player != player_name and player != self.name:
-                possible_cards.append(self.possible_cards[player])
-                hand_card_counts.append(self.player_cards_left[self.all_players.index(player_name)])
-        for asset in sets:
-            probability += calculate_set_in_3set_probability(
-                possible_cards,
-                hand_card_counts,
-                asset,
-                0)
-        return probability
+        distribution = CardDistribution.from_state(self)
+        return distribution.probability_any_set(self.all_players.index(player_name), [mask_of(cards) for cards in sets])
 
     @property
     def hand_cards(self):
@@ -0,0 +1,233 @@
+"""
+Hosting of many concurrent MarjaPussi tables on one asyncio event loop.
+
+Every table owns its game, a bounded inbox for the actions of human players and a task working through it under the
+lock of the table. Bot seats decide with their policy in a bounded thread pool, so slow bots never block the loop,
+and fall back to the first legal action if they don't decide in time or fail. A bot that decides too late plays the
+first legal action until its thread returned, the table never waits for it. After every action each human seat gets
+the changes since the last update (see MarjaPussi.changes_since) through the transport, restricted to its own hand.
+"""
+import asyncio
+import functools
+import operator
+from concurrent.futures import Executor, ThreadPoolExecutor
+from typing import Protocol
+import logging
+
+from marjapussi.action import Action
+from marjapussi.agent import Agent
+from marjapussi.game import MarjaPussi
+from marjapussi.policy import Policy
+
+
+class Transport(Protocol):
+    async def send(self, table_id: str, seat: int, message: dict) -> None:
+        ...
+
+
+class LocalTransport:
+    """Keeps the messages for every seat in bounded in-memory queues, sending waits while a queue is full."""
+
+    def __init__(self, maxsize: int = 256) -> None:
+        self.maxsize = maxsize
+        self.queues: dict[tuple[str, int], asyncio.Queue] = {}
+
+    def queue(self, table_id: str, seat: int) -> asyncio.Queue:
+        key = (table_id, seat)
+        if key not in self.queues:
+            self.queues[key] = asyncio.Queue(self.maxsize)
+        return self.queues[key]
+
+    async def send(self, table_id: str, seat: int, message: dict) -> None:
+        await self.queue(table_id, seat).put(message)
+
+    async def receive(self, table_id: str, seat: int, timeout: float | None = None) -> dict:
+        return await asyncio.wait_for(self.queue(table_id, seat).get(), timeout)
+
+
+class Table:
+    def __init__(self, table_id: str, game: MarjaPussi, bots: dict[int, Agent], inbox_size: int) -> None:
+        self.id = table_id
+        self.game = game
+        self.bots = bots  # agents of the bot seats by seat
+        self.humans = [seat for seat in range(4) if seat not in bots]
+        self.behind: dict[int, list[Action]] = {}  # the actions bots missed while deciding too late, by seat
+        self.lock = asyncio.Lock()
+        self.inbox: asyncio.Queue = asyncio.Queue(inbox_size)
+        self.sent_version = {seat: 0 for seat in self.humans}
+        self.task: asyncio.Task | None = None
+
+
+class TableHost:
+    """
+    Owns the tables and drives their games:
+    open_table starts a game with bots on some seats, submit hands the action of a human seat to its table and
+    waits until it is acted (False if it wasn't legal). A full inbox makes submit wait, which passes the pressure
+    on to the connection. All changes of a game happen under the lock of its table.
+    """
+
+    def __init__(self, transport: Transport | None = None, bot_workers: int = 4, bot_timeout: float = 10.0,
+                 inbox_size: int = 16, executor: Executor | None = None) -> None:
+        self.transport = transport or LocalTransport()
+        self.bot_timeout = bot_timeout
+        self.inbox_size = inbox_size
+        self.executor = executor or ThreadPoolExecutor(max_workers=bot_workers, thread_name_prefix="marjapussi-bot")
+        self._own_executor = executor is None
+        # limits the decisions waiting for the pool, so the pool queue stays bounded as well
+        self._bot_slots = asyncio.Semaphore(bot_workers)
+        self.tables: dict[str, Table] = {}
+        self.logger = logging.getLogger("table_host_logger")
+
+    async def open_table(self, table_id: str, player_names: list[str], bots: dict[int, Policy] | None = None,
+                         **game_kwargs) -> Table:
+        """Starts a game on a new table, bots maps seats to the policies playing them."""
+        if table_id in self.tables:
+            raise ValueError(f"There is already a table {table_id}.")
+        game_kwargs.setdefault("log", False)
+        game = MarjaPussi(player_names, **game_kwargs)
+        bots = bots or {}
+        agents = {seat: Agent(game.players[seat].name, player_names, policy, game.players[seat].cards,
+                              type(policy), rules=game.rules) for seat, policy in bots.items()}
+        table = Table(table_id, game, agents, self.inbox_size)
+        self.tables[table_id] = table
+        async with table.lock:
+            await self._notify(table)
+            await self._play_bots(table)
+        table.task = asyncio.create_task(self._work(table))
+        return table
+
+    async def submit(self, table_id: str, seat: int, action: int | Action, timeout: float | None = None) -> bool:
+        """Hands the action (or its index in the action space) of a human seat to its table, see TableHost."""
+        table = self.tables[table_id]
+        if seat in table.bots:
+            raise ValueError(f"Seat {seat} of table {table_id} is played by a bot.")
+        done = asyncio.get_running_loop().create_future()
+        await asyncio.wait_for(table.inbox.put((seat, action, done)), timeout)
+        return await done
+
+    async def close_table(self, table_id: str) -> None:
+        table = self.tables.pop(table_id)
+        if table.task:
+            table.task.cancel()
+            try:
+                await table.task
+            except asyncio.CancelledError:
+                pass
+
+    async def close(self) -> None:
+        for table_id in list(self.tables):
+            await self.close_table(table_id)
+        if self._own_executor:
+            self.executor.shutdown(wait=False, cancel_futures=True)
+
+    async def _work(self, table: Table) -> None:
+        # no error may end this task, else all later submits to the table would wait forever
+        while True:
+            seat, action, done = await table.inbox.get()
+            async with table.lock:
+                try:
+                    acted = self._act_human(table, seat, action)
+                except Exception as error:
+                    self.logger.exception(f"Action {action!r} of seat {seat} on table {table.id} failed.")
+                    if not done.done():
+                        done.set_exception(error)
+                    continue
+                if not done.done():
+                    done.set_result(acted)
+                if acted:
+                    try:
+                        await self._notify(table)
+                        await self._play_bots(table)
+                    except Exception:
+                        self.logger.exception(f"Table {table.id} failed after the action of seat {seat}.")
+
+    def _act_human(self, table: Table, seat: int, action: int | Action) -> bool:
+        game = table.game
+        if game.phase == "DONE" or game.player_at_turn.number != seat:
+            return False
+        if not isinstance(action, Action):
+            # any integer index, e.g. numpy integers from legal_action_mask, raises TypeError for anything else
+            action = operator.index(action)
+            if not 0 <= action < game.action_space.size:
+                return False
+            action = game.decode_action(action)
+        if not game.is_legal(action):
+            return False
+        self._act(table, action)
+        return True
+
+    def _act(self, table: Table, action: Action) -> None:
+        table.game.act_action(action)
+        for seat, agent in table.bots.items():
+            if seat in table.behind:
+                table.behind[seat].append(action)
+            else:
+                agent.observe_action(action)
+
+    async def _play_bots(self, table: Table) -> None:
+        """Lets the bots act as long as one of them is at turn, the lock of the table has to be held."""
+        game = table.game
+        while game.phase != "DONE" and game.player_at_turn.number in table.bots:
+            seat = game.player_at_turn.number
+            agent = table.bots[seat]
+            legal = game.legal_actions()
+            if seat in table.behind:
+                self.logger.warning(f"{agent} on table {table.id} is still deciding, it plays the first legal action.")
+                action = legal[0]
+            else:
+                action = await self._decide(table, seat, legal)
+            if not isinstance(action, Action) or not game.is_legal(action):
+                self.logger.warning(f"{agent} on table {table.id} chose an illegal action, it plays the first one.")
+                action = legal[0]
+            self._act(table, action)
+            await self._notify(table)
+
+    async def _decide(self, table: Table, seat: int, legal: list[Action]) -> Action:
+        agent = table.bots[seat]
+        await self._bot_slots.acquire()
+        decision = asyncio.get_running_loop().run_in_executor(self.executor, agent.next_action, legal)
+        try:
+            return await asyncio.wait_for(asyncio.shield(decision), self.bot_timeout)
+        except asyncio.TimeoutError:
+            self.logger.warning(f"{agent} on table {table.id} timed out, it plays the first legal action.")
+            # the thread can't be stopped and changes the agent, so the agent doesn't observe the game until it
+            # returned, but the table goes on without waiting for it (see _late_decision_done)
+            table.behind[seat] = []
+            decision.add_done_callback(functools.partial(self._late_decision_done, table, seat))
+            return legal[0]
+        except Exception:
+            self.logger.exception(f"{agent} on table {table.id} failed, it plays the first legal action.")
+            return legal[0]
+        finally:
+            # the slot is held until the thread of the decision returns, also if it is too late
+            if seat not in table.behind:
+                self._bot_slots.release()
+
+    def _late_decision_done(self, table: Table, seat: int, decision: asyncio.Future) -> None:
+        """Frees the slot of a decision that came too late and lets its agent observe the actions it missed."""
+        self._bot_slots.release()
+        if not decision.cancelled() and decision.exception():
+            self.logger.warning(f"{table.bots[seat]} on table {table.id} failed after it timed out.",
+                                exc_info=decision.exception())
+        # the callback runs on the loop between two steps of the table, so no action is acted meanwhile
+        for action in table.behind.pop(seat):
+            table.bots[seat].observe_action(action)
+
+    async def _notify(self, table: Table) -> None:
+        game = table.game
+        at_turn = game.player_at_turn.number
+        for seat in table.humans:
+            changes = game.changes_since(table.sent_version[seat])
+            table.sent_version[seat] = game.version
+            name = game.players[seat].name
+            for key in ("cards_removed", "cards_added"):
+                if key in changes:
+                    own = changes[key].get(name)
+                    changes[key] = {name: own} if own else {}
+            if changes.get("full"):
+                changes["players_cards"] = {name: changes["players_cards"][name]}
+                changes.pop("legal_actions", None)
+            message = {"table": table.id, "changes": changes}
+            if seat == at_turn and game.phase != "DONE":
+                message["legal"] = game.legal_action_mask().nonzero()[0].tolist()
+            await self.transport.send(table.id, seat, message)
@@ -0,0 +1,107 @@
+"""
+A match of several consecutive games between the same four seats, scored with the match rules of CompiledRules.
+"""
+from typing import NamedTuple
+
+import numpy as np
+
+from marjapussi.agent import Agent
+from marjapussi.deals import deals as draw_deals
+from marjapussi.game import MarjaPussi
+from marjapussi.gamerules import CompiledRules, compile_rules
+from marjapussi.policy import Policy
+
+
+class RoundResult(NamedTuple):
+    round: int
+    starting_seat: int
+    playing_seat: int | None  # None if no one played
+    game_value: int
+    points: int  # points made by the playing party
+    scores: tuple[int, int]  # scores of both parties after the round
+
+
+class Match:
+    """
+    Plays total_rounds games, the seat starting the game moves on by one every round. Seats 0 and 2 are
+    party 0, seats 1 and 3 party 1. The playing party wins the game value if it made at least that many points and
+    loses it otherwise. The first time a party reaches bonus_trigger it gets the bonus, once per match.
+    The agents of the seats and the buffer of deals are kept for all rounds, reset starts a new match with them.
+    """
+
+    def __init__(self, policies: list[Policy], player_names: list[str] | None = None,
+                 override_rules: dict | CompiledRules | None = None,
+                 rng: np.random.Generator | int | None = None, log_game=False, log_agent=False) -> None:
+        """override_rules are the rules of every game and of the match, see compile_rules."""
+        assert len(policies) == 4, "There have to be 4 policies!"
+        self.policies = policies
+        self.player_names = player_names or ["0", "1", "2", "3"]
+        self.rules: CompiledRules = compile_rules(override_rules)
+        self.rng = rng if isinstance(rng, np.random.Generator) else np.random.default_rng(rng)
+        self.log_game, self.log_agent = log_game, log_agent
+        self.deals = np.empty((self.rules.total_rounds, 4, 9), dtype=np.uint8)
+        self.agents: list[Agent | None] = [None] * 4
+        self.reset()
+
+    def reset(self, deals: np.ndarray | None = None) -> None:
+        """Starts a new match with the given deals, one (4, 9) deal per round, or with new deals drawn from rng."""
+        if deals is None:
+            draw_deals(self.rules.total_rounds, self.rng, out=self.deals)
+        else:
+            self.deals[:] = deals
+        self.round = 0
+        self.scores = [0, 0]
+        self.bonus_given = [False, False]
+        self.results: list[RoundResult] = []
+
+    @property
+    def finished(self) -> bool:
+        return self.round >= self.rules.total_rounds
+
+    def play(self) -> tuple[int, int]:
+        """Plays the remaining rounds and returns the scores of both parties."""
+        while not self.finished:
+            self.play_round()
+        return self.scores[0], self.scores[1]
+
+    def play_round(self) -> RoundResult:
+        if self.finished:
+            raise ValueError("All rounds of the match are played.")
+        start = self.round % 4
+        seats = [(start + pos) % 4 for pos in range(4)]  # the seat of every player of the game
+        names = [self.player_names[seat] for seat in seats]
+        game = MarjaPussi(names, self.rules, log=self.log_game, deal=self.deals[self.round])
+        agents = [self._agent(seat, names, game) for seat in seats]
+
+        while game.phase != "DONE":
+            chosen_action = agents[game.player_at_turn.number].next_action(game.legal_actions())
+            game.act_action(chosen_action)
+            for agent in agents:
+                agent.observe_action(chosen_action)
+
+        playing_seat, points = None, 0
+        if not game.no_one_plays:
+            playing = game.playing_player
+            playing_seat = seats[playing.number]
+            points = playing.points_made + playing.partner.points_made
+            self.scores[playing_seat % 2] += game.game_value if points >= game.game_value else -game.game_value
+        for party in range(2):
+            if not self.bonus_given[party] and self.scores[party] >= self.rules.bonus_trigger:
+                self.scores[party] += self.rules.bonus
+                self.bonus_given[party] = True
+
+        result = RoundResult(self.round, start, playing_seat, game.game_value, points, (self.scores[0], self.scores[1]))
+        self.results.append(result)
+        self.round += 1
+        return result
+
+    def _agent(self, seat: int, names: list[str], game: MarjaPussi) -> Agent:
+        cards = game.players[names.index(self.player_names[seat])].cards
+        agent = self.agents[seat]
+        if agent is None:
+            agent = Agent(self.player_names[seat], names, self.policies[seat], cards,
+                          type(self.policies[(seat + 1) % 4]), log=self.log_agent, rules=game.rules)
+            self.agents[seat] = agent
+        else:
+            agent.new_game(names, cards)
+        return agent
@@ -1,19 +1,20 @@
 from marjapussi.card import Card, Value, Color
-from marjapussi.utils import sorted_cards
-from marjapussi.trick import Trick
+from marjapussi.cardset import Hand
+from marjapussi.gamerules import CompiledRules
+from marjapussi.trick import Trick, TRUMP_INDEX
 
 
 class Player():
     """Implements a player of the MarjaPussi game."""
 
-    def __init__(self, name: str, number: int, points: dict) -> None:
+    def __init__(self, name: str, number: int, rules: CompiledRules) -> None:
         self.name = name
         self.number = number
-        self.points = points #defined by rules of the game
+        self.rules = rules  # the points are defined by the rules of the game
         self.partner: Player = None
         self.next_player: Player = None
         self.asking = 0  # 0 -> my; 1 -> yours; 2 -> ours
-        self.cards = []  # players card
+        self.cards = Hand()  # players card, bucketed by color and iterated in sort order
         self.still_prov = True
         self.prov_val = 0  # highest value said
         self.tricks = []  # all tricks self made
@@ -22,24 +23,33 @@ class Player():
 
     def take_trick(self, trick: Trick, last=False) -> None:
         self.tricks.append(trick)
-        self.points_made += sum([card.value.points for card in trick.cards]) + (self.points["L"] if last else 0)
+        self.points_made += self.rules.mask_points(trick.played.mask) + (self.rules.last_trick_bonus if last else 0)
 
     def call_trump(self, col: Color) -> None:
         # points go to player calling or asking
         if col in self.trump_calls:
             return
         self.trump_calls.append(col)
-        self.points_made += col.points
+        self.points_made += self.rules.pair_points[TRUMP_INDEX[col]]
 
     def give_card(self, c: Card) -> None:
         """Gives the player an additional card."""
-        self.cards.append(c)
-        # ? sorting doesn't need to be here but is convenient
-        self.cards = sorted_cards(self.cards)
+        self.cards.add(c)
 
     def take_card(self, c: Card) -> None:
-        self.cards = list(set(self.cards) - {c, })
-        self.cards = sorted_cards(self.cards)
+        self.cards.discard(c)
+
+    def snapshot(self) -> tuple:
+        """Returns the state of the player that changes during a game, which can be passed to restore later."""
+        return self.cards.mask, self.still_prov, self.asking, self.points_made, len(self.tricks), len(self.trump_calls)
+
+    def restore(self, snapshot: tuple) -> None:
+        """Resets the player to a snapshot taken earlier in the same game."""
+        mask, self.still_prov, self.asking, self.points_made, num_tricks, num_calls = snapshot
+        if mask != self.cards.mask:
+            self.cards.set_mask(mask)
+        del self.tricks[num_tricks:]
+        del self.trump_calls[num_calls:]
 
     def set_partner(self, partner) -> None:
         self.partner: Player = partner
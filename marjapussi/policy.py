@@ -2,13 +2,11 @@ from math import ceil
 import random as rnd
 from marjapussi.gamestate import GameState
 from marjapussi.action import Action
-from marjapussi.gamerules import GameRules
 
 
 class Policy(object):
     def __init__(self) -> None:
         super().__init__()
-        self.game_rules = GameRules()
 
     def observe_action(self, state: GameState, action: Action) -> None:
         """
@@ -4,7 +4,6 @@ from marjapussi.policy import Policy
 from marjapussi.gamestate import GameState
 from marjapussi.action import Action, Talk
 from marjapussi.card import Card, Color, Value, Deck
-from marjapussi.gamerules import GameRules
 from marjapussi.policy_player import PolicyPlayer
 from marjapussi.concept import Concept
 from itertools import combinations
@@ -24,7 +23,6 @@ class ProvokingInfos(Enum):
 class JonasPolicy(Policy):
     def __init__(self) -> None:
         super().__init__()
-        self.game_rules = GameRules()
 
     def _assess_own_hand(self, state: GameState):
         """
@@ -101,7 +99,7 @@ class JonasPolicy(Policy):
             next_value += 5
         
         # fold if you get above the game limit
-        if next_value > state.game_rules.max_game_value:
+        if next_value > state.rules.max_game_value:
             print(state.name, f": folding since I can't exceed the game limit, remaining steps were", [next_info] + to_communicate)
             return 0
 
@@ -399,7 +397,7 @@ class JonasPolicy(Policy):
                 state.concepts.add(Concept(f"{state.partner()}_is_blank_in_{color.name}", {}, value=0.75))
 
         # now check if the partner passed a pair
-        passed_pairs = [pair.pop().color for pair in utils.pairs() if pair.issubset(passed_cards)]
+        passed_pairs = utils.pair_colors(passed_cards)
         for pair_color in passed_pairs:
             if pair_color == Color.Rot or pair_color == Color.Schell:
                 state.concepts.remove(f"{state.partner()}_has_big_pair")
@@ -464,7 +462,7 @@ class JonasPolicy(Policy):
         passed_halves = [card for card in passed_cards if card.value == Value.Ober or card.value == Value.Koenig]
 
         # remove info about pairs from the state
-        passed_pairs = [pair.pop().color for pair in utils.pairs() if pair.issubset(passed_halves)]
+        passed_pairs = utils.pair_colors(passed_halves)
         for pair_color in passed_pairs:
             print("damn, I just passed a pair (might be not that smart)")
             if pair_color == Color.Rot or pair_color == Color.Schell:
@@ -1199,7 +1197,7 @@ class JonasPolicy(Policy):
 #             next_value += 5
         
 #         # fold if you get above the game limit
-#         if next_value > state.game_rules.max_game_value:
+#         if next_value > state.rules.max_game_value:
 #             print(state.name, f": folding since I can't exceed the game limit, remaining steps were", [to_be_communicated] + customs['to_be_communicated'])
 #             return 0
 
@@ -0,0 +1,260 @@
+"""
+Exact probabilities of where the unknown cards are, under the uniform distribution over all deals consistent with
+what a player knows: the possible and secure cards of every player and how many cards every player has left.
+
+The unknown cards are grouped into classes of cards possible for the same players, cards of a class are
+interchangeable. The deals are counted with a dynamic program over the classes, whose state is how many cards
+every player still needs. The counts are exact integers built from memoized binomials, so no log-binomials are
+needed.
+"""
+from collections.abc import Callable, Iterator, Sequence
+from functools import lru_cache
+from itertools import combinations
+import math
+
+import numpy as np
+
+from marjapussi.card import CARDS
+from marjapussi.cardset import iter_mask
+
+
+NUM_CARDS = len(CARDS)
+
+
+@lru_cache(maxsize=None)
+def binomial(n: int, k: int) -> int:
+    return math.comb(n, k)
+
+
+def _multinomial(n: int, parts: tuple[int, ...]) -> int:
+    ways = 1
+    for part in parts:
+        ways *= binomial(n, part)
+        n -= part
+    return ways
+
+
+def _splits(n: int, caps: tuple[int, ...]) -> Iterator[tuple[int, ...]]:
+    """Yields every split of n cards into len(caps) parts of at most caps cards."""
+    if len(caps) == 1:
+        if n <= caps[0]:
+            yield (n,)
+        return
+    for first in range(min(n, caps[0]) + 1):
+        for rest in _splits(n - first, caps[1:]):
+            yield (first,) + rest
+
+
+def _classes(possible: Sequence[int]) -> list[tuple[tuple[int, ...], int]]:
+    """Groups the unknown cards by the players they are possible for, as (players, card mask) per class."""
+    by_players: dict[tuple[int, ...], int] = {}
+    unknown = 0
+    for mask in possible:
+        unknown |= mask
+    for card_id in range(NUM_CARDS):
+        bit = 1 << card_id
+        if unknown & bit:
+            players = tuple(num for num, mask in enumerate(possible) if mask & bit)
+            by_players[players] = by_players.get(players, 0) | bit
+    return list(by_players.items())
+
+
+class _Counter:
+    """Counts the ways to complete the needs of the players with the classes from an index on."""
+
+    def __init__(self, classes: list[tuple[tuple[int, ...], int]]) -> None:
+        self.players = [players for players, _ in classes]
+        self.sizes = [mask.bit_count() for _, mask in classes]
+        self._memo: dict[tuple[int, tuple[int, ...]], int] = {}
+
+    def ways(self, k: int, needs: tuple[int, ...], extra: int = 0) -> int:
+        """Ways to hand out class k (minus extra cards) and all classes after it to fill needs exactly."""
+        if k == len(self.sizes):
+            return 0 if any(needs) else 1
+        key = (k, needs) if not extra else None
+        if key is not None and key in self._memo:
+            return self._memo[key]
+        players, n = self.players[k], self.sizes[k] - extra
+        total = 0
+        for split in _splits(n, tuple(needs[num] for num in players)):
+            rest = list(needs)
+            for num, part in zip(players, split):
+                rest[num] -= part
+            total += _multinomial(n, split) * self.ways(k + 1, tuple(rest))
+        if key is not None:
+            self._memo[key] = total
+        return total
+
+
+class CardDistribution:
+    """
+    The uniform distribution over the deals of the unknown cards, given per player the mask of possible cards,
+    the mask of secure cards and the number of cards they have. Possible and secure masks have to be disjoint.
+    total is the number of consistent deals, marginals the (4, 36) matrix of the probabilities that a player has a
+    card, probability and probability_any the probability that a player has all or any cards of a mask.
+    """
+
+    def __init__(self, possible: Sequence[int], secure: Sequence[int], counts: Sequence[int]) -> None:
+        self.possible = tuple(possible)
+        self.secure = tuple(secure)
+        self.counts = tuple(counts)
+        self.needs = tuple(count - mask.bit_count() for count, mask in zip(counts, secure))
+        self.classes = _classes(self.possible)
+        self._counter = _Counter(self.classes)
+        self.total = self._counter.ways(0, self.needs) if min(self.needs) >= 0 else 0
+        self._choices: dict[tuple[int, tuple[int, ...]], tuple[np.ndarray, np.ndarray]] = {}
+
+    @classmethod
+    def from_state(cls, state) -> "CardDistribution":
+        """The distribution as seen by the owner of a GameState."""
+        return cls([state.possible_cards[name].mask for name in state.all_players],
+                   [state.secure_cards[name].mask for name in state.all_players],
+                   state.player_cards_left)
+
+    def _check(self) -> None:
+        if not self.total:
+            raise ValueError("No deal is consistent with the known cards.")
+
+    def marginals(self, out: np.ndarray | None = None) -> np.ndarray:
+        """Returns (or writes into out) P(player has card) as (4, 36) float array."""
+        self._check()
+        if out is None:
+            out = np.zeros((len(self.counts), NUM_CARDS))
+        else:
+            out[:] = 0
+        for num, mask in enumerate(self.secure):
+            for card in iter_mask(mask):
+                out[num, card.id] = 1.
+        counter = self._counter
+        # ways to hand out the classes before k, by the needs they leave
+        before: dict[tuple[int, ...], int] = {self.needs: 1}
+        for k, (players, mask) in enumerate(self.classes):
+            n = counter.sizes[k]
+            for num in players:
+                # deals in which one fixed card of the class goes to num
+                ways = 0
+                for needs, count in before.items():
+                    if needs[num]:
+                        rest = list(needs)
+                        rest[num] -= 1
+                        ways += count * counter.ways(k, tuple(rest), extra=1)
+                probability = ways / self.total
+                for card in iter_mask(mask):
+                    out[num, card.id] = probability
+            after: dict[tuple[int, ...], int] = {}
+            for needs, count in before.items():
+                for split in _splits(n, tuple(needs[num] for num in players)):
+                    rest = list(needs)
+                    for num, part in zip(players, split):
+                        rest[num] -= part
+                    rest = tuple(rest)
+                    after[rest] = after.get(rest, 0) + count * _multinomial(n, split)
+            before = after
+        return out
+
+    def probability(self, player: int, mask: int) -> float:
+        """Returns the probability that the player has all cards of the mask."""
+        self._check()
+        if mask & self.secure[player] == mask:
+            return 1.
+        fixed = mask & ~self.secure[player]
+        if fixed & ~self.possible[player]:
+            return 0.
+        possible = [poss & ~fixed for poss in self.possible]
+        secure = list(self.secure)
+        secure[player] |= fixed
+        return CardDistribution(possible, secure, self.counts).total / self.total
+
+    def probability_any(self, player: int, mask: int) -> float:
+        """Returns the probability that the player has at least one card of the mask."""
+        self._check()
+        if mask & self.secure[player]:
+            return 1.
+        possible = list(self.possible)
+        possible[player] &= ~mask
+        return 1. - CardDistribution(possible, self.secure, self.counts).total / self.total
+
+    def probability_any_set(self, player: int, masks: Sequence[int]) -> float:
+        """Returns the probability that the player has all cards of at least one of the masks (e.g. of pairs)."""
+        # inclusion-exclusion over the unions of the masks
+        probability = 0.
+        for size in range(1, len(masks) + 1):
+            sign = 1 if size % 2 else -1
+            for group in combinations(masks, size):
+                union = 0
+                for mask in group:
+                    union |= mask
+                probability += sign * self.probability(player, union)
+        return probability
+
+    def _split_choices(self, k: int, needs: tuple[int, ...]) -> tuple[np.ndarray, np.ndarray]:
+        """The splits of class k between its players for the needs and the probability of each in a uniform deal."""
+        key = (k, needs)
+        if key not in self._choices:
+            counter, players, n = self._counter, self.classes[k][0], self._counter.sizes[k]
+            splits, ways = [], []
+            for split in _splits(n, tuple(needs[num] for num in players)):
+                rest = list(needs)
+                for num, part in zip(players, split):
+                    rest[num] -= part
+                count = _multinomial(n, split) * counter.ways(k + 1, tuple(rest))
+                if count:
+                    splits.append(split)
+                    ways.append(count)
+            total = sum(ways)
+            self._choices[key] = np.array(splits, dtype=np.int64), np.array([way / total for way in ways])
+        return self._choices[key]
+
+    def sample(self, k: int, rng: np.random.Generator | int | None = None) -> np.ndarray:
+        """
+        Draws k deals uniformly without rejection and returns the hands as (k, 4) uint64 array of card masks,
+        the secure cards included: class by class, the split of the class between its players is drawn with the
+        number of deals it leaves, then the cards of the class are handed out in random order.
+        """
+        self._check()
+        rng = np.random.default_rng(rng)
+        num_players = len(self.counts)
+        hands = np.empty((k, num_players), dtype=np.uint64)
+        hands[:] = np.array(self.secure, dtype=np.uint64)
+        # the rows of the deals by the needs the classes so far left
+        groups: dict[tuple[int, ...], np.ndarray] = {self.needs: np.arange(k)}
+        for idx, (players, mask) in enumerate(self.classes):
+            bits = np.array([1 << card.id for card in iter_mask(mask)], dtype=np.uint64)
+            positions = np.arange(len(bits))
+            next_groups: dict[tuple[int, ...], list[np.ndarray]] = {}
+            for needs, rows in groups.items():
+                splits, probabilities = self._split_choices(idx, needs)
+                chosen = rng.choice(len(splits), size=len(rows), p=probabilities)
+                shuffled = bits[rng.random((len(rows), len(bits))).argsort(axis=1)]
+                # the player slot of every position of the shuffled cards
+                ends = splits[chosen].cumsum(axis=1)
+                slot = (positions[None, :, None] >= ends[:, None, :]).sum(axis=2)
+                for pos, num in enumerate(players):
+                    hands[rows, num] |= np.bitwise_or.reduce(np.where(slot == pos, shuffled, np.uint64(0)), axis=1)
+                for choice in np.unique(chosen):
+                    rest = list(needs)
+                    for num, part in zip(players, splits[choice]):
+                        rest[num] -= int(part)
+                    next_groups.setdefault(tuple(rest), []).append(rows[chosen == choice])
+            groups = {needs: np.concatenate(parts) for needs, parts in next_groups.items()}
+        return hands
+
+
+def sample_worlds(state, k: int, rng: np.random.Generator | int | None = None,
+                  weight: Callable[[np.ndarray], np.ndarray] | None = None, oversample: int = 4) -> np.ndarray:
+    """
+    Draws k deals that are consistent with what the owner of the GameState knows, uniformly (see
+    CardDistribution.sample), as (k, 4) uint64 array of the card masks of the players.
+    weight is a hook for soft beliefs (e.g. from the concepts of provoking): it gets a (m, 4) array of deals and
+    returns m non-negative weights. Then k * oversample deals are drawn uniformly and k of them are drawn again in
+    proportion to their weights.
+    """
+    rng = np.random.default_rng(rng)
+    distribution = CardDistribution.from_state(state)
+    if weight is None:
+        return distribution.sample(k, rng)
+    candidates = distribution.sample(k * oversample, rng)
+    weights = np.asarray(weight(candidates), dtype=np.float64)
+    if not weights.sum() > 0:
+        raise ValueError("The weights of all sampled deals are zero.")
+    return candidates[rng.choice(len(candidates), size=k, p=weights / weights.sum())]
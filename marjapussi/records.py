@@ -0,0 +1,238 @@
+"""
+Compact records of finished (or running) games in append-only segment files.
+
+A segment starts with a header (magic, format version, start and max game value, which fix the action space) and is
+followed by the records. Every record is the varint encoded length of its body, then the body: the deal as owner of
+every card (2 bits per card id, 9 bytes) and the varint encoded indices of the actions in the action space (see
+ActionSpace). Next to a segment an index file holds the uint64 offset of every record, so game k can be read without
+scanning the segment. An index that is missing or doesn't end with the last record of the segment is not used, the
+writer rebuilds it before it appends.
+"""
+from collections.abc import Iterator
+from typing import NamedTuple
+import mmap
+import os
+import struct
+
+import numpy as np
+
+from marjapussi.cardset import mask_of
+from marjapussi.deals import deal_masks
+from marjapussi.game import MarjaPussi
+from marjapussi.gamerules import DEFAULT_RULES, compile_rules
+
+
+_MAGIC = b"MPRC"
+_VERSION = 1
+_HEADER = struct.Struct("<4sBHH")
+_DEAL_BYTES = 9
+_INDEX_DTYPE = np.dtype("<u8")
+# the four 2 bit owners in every byte of a packed deal, the lowest bits belong to the lowest card id
+_OWNER_SHIFTS = np.arange(0, 8, 2, dtype=np.uint8)
+
+
+def encode_varint(value: int, out: bytearray) -> None:
+    while value >= 0x80:
+        out.append(value & 0x7F | 0x80)
+        value >>= 7
+    out.append(value)
+
+
+def decode_varint(data, pos: int) -> tuple[int, int]:
+    """Returns the value at pos and the position after it."""
+    value = shift = 0
+    while True:
+        byte = data[pos]
+        pos += 1
+        value |= (byte & 0x7F) << shift
+        if byte < 0x80:
+            return value, pos
+        shift += 7
+
+
+def _pack_deal(masks) -> bytes:
+    owners = 0
+    for player, mask in enumerate(masks):
+        mask = int(mask)
+        while mask:
+            low = mask & -mask
+            owners |= player << (2 * (low.bit_length() - 1))
+            mask ^= low
+    return owners.to_bytes(_DEAL_BYTES, "little")
+
+
+def _unpack_deal(data: bytes) -> np.ndarray:
+    owner_of = (np.frombuffer(data, dtype=np.uint8)[:, None] >> _OWNER_SHIFTS & 3).ravel()
+    # the card ids of every player in ascending order
+    return np.argsort(owner_of, kind="stable").astype(np.uint8).reshape(4, 9)
+
+
+class GameRecord(NamedTuple):
+    deal: np.ndarray  # (4, 9) card ids like in marjapussi.deals
+    actions: list[int]  # indices in the action space
+
+
+def index_path(path: str) -> str:
+    return path + ".idx"
+
+
+def _scan_offsets(data) -> np.ndarray:
+    """Returns the offsets of all records of the segment data, skipping over their bodies."""
+    offsets = []
+    pos, end = _HEADER.size, len(data)
+    while pos < end:
+        offsets.append(pos)
+        length, pos = decode_varint(data, pos)
+        pos += length
+    return np.array(offsets, dtype=_INDEX_DTYPE)
+
+
+def _read_index(path: str, data) -> np.ndarray | None:
+    """Returns the offsets of the index file of the segment, None if it is missing or doesn't fit the segment."""
+    if not os.path.exists(index_path(path)):
+        return None
+    offsets = np.fromfile(index_path(path), dtype=_INDEX_DTYPE)
+    if not len(offsets):
+        return offsets if len(data) == _HEADER.size else None
+    last = int(offsets[-1])
+    if last >= len(data):
+        return None
+    length, pos = decode_varint(data, last)
+    return offsets if pos + length == len(data) else None
+
+
+class RecordWriter:
+    """Appends game records to a segment file and their offsets to its index file."""
+
+    def __init__(self, path: str, start_game_value: int = DEFAULT_RULES.start_game_value,
+                 max_game_value: int = DEFAULT_RULES.max_game_value) -> None:
+        self.path = path
+        new_segment = not os.path.exists(path) or os.path.getsize(path) == 0
+        if not new_segment:
+            with open(path, "rb") as segment, mmap.mmap(segment.fileno(), 0, access=mmap.ACCESS_READ) as data:
+                header = _read_header(data[:_HEADER.size])
+                if header != (start_game_value, max_game_value):
+                    raise ValueError(f"The segment {path} was written for the game values {header}.")
+                # the offsets of the new records have to follow the ones of all records already in the segment
+                if _read_index(path, data) is None:
+                    _scan_offsets(data).tofile(index_path(path))
+        self._file = open(path, "ab")
+        # an index left over from an earlier segment of the same name is dropped
+        self._index = open(index_path(path), "wb" if new_segment else "ab")
+        if new_segment:
+            self._file.write(_HEADER.pack(_MAGIC, _VERSION, start_game_value, max_game_value))
+        self._buffer = bytearray()
+
+    def write(self, deal, actions: list[int]) -> int:
+        """
+        Appends a game given by its deal (card masks of the players or a (4, 9) array of card ids) and the indices
+        of its actions, and returns its offset in the segment.
+        """
+        if isinstance(deal, np.ndarray) and deal.ndim == 2:
+            deal = deal_masks(deal)
+        body = bytearray(_pack_deal(deal))
+        for action in actions:
+            encode_varint(int(action), body)
+        record = self._buffer
+        record.clear()
+        encode_varint(len(body), record)
+        record += body
+        offset = self._file.tell()
+        self._file.write(record)
+        self._index.write(struct.pack("<Q", offset))
+        return offset
+
+    def write_game(self, game: MarjaPussi) -> int:
+        """Appends the deal and the actions so far of a game."""
+        masks = [mask_of(game.original_cards[player.name]) for player in game.players]
+        return self.write(masks, [game.encode_action(action) for action in game.all_actions])
+
+    def flush(self) -> None:
+        self._file.flush()
+        self._index.flush()
+
+    def close(self) -> None:
+        self._file.close()
+        self._index.close()
+
+    def __enter__(self) -> "RecordWriter":
+        return self
+
+    def __exit__(self, *exc) -> None:
+        self.close()
+
+
+def _read_header(data: bytes) -> tuple[int, int]:
+    magic, version, start_game_value, max_game_value = _HEADER.unpack(data)
+    if magic != _MAGIC or version != _VERSION:
+        raise ValueError("Not a game record segment of a known version.")
+    return start_game_value, max_game_value
+
+
+class RecordReader:
+    """
+    Reads a segment: iterating streams all records in order, reader[k] reads game k through the index and
+    replay(k, j) returns the game k after its first j actions. If the index file is missing or doesn't fit the
+    segment, the offsets are found by scanning the segment.
+    """
+
+    def __init__(self, path: str, override_rules: dict | None = None) -> None:
+        self.path = path
+        with open(path, "rb") as segment:
+            self._data = mmap.mmap(segment.fileno(), 0, access=mmap.ACCESS_READ)
+        start_game_value, max_game_value = _read_header(self._data[:_HEADER.size])
+        self.rules = compile_rules((override_rules or {}) | {"start_game_value": start_game_value,
+                                                             "max_game_value": max_game_value})
+        offsets = _read_index(path, self._data)
+        self.offsets = _scan_offsets(self._data) if offsets is None else offsets
+
+    def _scan(self) -> Iterator[tuple[int, GameRecord]]:
+        pos, end = _HEADER.size, len(self._data)
+        while pos < end:
+            record, next_pos = self._read(pos)
+            yield pos, record
+            pos = next_pos
+
+    def _read(self, pos: int) -> tuple[GameRecord, int]:
+        data = self._data
+        length, pos = decode_varint(data, pos)
+        end = pos + length
+        deal = _unpack_deal(data[pos:pos + _DEAL_BYTES])
+        pos += _DEAL_BYTES
+        stream = data[pos:end]
+        # most action indices fit into a single byte, then the bytes are the indices
+        if stream.isascii():
+            return GameRecord(deal, list(stream)), end
+        actions = []
+        while pos < end:
+            action, pos = decode_varint(data, pos)
+            actions.append(action)
+        return GameRecord(deal, actions), end
+
+    def __len__(self) -> int:
+        return len(self.offsets)
+
+    def __getitem__(self, k: int) -> GameRecord:
+        return self._read(int(self.offsets[k]))[0]
+
+    def __iter__(self) -> Iterator[GameRecord]:
+        for _, record in self._scan():
+            yield record
+
+    def replay(self, k: int, j: int | None = None, player_names: list[str] | None = None) -> MarjaPussi:
+        """Returns game k with its first j actions (all by default) applied."""
+        record = self[k]
+        game = MarjaPussi(player_names or ["0", "1", "2", "3"], self.rules, log=False, deal=record.deal)
+        for action in record.actions[:j]:
+            if not game.act_action(game.decode_action(action)):
+                raise ValueError(f"The record of game {k} contains an illegal action.")
+        return game
+
+    def close(self) -> None:
+        self._data.close()
+
+    def __enter__(self) -> "RecordReader":
+        return self
+
+    def __exit__(self, *exc) -> None:
+        self.close()
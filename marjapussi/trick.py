@@ -1,4 +1,33 @@
-from marjapussi.card import Card, Color
+from marjapussi.card import Card, Color, CARDS, COLORS
+from marjapussi.cardset import CardSet, COLOR_MASKS
+
+
+# index of the trump color in the tables below, the last index is used if there is no trump
+TRUMP_INDEX: dict[Color | None, int] = {col: idx for idx, col in enumerate(COLORS)} | {None: len(COLORS)}
+
+
+def _build_beats_table() -> tuple[tuple[int, ...], ...]:
+    """
+    BEATS[trump_idx][card.id] is the mask of all cards that beat card, if card is the high card of a trick.
+    The high card of a trick always has the base color or the trump color, so the base color doesn't have to be part
+    of the key: A card beats the high card if it is a higher card of the same color, or if it is trump and the
+    high card is not.
+    """
+    table = []
+    for trump_idx in range(len(COLORS) + 1):
+        trump_mask = COLOR_MASKS[trump_idx] if trump_idx < len(COLORS) else 0
+        row = []
+        for card in CARDS:
+            higher_same_color = COLOR_MASKS[card.color_idx] & ~((2 << card.id) - 1)
+            if card.color_idx == trump_idx:
+                row.append(higher_same_color)
+            else:
+                row.append(higher_same_color | trump_mask)
+        table.append(tuple(row))
+    return tuple(table)
+
+
+BEATS = _build_beats_table()
 
 
 class Trick:
@@ -8,6 +37,7 @@ class Trick:
     """
     def __init__(self, trump_color: Color = None):
         self.cards: list[Card] = []
+        self.played: CardSet = CardSet()  # the cards of the trick as set
         self.trump_color = trump_color
         self.base_color: Color | None = None
         self.starting_player_num: int = -1
@@ -20,14 +50,36 @@ class Trick:
         """
         if self._is_valid_play():
             self.cards.append(card)
-            self.high_card = self._high_card()
-            self.high_card_idx = self._high_card_idx()
+            self.played = CardSet.from_mask(self.played.mask | 1 << card.id)
+            # the winner is updated incrementally, the new card only has to be checked against the current high card
+            if self.high_card is None or BEATS[TRUMP_INDEX[self.trump_color]][self.high_card.id] >> card.id & 1:
+                self.high_card = card
+                self.high_card_idx = len(self.cards) - 1
             if self.get_status() == 1:
                 self.base_color = self.cards[0].color
                 self.starting_player_num = player_num
         else:
             raise ValueError("Too many cards for one trick")
 
+    def copy(self) -> "Trick":
+        """Returns a trick in the same state, that can be played on without changing this one."""
+        trick = Trick(self.trump_color)
+        trick.cards = self.cards.copy()
+        (_, trick.played, _, trick.base_color, trick.starting_player_num,
+         trick.high_card, trick.high_card_idx) = self.snapshot()
+        return trick
+
+    def snapshot(self) -> tuple:
+        """Returns the state of the trick as tuple, which can be passed to restore later."""
+        return (len(self.cards), self.played, self.trump_color, self.base_color, self.starting_player_num,
+                self.high_card, self.high_card_idx)
+
+    def restore(self, snapshot: tuple) -> None:
+        """Resets the trick to a snapshot taken earlier, cards played since then are removed."""
+        (num_cards, self.played, self.trump_color, self.base_color, self.starting_player_num,
+         self.high_card, self.high_card_idx) = snapshot
+        del self.cards[num_cards:]
+
     def _is_valid_play(self):
         return self.get_status() < 4
 
@@ -40,38 +92,15 @@ class Trick:
         """
         return len(self.cards)
 
-    def _high_card(self) -> Card | None:
-        """returns the current winning card of the trick counting from first card played"""
-        num_cards = len(self.cards)
-        if num_cards == 0:
-            return None
-        trump_cards = [card for card in self.cards if card.color == self.trump_color]
-        if trump_cards:
-            return max(trump_cards, key=lambda card: card.value)
-        else:
-            return max(self.cards, key=lambda card: (card.color == self.base_color, card.value))
+    def beating_mask(self) -> int:
+        """returns the mask of all cards that would take the trick right now"""
+        if self.high_card is None:
+            return (1 << len(CARDS)) - 1
+        return BEATS[TRUMP_INDEX[self.trump_color]][self.high_card.id]
 
-    def _high_card_idx(self) -> int:
-        high_card = self.high_card
-        if self.high_card:
-            return self.cards.index(high_card)
-        else:
-            return -1
-        
     def taken_by(self, card: Card) -> bool:
         # in the beginning, every card will take the trick
-        if self.get_status() == 0:
-            return True
-        # if the highest card is not in the trump color, every trump card will take the trick
-        # and every card in the base color higher than the high card will too
-        high_card = self._high_card()
-        if high_card.color != self.trump_color:
-            if card.color == self.trump_color or \
-               card.color == high_card.color and card.value > high_card.value:
-                return True
-        # else the card will only win if it is higher than the currently highest card
-        elif card.value > high_card.value:
+        if self.high_card is None:
             return True
-        # if all of this does not apply, the card will not take the trick
-        return False
-
+        # a higher card of the color of the high card takes the trick, every trump card takes a non trump high card
+        return BEATS[TRUMP_INDEX[self.trump_color]][self.high_card.id] >> card.id & 1 == 1
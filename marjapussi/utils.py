@@ -1,267 +1,286 @@
-from marjapussi.card import Card, Deck, Color, Value
-from marjapussi.trick import Trick
+from marjapussi.card import Card, Color, Value, CARDS, COLORS, VALUES
+from marjapussi.cardset import CardSet, Hand, iter_mask, mask_of, FULL_MASK, COLOR_MASKS
+from marjapussi.trick import Trick, BEATS, TRUMP_INDEX
+from collections.abc import Mapping
 from itertools import combinations
+from operator import attrgetter
+from types import MappingProxyType
 import math
 
+ACE_MASK = mask_of(card for card in CARDS if card.value == Value.Ass)
+GREEN_MASK = mask_of(card for card in CARDS if card.color == Color.Gruen)
+# rank bits of koenig and ober within the 9 bit bucket of one color
+PAIR_BUCKET = (1 << Card(Color.Gruen, Value.Koenig).rank) | (1 << Card(Color.Gruen, Value.Ober).rank)
+
 text_format = {"r": "\033[91m", "s": "\033[93m", "e": "\033[96m", "g": "\033[92m",
                "end": "\033[0m", "bold": "\033[1m", "uline": "\033[4m"}
 
 
-def allowed_first(cards: list[Card]) -> list[Card]:
-    """Filters cards by allowed first: First player has to play an ace, green or any card."""
-    allowed = [c for c in cards if c.value == Value.Ass]
-    if not allowed:
-        allowed = [c for c in cards if c.color == Color.Gruen]
-    if not allowed:
-        allowed = cards[:]
-    return allowed
+def _as_cardset(cards) -> CardSet | Hand:
+    return cards if isinstance(cards, (CardSet, Hand)) else CardSet(cards)
 
 
-def allowed_general(hand: list[Card], trick: Trick, first=False) -> list[Card]:
-    """Sorts which cards are allowed to be played from the hand right now"""
-    if trick.get_status() == 0 and first:
-        return allowed_first(hand)
-    if trick.get_status() == 0:
+def legal_mask(hand: int, base_idx: int, trump_idx: int, high_id: int, first: bool) -> int:
+    """
+    Returns the mask of all cards of the hand mask that are allowed to be played.
+    hand: mask of the hand cards
+    base_idx: color index of the base color of the trick, ignored if the trick is empty
+    trump_idx: index of the trump color in trick.TRUMP_INDEX (4 if there is no trump)
+    high_id: id of the current high card of the trick, -1 if the trick is empty
+    first: if it is the first trick of the game
+    """
+    if high_id < 0:
+        if first:
+            # first player has to play an ace, green or any card
+            return hand & ACE_MASK or hand & GREEN_MASK or hand
+        return hand
+    base_cards = hand & COLOR_MASKS[base_idx]
+    # in the first trick an ace of the base color has to be played
+    if first and base_cards & ACE_MASK:
+        return base_cards & ACE_MASK
+    # need to play base_color first, then trump and then any. Needs to go also higher than previous trick cards
+    allowed = base_cards or (hand & COLOR_MASKS[trump_idx] if trump_idx < len(COLOR_MASKS) else 0)
+    if not allowed:
         return hand
+    return allowed & BEATS[trump_idx][high_id] or allowed
 
-    if first:
-        # check for ace
-        ace = next((card for card in hand if card.color == trick.base_color and card.value == Value.Ass), None)
-        if ace:
-            return [ace]
 
-    # need to play base_color first, then trump and then any. Needs to go also higher than previous trick cards
-    allowed = [card for card in hand if card.color == trick.base_color]
-    if not allowed and trick.trump_color:
-        allowed = [card for card in hand if card.color == trick.trump_color]
-    high_cards = higher_cards(trick, allowed)
-    if high_cards:
-        allowed = high_cards
+def legal_trick_mask(hand: int, trick: Trick, first=False) -> int:
+    """Returns the mask of all cards of the hand mask that are allowed to be played into the trick."""
+    if trick.high_card is None:
+        return legal_mask(hand, 0, 0, -1, first)
+    return legal_mask(hand, trick.cards[0].color_idx, TRUMP_INDEX[trick.trump_color], trick.high_card.id, first)
+
 
-    return allowed if allowed else hand
+def allowed_first(cards: list[Card] | CardSet | Hand) -> list[Card]:
+    """Filters cards by allowed first: First player has to play an ace, green or any card."""
+    return list(iter_mask(legal_mask(mask_of(cards), 0, 0, -1, True)))
 
 
-def higher_cards(trick: Trick, card_pool: list[Card] | set[Card] = None) -> list[Card]:
+def allowed_general(hand: list[Card] | CardSet | Hand, trick: Trick, first=False) -> list[Card]:
+    """Sorts which cards are allowed to be played from the hand right now"""
+    return list(iter_mask(legal_trick_mask(mask_of(hand), trick, first)))
+
+
+def higher_cards(trick: Trick, card_pool: list[Card] | set[Card] | CardSet = None) -> list[Card]:
     """Returns all cards out of the pool that would win the given trick."""
     # default: Check all cards for higher cards
-    if card_pool is None:
-        card_pool = Deck().cards
+    pool = FULL_MASK if card_pool is None else mask_of(card_pool)
     if trick.get_status():
-        # trick is trump color trick
-        if trick.trump_color == trick.base_color:
-            return [c for c in card_pool if trick.base_color == c.color and c.value > trick.high_card.value]
-        # trick has been taken over by trump, but with different base color, can only be beaten by trump
-        elif trick.trump_color == trick.high_card.color:
-            return [c for c in card_pool if (c.color == trick.trump_color and c.value > trick.high_card.value)]
-        # a true base color trick
-        else:
-            return [c for c in card_pool if (trick.base_color == c.color and c.value > trick.high_card.value)
-                    or c.color == trick.trump_color]
+        return list(iter_mask(pool & trick.beating_mask()))
     else:
-        return card_pool
+        return list(iter_mask(pool))
 
 
-def contains_col_pair(cards: list[Card], col: Color) -> bool:
+def contains_col_pair(cards: list[Card] | CardSet | Hand, col: Color) -> bool:
     """Checks cards for the pair of specified Color"""
-    return any(c.color == col and c.value == Value.Koenig for c in cards) and any(
-        c.color == col and c.value == Value.Ober for c in cards)
+    return _as_cardset(cards).bucket(col) & PAIR_BUCKET == PAIR_BUCKET
 
 
-def contains_col_half(cards: list[Card], col: Color) -> bool:
+def contains_col_half(cards: list[Card] | CardSet | Hand, col: Color) -> bool:
     """Checks cards for one half of pair of specified Color"""
-    return any(card.color == col and (card.value == Value.Koenig or card.value == Value.Ober) for card in cards)
+    return _as_cardset(cards).bucket(col) & PAIR_BUCKET != 0
 
 
 def contains_pair(cards: set[Card]) -> bool:
     """Checks cards for having any pair"""
-    return any([pair for pair in pairs() if pair.issubset(cards)])
+    return bool(pair_colors(cards))
 
 
 def contains_ace(cards: set[Card]) -> bool:
     """Checks cards for an ace"""
-    return any(card.value == Value.Ass for card in cards)
+    return mask_of(cards) & ACE_MASK != 0
 
 
 def contains_low_card(cards: set[Card]) -> bool:
     """Checks cards for at least one low card (joker or down)"""
-    return any(card.value <= Value.Unter for card in cards)
+    return mask_of(cards) & LOW_MASK != 0
+
+
+_card_id = attrgetter("id")
 
 
 def sorted_cards(cards: list[Card]) -> list[Card]:
-    return sorted(cards, key=lambda card: (card.color, card.value))
+    return sorted(cards, key=_card_id)
 
 
-def all_color_cards(col: Color) -> list[Card]:
+def all_color_cards(col: Color) -> frozenset[Card]:
     """Returns all cards with given color."""
-    return [Card(col, v) for v in Value]
+    return COLOR_CARDS[col]
 
 
-def all_value_cards(value: Value) -> list[Card]:
+def all_value_cards(value: Value) -> frozenset[Card]:
     """Returns all cards with given type."""
-    return [Card(c, value) for c in Color]
+    return VALUE_CARDS[value]
 
 
 def card_str(card: Card, fancy=True) -> str:
     return text_format[str(card.color)] + str(card) + text_format["end"] if fancy else str(card)
 
 
+def parse_deal(deal: str | list[str]) -> list[list[Card]]:
+    """
+    Parses the hands of the four players, one line (or list entry) per player in the card notation, e.g.
+    "g-6 g-O g-K e-9 e-K s-7 s-8 r-6 r-7\ng-A e-7 ...". The first line are the cards of player 0.
+    """
+    lines = deal.strip().splitlines() if isinstance(deal, str) else deal
+    return [[Card.parse(card) for card in line.split()] for line in lines]
+
+
 def cards_str(cards: list[Card], fancy=True) -> str:
     return " ".join([card_str(card, fancy=fancy) for card in cards])
 
 
 def color_str(col: Color, fancy=True) -> str:
-    return text_format[str(col)] + col.fancy_name() + text_format["end"] if fancy else col.fancy_name
+    return text_format[str(col)] + col.fancy_name() + text_format["end"] if fancy else col.fancy_name()
 
 
 def bold_str(s: str, fancy=True) -> str:
     return text_format["bold"] + s + text_format["end"] if fancy else s
 
 
-def _calc_sets_possibilities(x: list[int], v: list[int]) -> int:
-    """
-    x: list of set sizes
-    v: list of restriction set sizes
-    """
-    n = sum(x)
-    v_fact_multi = math.prod([math.factorial(vx) for vx in v])
-    binomial_sum = 0
-    for i in range(v[0]):
-        for j in range(v[1]):
-            binomial_sum += math.comb(x[1] + x[2], v[0]) * \
-                         math.comb(x[0] + x[2] - j, v[1]) * \
-                         math.comb(x[0] + x[1] - v[0] + j - i, v[2])
-    return math.factorial(n - sum(v)) * v_fact_multi * binomial_sum
-
-
-def calculate_set_in_3set_probability(possible_sets: list[set[Card]], set_sizes: list[int],
-                                      test_set: set[Card], target_set: int) -> float:
-    """
-    we calculate the probability, that the test_set is in the possible_sets with index target_set
-    with the given set_sizes, thanks Andreas for helping out with this!
-    maybe we could also make this function work for an arbitrary amount of sets other than 3 later if necessary
-    """
-    union_set = set()
-    total_card_amount = len(union_set)
-    assert total_card_amount == sum(set_sizes), "the total amount of possible cards needs to exactly fit in the sets"
-    assert len(possible_sets) == 3, "this function only works for 3 sets at a time"
-    assert len(set_sizes) == 3, "this functions inputs need to match length, which is the amount of sets that is 3"
-    assert target_set in range(3), "the target set needs to be an index within range of the provided sets! 0, 1 or 2"
-
-    for poss_set in possible_sets:
-        union_set |= poss_set
-    diff_sets = [union_set.difference(poss_set) for poss_set in possible_sets]
-
-    # Let's first rule out the problem cases:
-    if not test_set.issubset(possible_sets[target_set]):
-        return 0.
-    if len(test_set) > set_sizes[target_set]:
-        return 0.
-
-    # first we calculate the possible configurations for the restrictions each set has
-    v = [len(diff_set) for diff_set in diff_sets]
-    x = set_sizes
-    set_possibilities = _calc_sets_possibilities(x, v)
-
-    # Now we calculate the possibilities, if we already distributed the test_set
-    test_set_possible_distribs = math.comb(x[target_set], len(test_set))
-    new_union_set = union_set.difference(test_set)
-    x[target_set] -= len(test_set)
-    new_poss_sets = [poss_set.difference(test_set) for poss_set in possible_sets]
-    new_diff_sets = [new_union_set.difference(poss_set) for poss_set in new_poss_sets]
-    v = [len(diff_set) for diff_set in new_diff_sets]
-    set_possibilities_restrict = test_set_possible_distribs * _calc_sets_possibilities(x, v)
-
-    return set_possibilities_restrict / set_possibilities
-
-
-def standing_in_suite(leftover_cards: set[Card], color: Color, possible_cards: set[Card]) -> set[Card]:
+def standing_in_suite(leftover_cards: set[Card] | CardSet, color: Color,
+                      possible_cards: set[Card] | CardSet) -> CardSet:
     """returns all cards of color that are standing in the possible_cards belonging to the player with player_num"""
-    # first, we need to sort the cards of the color we want to check
-    col_cards = sorted_cards([card for card in possible_cards if card.color == color])
-    col_cards.reverse()
-    all_col_cards_left = sorted_cards([card for card in leftover_cards if card.color == color])
-    all_col_cards_left.reverse()
-    majority = len(col_cards) >= len(all_col_cards_left)/2
-    standing = []
-    for card in col_cards:
-        stand_nr = len(standing)
-        if card == all_col_cards_left[stand_nr]:
-            standing.append(card)
-        else:
-            break
-    if len(standing) >= len(set(all_col_cards_left) - set(col_cards)):
-        return set(col_cards)
+    # walk down from the highest card of the color, as long as our highest card is the highest card left it is standing
+    col_cards = _as_cardset(possible_cards).color(color).mask
+    all_col_cards_left = _as_cardset(leftover_cards).color(color).mask
+    standing = 0
+    mine, left = col_cards, all_col_cards_left
+    while mine and mine.bit_length() == left.bit_length():
+        top = 1 << (mine.bit_length() - 1)
+        standing |= top
+        mine ^= top
+        left ^= top
+    if standing.bit_count() >= (all_col_cards_left & ~col_cards).bit_count():
+        return CardSet.from_mask(col_cards)
     else:
-        return set(standing)
+        return CardSet.from_mask(standing)
 
 
-def standing_cards(leftover_cards: set[Card], possible_cards: set[Card]) -> set[Card]:
-    standing = set()
+def standing_cards(leftover_cards: set[Card] | CardSet, possible_cards: set[Card] | CardSet) -> CardSet:
+    standing = 0
     for suite in Color:
-        standing |= standing_in_suite(leftover_cards, suite, possible_cards)
-    return standing
+        standing |= standing_in_suite(leftover_cards, suite, possible_cards).mask
+    return CardSet.from_mask(standing)
+
+# Catalog of card groups, built once at import. All entries are immutable and shared, the masks allow checking a
+# group against a hand with a single int operation, e.g. hand.mask & PAIR_MASKS[col] == PAIR_MASKS[col].
+def _pair(col: Color) -> frozenset[Card]:
+    return frozenset((Card(col, Value.Koenig), Card(col, Value.Ober)))
+
+
+def _without_pairs(groups) -> tuple[frozenset[Card], ...]:
+    return tuple(frozenset(group) for group in groups if not any(pair <= set(group) for pair in PAIRS.values()))
 
-def gruen_pair() -> set[Card]:
-    return {Card(Color.Gruen, Value.Koenig), Card(Color.Gruen, Value.Ober)}
 
+COLOR_CARDS: Mapping[Color, frozenset[Card]] = MappingProxyType(
+    {col: frozenset(card for card in CARDS if card.color == col) for col in COLORS})
+VALUE_CARDS: Mapping[Value, frozenset[Card]] = MappingProxyType(
+    {val: frozenset(card for card in CARDS if card.value == val) for val in VALUES})
+PAIRS: Mapping[Color, frozenset[Card]] = MappingProxyType({col: _pair(col) for col in COLORS})
+SMALL_PAIR_COLORS: tuple[Color, ...] = (Color.Gruen, Color.Eichel)
+BIG_PAIR_COLORS: tuple[Color, ...] = (Color.Schell, Color.Rot)
+SMALL_PAIR_CARDS: frozenset[Card] = PAIRS[Color.Gruen] | PAIRS[Color.Eichel]
+BIG_PAIR_CARDS: frozenset[Card] = PAIRS[Color.Schell] | PAIRS[Color.Rot]
+PAIR_CARDS: frozenset[Card] = SMALL_PAIR_CARDS | BIG_PAIR_CARDS
+ACE_CARDS: frozenset[Card] = VALUE_CARDS[Value.Ass]
+LOW_CARDS: frozenset[Card] = frozenset(card for card in CARDS if card.rank <= Card(Color.Gruen, Value.Unter).rank)
+# two halves of different colors out of the small or the big pairs, three halves without a complete pair
+SMALL_HALVES: tuple[frozenset[Card], ...] = _without_pairs(combinations(sorted(SMALL_PAIR_CARDS), 2))
+BIG_HALVES: tuple[frozenset[Card], ...] = _without_pairs(combinations(sorted(BIG_PAIR_CARDS), 2))
+THREE_HALVES: tuple[frozenset[Card], ...] = _without_pairs(combinations(sorted(PAIR_CARDS), 3))
 
-def eichel_pair() -> set[Card]:
-    return {Card(Color.Eichel, Value.Koenig), Card(Color.Eichel, Value.Ober)}
+PAIR_MASKS: Mapping[Color, int] = MappingProxyType({col: mask_of(pair) for col, pair in PAIRS.items()})
+COLOR_CARD_MASKS: Mapping[Color, int] = MappingProxyType({col: mask_of(cards) for col, cards in COLOR_CARDS.items()})
+VALUE_MASKS: Mapping[Value, int] = MappingProxyType({val: mask_of(cards) for val, cards in VALUE_CARDS.items()})
+LOW_MASK = mask_of(LOW_CARDS)
+SMALL_HALVES_MASKS: tuple[int, ...] = tuple(mask_of(group) for group in SMALL_HALVES)
+BIG_HALVES_MASKS: tuple[int, ...] = tuple(mask_of(group) for group in BIG_HALVES)
+THREE_HALVES_MASKS: tuple[int, ...] = tuple(mask_of(group) for group in THREE_HALVES)
+# mask of every group in the catalog
+GROUP_MASKS: Mapping[frozenset[Card], int] = MappingProxyType(
+    {group: mask_of(group) for group in (*COLOR_CARDS.values(), *VALUE_CARDS.values(), *PAIRS.values(),
+                                         SMALL_PAIR_CARDS, BIG_PAIR_CARDS, PAIR_CARDS, LOW_CARDS,
+                                         *SMALL_HALVES, *BIG_HALVES, *THREE_HALVES)})
+# SUBSET_POSITIONS[n, k] are all ways to choose k out of n positions, e.g. the 126 choices of 4 out of 9 hand cards
+SUBSET_POSITIONS: Mapping[tuple[int, int], tuple[tuple[int, ...], ...]] = MappingProxyType(
+    {(n, k): tuple(combinations(range(n), k)) for n in range(len(VALUES) + 1) for k in range(n + 1)})
 
 
-def schell_pair() -> set[Card]:
-    return {Card(Color.Schell, Value.Koenig), Card(Color.Schell, Value.Ober)}
+def gruen_pair() -> frozenset[Card]:
+    return PAIRS[Color.Gruen]
 
 
-def rot_pair() -> set[Card]:
-    return {Card(Color.Rot, Value.Koenig), Card(Color.Rot, Value.Ober)}
+def eichel_pair() -> frozenset[Card]:
+    return PAIRS[Color.Eichel]
 
 
-def small_pairs() -> list[set[Card]]:
-    return [gruen_pair(), eichel_pair()]
+def schell_pair() -> frozenset[Card]:
+    return PAIRS[Color.Schell]
 
 
-def big_pairs() -> list[set[Card]]:
-    return [schell_pair(), rot_pair()]
+def rot_pair() -> frozenset[Card]:
+    return PAIRS[Color.Rot]
 
 
-def pairs() -> list[set[Card]]:
-    return [gruen_pair(), eichel_pair(), schell_pair(), rot_pair()]
+def small_pairs() -> tuple[frozenset[Card], ...]:
+    return PAIRS[Color.Gruen], PAIRS[Color.Eichel]
 
 
-def small_pair_cards() -> set[Card]:
-    return gruen_pair() | eichel_pair()
+def big_pairs() -> tuple[frozenset[Card], ...]:
+    return PAIRS[Color.Schell], PAIRS[Color.Rot]
 
 
-def big_pair_cards() -> set[Card]:
-    return schell_pair() | rot_pair()
+def pairs() -> tuple[frozenset[Card], ...]:
+    return PAIRS[Color.Gruen], PAIRS[Color.Eichel], PAIRS[Color.Schell], PAIRS[Color.Rot]
 
 
-def pair_cards() -> set[Card]:
-    return small_pair_cards() | big_pair_cards()
+def pair_colors(cards, colors: tuple[Color, ...] = COLORS) -> list[Color]:
+    """Returns the colors (out of colors) of all complete pairs in the cards."""
+    mask = mask_of(cards)
+    return [col for col in colors if mask & PAIR_MASKS[col] == PAIR_MASKS[col]]
 
 
-def ace_cards() -> set[Card]:
-    return set([Card(col, Value.Ass) for col in Color])
+def small_pair_cards() -> frozenset[Card]:
+    return SMALL_PAIR_CARDS
+
+
+def big_pair_cards() -> frozenset[Card]:
+    return BIG_PAIR_CARDS
+
+
+def pair_cards() -> frozenset[Card]:
+    return PAIR_CARDS
+
+
+def ace_cards() -> frozenset[Card]:
+    return ACE_CARDS
+
 
 def generate_subsets(set_elements: set, subset_size: int) -> list[set]:
-    subsets = []
-    for subset in combinations(set_elements, subset_size):
-        subsets.append(set(subset))
-    return subsets
+    elements = tuple(set_elements)
+    if len(elements) > len(VALUES):
+        return [set(subset) for subset in combinations(elements, subset_size)]
+    return [{elements[pos] for pos in positions} for positions in SUBSET_POSITIONS[len(elements), subset_size]]
+
+
+def subset_masks(cards, subset_size: int) -> list[int]:
+    """Returns the masks of all subsets of the cards (at most 9) with the given size, in combination order."""
+    bits = [1 << card.id for card in iter_mask(mask_of(cards))]
+    return [sum(bits[pos] for pos in positions) for positions in SUBSET_POSITIONS[len(bits), subset_size]]
 
 
-def small_halves() -> list[set[Card]]:
-    return [subset for subset in generate_subsets(small_pair_cards(), 2) if subset not in [gruen_pair(), eichel_pair()]]
+def small_halves() -> tuple[frozenset[Card], ...]:
+    return SMALL_HALVES
 
 
-def big_halves() -> list[set[Card]]:
-    return [subset for subset in generate_subsets(big_pair_cards(), 2) if subset not in [schell_pair(), rot_pair()]]
+def big_halves() -> tuple[frozenset[Card], ...]:
+    return BIG_HALVES
 
 
-def three_halves() -> list[set[Card]]:
-    all_3_halves = generate_subsets(pair_cards(), 3)
-    return [subset for subset in all_3_halves if not any(p.issubset(subset) for p in pairs())]
+def three_halves() -> tuple[frozenset[Card], ...]:
+    return THREE_HALVES
 
 
 def is_probable(value: float) -> float:
@@ -272,7 +291,7 @@ def smallest_x(cards: set[Card], x: int) -> list[Card]:
     """
     returns the smallest x cards out of the given cards, order: g6 -> gA, e6 -> eA, s6 -> sA, r6 -> rA
     """
-    return sorted_cards(list(cards))[0:x]
+    return list(_as_cardset(cards))[0:x]
 
 def least_frequent_color(cards: set[Card]) -> Color:
     """
@@ -280,7 +299,6 @@ def least_frequent_color(cards: set[Card]) -> Color:
     If there are multiple colors with the same (minimal) frequency, a random one is returned.
     """
     colors = [color for color in Color]
-    frequencies = [0 for _ in colors]
-    for index, color in enumerate(colors):
-        frequencies[index] = len([card for card in cards if card.color == color])
+    cards = _as_cardset(cards)
+    frequencies = [cards.count(color) for color in colors]
     return colors[frequencies.index(min(frequencies))]
\ No newline at end of file
@@ -0,0 +1,345 @@
+"""
+A lockstep engine for a batch of MarjaPussi games. All games are held in numpy arrays and are stepped at once with one
+action index per game (see ActionSpace for the layout), so no Card, Action or Player objects are created.
+The rules are the same as in MarjaPussi, the engine only keeps the state that is needed to play.
+"""
+import numpy as np
+
+from marjapussi.action import PHASES
+from marjapussi.action_space import action_space, ActionSpace
+from marjapussi.card import CARDS, COLORS
+from marjapussi.cardset import COLOR_MASKS
+from marjapussi.deals import deals as draw_deals, deal_masks
+from marjapussi.gamerules import CompiledRules, compile_rules
+from marjapussi.trick import BEATS
+import marjapussi.utils as utils
+
+
+PROV, PASS, PBCK, PRMO, QUES, ANSW, ANSA, TRCK, DONE = range(len(PHASES))
+NO_TRUMP = len(COLORS)
+
+# offsets of the talks within the talk slots of the action space, the colored talks are followed by one slot per color
+TALK_YOURS, TALK_NMY, TALK_MY, TALK_OUR, TALK_OU, TALK_NO, TALK_WE, TALK_NWE = 0, 1, 2, 6, 10, 14, 18, 22
+
+_ONE = np.uint64(1)
+_CARD_BITS = np.arange(len(CARDS), dtype=np.uint64)
+# indexed by color index, the last entry (no trump) is empty
+_COLOR_MASKS = np.array(COLOR_MASKS + (0,), dtype=np.uint64)
+_PAIR_MASKS = np.array([utils.PAIR_MASKS[col] for col in COLORS], dtype=np.uint64)
+_BEATS = np.array(BEATS, dtype=np.uint64)
+_ACE_MASK = np.uint64(utils.ACE_MASK)
+_GREEN_MASK = np.uint64(utils.GREEN_MASK)
+
+
+def random_actions(legal: np.ndarray, rng: np.random.Generator) -> np.ndarray:
+    """Picks one legal action per row of the legal mask uniformly at random (0 for rows without legal actions)."""
+    return np.argmax(rng.random(legal.shape) * legal, axis=1)
+
+
+class VectorMarjaPussi:
+    """
+    Holds n games of MarjaPussi as arrays:
+    hands           (n, 4) uint64 card masks of the players
+    phase           (n,) index into PHASES
+    player_at_turn  (n,) number of the player at turn
+    trick_cards     (n, 4) ids of the cards in the current trick in the order they were played, trick_len are valid
+    trump           (n,) color index of the trump, NO_TRUMP if there is none
+    points          (n, 4) points made by the players
+    After reset, step takes one action index per game and returns the new legal mask, the rewards of the step and
+    which games are done. Games that are done ignore their action until the next reset.
+    """
+
+    def __init__(self, n: int, override_rules: dict | CompiledRules | None = None) -> None:
+        self.n = n
+        self.rules: CompiledRules = compile_rules(override_rules)
+        self.action_space: ActionSpace = action_space(self.rules.start_game_value, self.rules.max_game_value)
+        space = self.action_space
+        self._bids = np.array(space.bids, dtype=np.int32)
+
+        self.hands = np.zeros((n, 4), dtype=np.uint64)
+        self.phase = np.full(n, DONE, dtype=np.int8)
+        self.player_at_turn = np.zeros(n, dtype=np.int8)
+        self.playing_player = np.full(n, -1, dtype=np.int8)
+        self.game_value = np.zeros(n, dtype=np.int32)
+        self.still_prov = np.zeros((n, 4), dtype=bool)
+        self.asking = np.zeros((n, 4), dtype=np.int8)
+        self.passed = np.zeros(n, dtype=np.uint64)  # cards passed so far in the current passing phase
+        self.num_passed = np.zeros(n, dtype=np.int8)
+        self.trump = np.full(n, NO_TRUMP, dtype=np.int8)
+        self.all_trump = np.zeros((n, 4), dtype=bool)  # colors that have been trump
+        self.trump_calls = np.zeros((n, 4, 4), dtype=bool)  # colors the player got points for
+        self.pending_color = np.zeros(n, dtype=np.int8)  # color of the last question or answer, -1 for yours
+        self.trick_cards = np.zeros((n, 4), dtype=np.int8)
+        self.trick_len = np.zeros(n, dtype=np.int8)
+        self.high_card = np.zeros(n, dtype=np.int8)
+        self.high_card_idx = np.zeros(n, dtype=np.int8)
+        self.num_tricks = np.zeros(n, dtype=np.int8)  # finished tricks
+        self.tricks_won = np.zeros((n, 4), dtype=np.int8)
+        self.points = np.zeros((n, 4), dtype=np.int32)
+
+        self.legal = space.new_mask()[None].repeat(n, axis=0)
+        self.rewards = np.zeros((n, 4), dtype=np.float32)
+
+    def reset(self, deals: np.ndarray | None = None, rng: np.random.Generator | int | None = None) -> np.ndarray:
+        """
+        Starts all games with the given (n, 4, 9) deals, or with deals drawn from rng, and returns the legal mask.
+        """
+        if deals is None:
+            deals = draw_deals(self.n, rng)
+        if deals.shape != (self.n, 4, 9):
+            raise ValueError(f"Expected deals of shape {(self.n, 4, 9)}, got {deals.shape}.")
+        self.hands[:] = deal_masks(deals)
+        self.phase[:] = PHASES.index(self.rules.start_phase)
+        self.player_at_turn[:] = 0
+        self.playing_player[:] = -1
+        self.game_value[:] = self.rules.start_game_value
+        self.still_prov[:] = True
+        self.asking[:] = 0
+        self.passed[:] = 0
+        self.num_passed[:] = 0
+        self.trump[:] = NO_TRUMP
+        self.all_trump[:] = False
+        self.trump_calls[:] = False
+        self.pending_color[:] = 0
+        self.trick_cards[:] = 0
+        self.trick_len[:] = 0
+        self.high_card[:] = 0
+        self.high_card_idx[:] = 0
+        self.num_tricks[:] = 0
+        self.tricks_won[:] = 0
+        self.points[:] = 0
+        return self.legal_action_mask()
+
+    @property
+    def done(self) -> np.ndarray:
+        return self.phase == DONE
+
+    def party_points(self) -> np.ndarray:
+        """Returns the points of the parties (players 0 and 2, players 1 and 3) as (n, 2) array."""
+        return self.points[:, :2] + self.points[:, 2:]
+
+    def _legal_cards(self, rows: np.ndarray) -> np.ndarray:
+        """Returns the masks of the cards the player at turn may play into the trick, like utils.legal_mask."""
+        hand = self.hands[rows, self.player_at_turn[rows]]
+        first = self.num_tricks[rows] == 0
+        trump = self.trump[rows]
+        # the first card of the first trick has to be an ace, a green card or any card
+        aces, greens = hand & _ACE_MASK, hand & _GREEN_MASK
+        lead = np.where(first, np.where(aces != 0, aces, np.where(greens != 0, greens, hand)), hand)
+        # otherwise the base color, then trump, then any card, higher than the high card if possible
+        base = hand & _COLOR_MASKS[self.trick_cards[rows, 0] // 9]
+        allowed = np.where(base != 0, base, hand & _COLOR_MASKS[trump])
+        higher = allowed & _BEATS[trump, self.high_card[rows]]
+        follow = np.where(allowed == 0, hand, np.where(higher != 0, higher, allowed))
+        base_aces = base & _ACE_MASK
+        follow = np.where(first & (base_aces != 0), base_aces, follow)
+        return np.where(self.trick_len[rows] == 0, lead, follow)
+
+    def legal_action_mask(self) -> np.ndarray:
+        """Returns the (n, action space size) legal mask, the array is reused by the next call."""
+        space, legal, phase = self.action_space, self.legal, self.phase
+        legal[:] = False
+        cards = legal[:, :space.bid_offset]
+        bids = legal[:, space.bid_slice()]
+        talks = legal[:, space.talk_offset:]
+
+        rows = np.flatnonzero((phase == PROV) | (phase == PRMO))
+        if rows.size:
+            bids[rows] = self._bids[None, :] > self.game_value[rows, None]
+            bids[rows, 0] = True
+
+        rows = np.flatnonzero(phase == PASS)
+        if rows.size:
+            hand = self.hands[rows, (self.playing_player[rows] + 2) % 4] & ~self.passed[rows]
+            cards[rows] = (hand[:, None] >> _CARD_BITS) & _ONE
+
+        rows = np.flatnonzero(phase == PBCK)
+        if rows.size:
+            hand = self.hands[rows, self.playing_player[rows]] & ~self.passed[rows]
+            cards[rows] = (hand[:, None] >> _CARD_BITS) & _ONE
+
+        rows = np.flatnonzero((phase == TRCK) | (phase == QUES))
+        if rows.size:
+            cards[rows] = (self._legal_cards(rows)[:, None] >> _CARD_BITS) & _ONE
+
+        rows = np.flatnonzero(phase >= QUES)
+        if rows.size:
+            hand = self.hands[rows, self.player_at_turn[rows]]
+            pair_bits = hand[:, None] & _PAIR_MASKS
+            has_pair = pair_bits == _PAIR_MASKS
+            has_half = pair_bits != 0
+            callable_pairs = has_pair & ~self.all_trump[rows]
+            phase_rows = phase[rows]
+            color = self.pending_color[rows]
+            half_in_color = has_half[np.arange(rows.size), np.maximum(color, 0)]
+
+            ques = np.flatnonzero(phase_rows == QUES)
+            if ques.size:
+                asking = self.asking[rows[ques], self.player_at_turn[rows[ques]]]
+                talks[rows[ques], TALK_OUR:TALK_OUR + 4] = (asking <= 2)[:, None]
+                talks[rows[ques], TALK_YOURS] = asking <= 1
+                talks[rows[ques], TALK_MY:TALK_MY + 4] = callable_pairs[ques] & (asking == 0)[:, None]
+
+            answ = np.flatnonzero((phase_rows == ANSW) & (color < 0))
+            if answ.size:
+                talks[rows[answ], TALK_MY:TALK_MY + 4] = callable_pairs[answ]
+                talks[rows[answ], TALK_NMY] = ~callable_pairs[answ].any(axis=1)
+
+            answ = np.flatnonzero((phase_rows == ANSW) & (color >= 0))
+            if answ.size:
+                half = half_in_color[answ]
+                talks[rows[answ], np.where(half, TALK_OU, TALK_NO) + color[answ]] = True
+
+            ansa = np.flatnonzero(phase_rows == ANSA)
+            if ansa.size:
+                half = half_in_color[ansa]
+                talks[rows[ansa], np.where(half, TALK_WE, TALK_NWE) + color[ansa]] = True
+        return legal
+
+    def step(self, actions: np.ndarray) -> tuple[np.ndarray, np.ndarray, np.ndarray]:
+        """
+        Acts one action index per game and returns the legal mask, the rewards and the done flags afterwards.
+        The rewards are the game value for both players of the playing party if they won and its negative if they
+        lost, given in the step that finishes the game, all other rewards are 0.
+        """
+        actions = np.asarray(actions, dtype=np.int64)
+        active = np.flatnonzero(self.phase != DONE)
+        if not self.legal[active, actions[active]].all():
+            illegal = active[~self.legal[active, actions[active]]]
+            raise ValueError(f"Illegal actions in games {illegal.tolist()}.")
+        self.rewards[:] = 0
+        space = self.action_space
+        phase = self.phase.copy()
+        action = actions
+
+        rows = active[(phase[active] == PROV)]
+        if rows.size:
+            self._act_prov(rows, self._bids[action[rows] - space.bid_offset])
+        rows = active[(phase[active] == PASS) | (phase[active] == PBCK)]
+        if rows.size:
+            self._act_pass(rows, action[rows], back=phase[rows] == PBCK)
+        rows = active[(phase[active] == PRMO)]
+        if rows.size:
+            self.game_value[rows] = np.maximum(self.game_value[rows], self._bids[action[rows] - space.bid_offset])
+            self.phase[rows] = TRCK
+        rows = active[((phase[active] == TRCK) | (phase[active] == QUES)) & (action[active] < space.bid_offset)]
+        if rows.size:
+            self._act_trck(rows, action[rows])
+        rows = active[(phase[active] >= QUES) & (phase[active] != TRCK) & (action[active] >= space.talk_offset)]
+        if rows.size:
+            self._act_talk(rows, phase[rows], action[rows] - space.talk_offset)
+        return self.legal_action_mask(), self.rewards, self.done
+
+    def _act_prov(self, rows: np.ndarray, values: np.ndarray) -> None:
+        player = self.player_at_turn[rows]
+        raised = values > self.game_value[rows]
+        self.game_value[rows] = np.where(raised, values, self.game_value[rows])
+        self.still_prov[rows, player] &= raised
+        still_prov = self.still_prov[rows]
+        count = still_prov.sum(axis=1)
+        start = self.rules.start_game_value
+        at_start = self.game_value[rows] == start
+        go_on = (count > 1) | ((count == 1) & at_start)
+        # the next player that still provokes
+        order = (player[:, None] + np.arange(1, 5)) % 4
+        following = still_prov[np.arange(rows.size)[:, None], order]
+        self.player_at_turn[rows] = np.where(go_on, order[np.arange(rows.size), np.argmax(following, axis=1)], 0)
+        # no one took the game, the first player starts
+        self.phase[rows[~go_on & at_start]] = TRCK
+        taken = ~go_on & ~at_start
+        if taken.any():
+            taken_rows = rows[taken]
+            playing = np.argmax(still_prov[taken], axis=1).astype(np.int8)
+            self.playing_player[taken_rows] = playing
+            self.player_at_turn[taken_rows] = (playing + 2) % 4
+            self.phase[taken_rows] = PASS
+
+    def _act_pass(self, rows: np.ndarray, cards: np.ndarray, back: np.ndarray) -> None:
+        self.passed[rows] |= _ONE << cards.astype(np.uint64)
+        self.num_passed[rows] += 1
+        full = self.num_passed[rows] == 4
+        if not full.any():
+            return
+        rows, back = rows[full], back[full]
+        playing = self.playing_player[rows]
+        partner = (playing + 2) % 4
+        passed = self.passed[rows]
+        giver, taker = np.where(back, playing, partner), np.where(back, partner, playing)
+        self.hands[rows, giver] &= ~passed
+        self.hands[rows, taker] |= passed
+        self.passed[rows] = 0
+        self.num_passed[rows] = 0
+        self.player_at_turn[rows] = playing
+        self.phase[rows] = np.where(back, PRMO, PBCK)
+
+    def _act_trck(self, rows: np.ndarray, cards: np.ndarray) -> None:
+        cards = cards.astype(np.int8)
+        player = self.player_at_turn[rows]
+        self.hands[rows, player] &= ~(_ONE << cards.astype(np.uint64))
+        pos = self.trick_len[rows]
+        self.trick_cards[rows, pos] = cards
+        beats = (_BEATS[self.trump[rows], self.high_card[rows]] >> cards.astype(np.uint64)) & _ONE
+        new_high = (pos == 0) | (beats != 0)
+        self.high_card[rows] = np.where(new_high, cards, self.high_card[rows])
+        self.high_card_idx[rows] = np.where(new_high, pos, self.high_card_idx[rows])
+        self.trick_len[rows] = pos + 1
+        self.player_at_turn[rows] = (player + 1) % 4
+        self.phase[rows] = TRCK
+
+        full = pos == 3
+        if not full.any():
+            return
+        rows = rows[full]
+        # after four cards the player at turn started the trick
+        winner = (self.player_at_turn[rows] + self.high_card_idx[rows]) % 4
+        last = self.num_tricks[rows] == len(CARDS) // 4 - 1
+        self.points[rows, winner] += (self.rules.points_array[self.trick_cards[rows]].sum(axis=1)
+                                      + np.where(last, self.rules.last_trick_bonus, 0))
+        self.tricks_won[rows, winner] += 1
+        self.num_tricks[rows] += 1
+        self.trick_len[rows] = 0
+        self.player_at_turn[rows] = winner
+        self.phase[rows] = np.where(last, DONE, QUES)
+        if last.any():
+            self._eval_games(rows[last])
+
+    def _call_trump(self, rows: np.ndarray, player: np.ndarray, color: np.ndarray) -> None:
+        """The color becomes trump, the player gets its points if they haven't called it before."""
+        self.trump[rows] = color
+        self.all_trump[rows, color] = True
+        new_call = ~self.trump_calls[rows, player, color]
+        self.trump_calls[rows, player, color] = True
+        self.points[rows, player] += np.where(new_call, self.rules.pair_points_array[color], 0)
+
+    def _act_talk(self, rows: np.ndarray, phase: np.ndarray, talks: np.ndarray) -> None:
+        player = self.player_at_turn[rows]
+        partner = (player + 2) % 4
+        color = ((talks - TALK_MY) % 4).astype(np.int8)
+        kind = np.where(talks < TALK_MY, talks, TALK_MY + (talks - TALK_MY) // 4 * 4)
+
+        # own pair as question or as answer, the answering player gets the points
+        mine = kind == TALK_MY
+        if mine.any():
+            self._call_trump(rows[mine], player[mine], color[mine])
+        # the other half of the asked color, the asking player gets the points
+        we = kind == TALK_WE
+        if we.any():
+            self._call_trump(rows[we], player[we], color[we])
+
+        question = (kind == TALK_YOURS) | (kind == TALK_OUR)
+        self.asking[rows[question], player[question]] = np.where(kind[question] == TALK_YOURS, 1, 2)
+        self.pending_color[rows] = np.where(kind == TALK_YOURS, -1, color)
+        # questions and the half answer hand over to the partner, other answers hand back to the asking player
+        hand_over = question | (phase == ANSW)
+        self.player_at_turn[rows] = np.where(hand_over, partner, player)
+        self.phase[rows] = np.where(question, ANSW, np.where(kind == TALK_OU, ANSA, TRCK))
+
+    def _eval_games(self, rows: np.ndarray) -> None:
+        playing = self.playing_player[rows]
+        played = playing >= 0
+        rows, playing = rows[played], playing[played]
+        party_points = self.points[rows, playing] + self.points[rows, (playing + 2) % 4]
+        game_value = self.game_value[rows]
+        reward = np.where(party_points >= game_value, game_value, -game_value).astype(np.float32)
+        self.rewards[rows, playing] = reward
+        self.rewards[rows, (playing + 2) % 4] = reward
@@ -0,0 +1,39 @@
+import pickle
+
+import pytest
+
+from marjapussi.action import Action, Talk, TALKS
+from marjapussi.card import CARDS, Color
+from marjapussi.game import MarjaPussi
+
+
+def test_universe_is_interned():
+    assert Action(1, "TRCK", CARDS[3]) is Action(1, "TRCK", CARDS[3])
+    assert Talk("our", Color.Gruen) is TALKS[TALKS.index(Talk("our", Color.Gruen))]
+    action = Action(2, "ANSW", Talk("ou", Color.Rot))
+    assert Action.from_id(action.id) is action
+    assert pickle.loads(pickle.dumps(action)) is action
+
+
+def test_other_actions_are_not_interned():
+    size = len(Action._by_id)
+    bids = [Action(0, "PROV", 1000) for _ in range(3)]
+    assert len(Action._by_id) == size
+    assert bids[0] is not bids[1] and bids[0] == bids[1] and hash(bids[0]) == hash(bids[1])
+    assert bids[0].id == -1
+    assert len({*bids, Action(0, "PROV", 0)}) == 2
+
+
+def test_unknown_talks_are_rejected():
+    with pytest.raises(ValueError):
+        Talk("maybe", Color.Rot)
+    with pytest.raises(ValueError):
+        Talk("yours", Color.Rot)
+
+
+def test_bids_above_the_default_maximum():
+    game = MarjaPussi(["a", "b", "c", "d"], {"max_game_value": 500}, log=False, rng=0)
+    size = len(Action._by_id)
+    high = [action for action in game.legal_actions() if action.content == 500]
+    assert high and game.act_action(high[0])
+    assert len(Action._by_id) == size
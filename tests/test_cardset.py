@@ -0,0 +1,22 @@
+import random
+
+from marjapussi.card import CARDS
+from marjapussi.cardset import CardSet
+
+
+def test_equal_card_sets_hash_equal():
+    rng = random.Random(0)
+    for size in range(10):
+        cards = rng.sample(CARDS, size)
+        card_set, other = CardSet(cards), CardSet(reversed(cards))
+        assert card_set == other and hash(card_set) == hash(other)
+        assert {card_set: size}[other] == size
+        assert card_set == CardSet(set(cards))
+
+
+def test_unequal_to_other_types():
+    card_set = CardSet(CARDS[:3])
+    assert card_set != set(CARDS[:3])
+    assert card_set != frozenset(CARDS[:3])
+    assert card_set != list(CARDS[:3])
+    assert card_set != CardSet(CARDS[:2])
@@ -0,0 +1,88 @@
+import logging
+import random
+
+import pytest
+
+from marjapussi.action import Action
+from marjapussi.game import MarjaPussi
+from marjapussi.gamerules import compile_rules
+from marjapussi.match import Match
+from marjapussi.policy import RandomPolicy
+
+
+NAMES = ["a", "b", "c", "d"]
+
+
+def test_illegal_action_is_logged_without_subscribers(caplog):
+    game = MarjaPussi(NAMES, log=False, rng=1)
+    wrong_player = (game.player_at_turn.number + 1) % 4
+    with caplog.at_level(logging.WARNING, logger="single_game_logger"):
+        assert not game.act_action(Action(wrong_player, "PROV", 0))
+    assert [record.levelno for record in caplog.records] == [logging.WARNING]
+
+
+def test_changes_since_follows_the_game():
+    game = MarjaPussi(NAMES, log=False, rng=3)
+    hands = {player.name: {str(card) for card in player.cards} for player in game.players}
+    phase, points, version = game.phase, {}, game.version
+    rng = random.Random(3)
+    while game.phase != "DONE":
+        game.act_action(rng.choice(game.legal_actions()))
+        changes = game.changes_since(version)
+        assert not changes.get("full")
+        version = changes["version"]
+        for name, cards in changes.get("cards_removed", {}).items():
+            hands[name] -= set(cards)
+        for name, cards in changes.get("cards_added", {}).items():
+            hands[name] |= set(cards)
+        phase = changes.get("game_phase", phase)
+        points |= changes.get("points", {})
+        assert hands == {player.name: {str(card) for card in player.cards} for player in game.players}
+        assert phase == game.phase
+    assert points == {player.name: player.points_made for player in game.players if player.points_made}
+
+
+def test_changes_since_unasked_version_is_full():
+    game = MarjaPussi(NAMES, log=False, rng=4)
+    for _ in range(2):
+        game.act_action(game.legal_actions()[0])
+    assert game.changes_since(1)["full"]
+    assert not game.changes_since(2).get("full")
+
+
+@pytest.mark.parametrize("seed", range(20))
+def test_push_pop_restores_the_state(seed):
+    """Pushes runs of random actions from every point of a game, across tricks and phases, and pops them again."""
+    game = MarjaPussi(NAMES, log=False, rng=seed)
+    rng = random.Random(seed)
+    crossed_phases = crossed_tricks = 0
+    while game.phase != "DONE":
+        before, phases, tricks = game.to_bytes(), {game.phase}, len(game.tricks)
+        pushed = []
+        for _ in range(rng.randint(1, 12)):
+            if game.phase == "DONE":
+                break
+            action = rng.choice(game.legal_actions())
+            assert game.push(action)
+            pushed.append(action)
+            phases.add(game.phase)
+        crossed_phases += len(phases) > 1
+        crossed_tricks += len(game.tricks) != tricks
+        while pushed:
+            assert game.pop() is pushed.pop()
+        assert game.to_bytes() == before
+        game.act_action(rng.choice(game.legal_actions()))
+    assert crossed_phases and crossed_tricks
+    with pytest.raises(IndexError):
+        game.pop()
+
+
+def test_one_rules_object_for_games_states_and_matches():
+    rules = {"max_game_value": 140, "points": {"L": 50}, "total_rounds": 2}
+    game = MarjaPussi(NAMES, rules, log=False, rng=5)
+    assert game.rules is compile_rules(dict(rules)) is compile_rules(game.rules)
+    assert max(action.content for action in game.legal_actions()) == 140
+    match = Match([RandomPolicy() for _ in range(4)], override_rules=rules, rng=5)
+    match.play()
+    assert match.rules is game.rules and len(match.results) == 2
+    assert all(agent.state.rules is game.rules for agent in match.agents)
@@ -0,0 +1,204 @@
+import random
+
+import numpy as np
+import pytest
+
+from marjapussi.action import Talk
+from marjapussi.agent import Agent
+from marjapussi.card import CARDS, Card, Color, Value
+from marjapussi.cardset import CardSet
+from marjapussi.concept import Concept
+from marjapussi.game import MarjaPussi
+from marjapussi.gamestate import GameState
+from marjapussi.policy import RandomPolicy
+from marjapussi.utils import PAIR_MASKS
+
+
+NAMES = ["a", "b", "c", "d"]
+HALVES = [card.id for card in CARDS if card.value in (Value.Ober, Value.Koenig)]
+
+
+def _cards_of(mask: int) -> list[int]:
+    return [card for card in range(len(CARDS)) if mask >> card & 1]
+
+
+def _deals(unknown: list[int], possible: list[int], needs: list[int]):
+    """Yields every split of the unknown cards (as card masks per player) that fits possible and needs."""
+    hands = [0] * len(needs)
+
+    def deal(idx: int):
+        if idx == len(unknown):
+            if not any(needs):
+                yield list(hands)
+            return
+        bit = 1 << unknown[idx]
+        for num in range(len(needs)):
+            if possible[num] & bit and needs[num]:
+                hands[num] |= bit
+                needs[num] -= 1
+                yield from deal(idx + 1)
+                needs[num] += 1
+                hands[num] ^= bit
+
+    yield from deal(0)
+
+
+def _random_state(rng: random.Random) -> tuple[GameState, list[int]]:
+    """A state of player a after some cards were played, with random knowledge that fits a random true deal."""
+    per_player = rng.randint(1, 3)
+    pool = HALVES + rng.sample([card.id for card in CARDS if card.id not in HALVES], 8)
+    cards = rng.sample(pool, 4 * per_player)
+    hands = [sum(1 << card for card in cards[num::4]) for num in range(4)]
+    state = GameState("a", NAMES, [CARDS[card] for card in cards[0::4]], RandomPolicy)
+    left = sum(hands)
+    state.cards_left = CardSet.from_mask(left)
+    state.player_cards_left = [per_player] * 4
+    secure = [hands[0]] + [sum(1 << card for card in _cards_of(hand) if rng.random() < 0.2) for hand in hands[1:]]
+    unknown = left & ~sum(secure)
+    possible = [0] + [hand & ~sec | sum(1 << card for card in _cards_of(unknown) if rng.random() < 0.4)
+                      for hand, sec in zip(hands[1:], secure[1:])]
+    for _ in range(rng.randint(0, 3)):
+        num, color = rng.randint(1, 3), rng.choice(list(Color))
+        pair = PAIR_MASKS[color]
+        played = [card for card in _cards_of(pair) if not (left | sum(state.played_cards)) >> card & 1]
+        if played and rng.random() < 0.5:
+            # a half the player played after the answer
+            state.played_cards[num] |= 1 << rng.choice(played)
+        had = (hands[num] | state.played_cards[num]) & pair
+        options = ([True] if had else []) + ([False] if had != pair else [])
+        state.half_constraints.append((num, pair, 0, rng.choice(options)))
+    for num, name in enumerate(NAMES):
+        state.possible_cards[name] = CardSet.from_mask(possible[num])
+        state.secure_cards[name] = CardSet.from_mask(secure[num])
+    return state, hands
+
+
+def _fits_constraints(state: GameState, hands: list[int]) -> bool:
+    for num, pair, played_before, at_least_one in state.half_constraints:
+        had = (hands[num] | state.played_cards[num] & ~played_before) & pair
+        if not had if at_least_one else had == pair:
+            return False
+    return True
+
+
+def _consistent_deals(state: GameState) -> list[list[int]]:
+    possible = [state.possible_cards[name].mask for name in NAMES]
+    secure = [state.secure_cards[name].mask for name in NAMES]
+    unknown = _cards_of(state.cards_left.mask & ~sum(secure))
+    needs = [count - sec.bit_count() for count, sec in zip(state.player_cards_left, secure)]
+    deals = []
+    for split in _deals(unknown, possible, needs):
+        hands = [sec | cards for sec, cards in zip(secure, split)]
+        if _fits_constraints(state, hands):
+            deals.append(hands)
+    return sorted(deals)
+
+
+@pytest.mark.parametrize("seed", range(300))
+def test_set_logic_check_is_sound(seed):
+    """Nothing deduced may rule out a deal that fits everything known before."""
+    state, hands = _random_state(random.Random(seed))
+    before = _consistent_deals(state)
+    assert hands in before
+    # let the check look at every player and card
+    state._checked = ((0,) * 4, (0,) * 4)
+    state._set_logic_check()
+    for hands in before:
+        for num, name in enumerate(NAMES):
+            secure, possible = state.secure_cards[name].mask, state.possible_cards[name].mask
+            assert not secure & ~hands[num]
+            assert not hands[num] & ~(secure | possible)
+    assert _consistent_deals(state) == before
+
+
+def test_set_logic_check_deduces_single_holders_and_counts():
+    state, _ = _random_state(random.Random(0))
+    # card 1 is only possible for b, c needs one card and can only have card 2
+    state.cards_left = CardSet.from_mask(0b111)
+    state.player_cards_left = [1, 1, 1, 0]
+    masks = {"a": (0, 0b001), "b": (0b110, 0), "c": (0b100, 0), "d": (0, 0)}
+    for name, (possible, secure) in masks.items():
+        state.possible_cards[name] = CardSet.from_mask(possible)
+        state.secure_cards[name] = CardSet.from_mask(secure)
+    state.half_constraints.clear()
+    state._checked = ((0,) * 4, (0,) * 4)
+    state._set_logic_check()
+    assert state.secure_cards["b"].mask == 0b010
+    assert state.secure_cards["c"].mask == 0b100
+    assert not any(state.possible_cards[name].mask for name in NAMES)
+
+
+@pytest.mark.parametrize("talk", ["answer_question", "announce_ansage"])
+def test_half_answer_is_deduced_right_away(talk):
+    """b can't have the red ober, so saying they have a red half makes the red king secure for them."""
+    hand = [card for card in CARDS if card.color != Color.Rot][:9]
+    state = GameState("a", NAMES, hand, RandomPolicy)
+    red_ober, red_king = Card(Color.Rot, Value.Ober), Card(Color.Rot, Value.Koenig)
+    state.remove_possibles("b", [red_ober])
+    state._set_logic_check()
+    pronoun = "ou" if talk == "answer_question" else "we"
+    getattr(state, talk)(Talk(pronoun, Color.Rot), "b")
+    assert state.secure_cards["b"].mask == 1 << red_king.id
+    assert not any(state.possible_cards[name].mask >> red_king.id & 1 for name in NAMES)
+
+
+@pytest.mark.parametrize("seed", range(20))
+def test_knowledge_stays_sound_in_played_games(seed):
+    """The true hands always fit what every player knows, with follow-suit voids and answers about halves."""
+    game = MarjaPussi(NAMES, log=False, rng=seed)
+    agents = [Agent(player.name, NAMES, RandomPolicy(), player.cards, RandomPolicy) for player in game.players]
+    rng = random.Random(seed)
+    while game.phase != "DONE":
+        action = rng.choice(game.legal_actions())
+        game.act_action(action)
+        for agent in agents:
+            agent.observe_action(action)
+        if game.phase in ("PASS", "PBCK"):
+            # the passed cards only change hands when all four are chosen
+            continue
+        for agent in agents:
+            for player in game.players:
+                secure = agent.state.secure_cards[player.name].mask
+                possible = agent.state.possible_cards[player.name].mask
+                assert not secure & ~player.cards.mask
+                assert not player.cards.mask & ~(secure | possible)
+
+
+def _knowledge_of(state: GameState) -> tuple:
+    concepts = state.concepts
+    return ([state.possible_cards[name].mask for name in NAMES], [state.secure_cards[name].mask for name in NAMES],
+            list(state.half_constraints), list(state.played_cards), list(state.player_cards_left),
+            state.cards_left.mask, list(state.current_trick.cards), dict(concepts.dict_by_name),
+            dict(concepts.count_by_name),
+            {prop: {value: set(found) for value, found in by_value.items()}
+             for prop, by_value in concepts.dict_by_properties.items()})
+
+
+@pytest.mark.parametrize("seed", range(10))
+def test_fork_leaves_the_parent_unchanged(seed):
+    game = MarjaPussi(NAMES, log=False, rng=seed)
+    agent = Agent("a", NAMES, RandomPolicy(), game.players[0].cards, RandomPolicy)
+    rng = random.Random(seed)
+    while game.phase != "DONE" and not (game.phase == "TRCK" and rng.random() < 0.1):
+        action = rng.choice(game.legal_actions())
+        game.act_action(action)
+        agent.observe_action(action)
+    parent = agent.state
+    known, knowledge = _knowledge_of(parent), parent.knowledge.copy()
+
+    child = parent.fork()
+    if game.phase == "TRCK":
+        action = rng.choice(game.legal_actions())
+        child.play_card(action.content, action.player_number)
+    child.answer_question(Talk("ou", Color.Rot), "b")
+    child.answer_question(Talk("nmy", None), "c")
+    child.remove_possibles("d", parent.possible_cards["d"])
+    child._set_logic_check()
+    child.concepts.add(Concept("b_has_r_half", {"color": Color.Rot, "player": "b", "info_type": "half"}))
+    for name in list(parent.concepts.dict_by_name):
+        child.concepts.remove(name)
+    child.card_probabilities()
+
+    assert _knowledge_of(parent) == known
+    assert np.array_equal(parent.knowledge, knowledge, equal_nan=True)
+    assert _knowledge_of(child) != known
@@ -0,0 +1,97 @@
+import asyncio
+import threading
+import time
+
+import numpy as np
+import pytest
+
+from marjapussi.host import TableHost, LocalTransport
+from marjapussi.policy import Policy, RandomPolicy
+
+
+NAMES = ["a", "b", "c", "d"]
+
+
+class FailingPolicy(Policy):
+    def select_action(self, state, legal_actions):
+        raise RuntimeError("broken bot")
+
+
+class SlowPolicy(Policy):
+    """Decides too late and records if it is observed while it is still deciding."""
+
+    def __init__(self, delay: float) -> None:
+        super().__init__()
+        self.delay = delay
+        self.deciding = threading.Event()
+        self.overlaps = 0
+
+    def select_action(self, state, legal_actions):
+        self.deciding.set()
+        time.sleep(self.delay)
+        self.deciding.clear()
+        return legal_actions[-1]
+
+    def observe_action(self, state, action):
+        if self.deciding.is_set():
+            self.overlaps += 1
+
+
+async def _play_human(host: TableHost, transport: LocalTransport, table_id: str, seat: int) -> None:
+    """Plays the seat with the first legal index, as numpy integer like legal_action_mask gives it."""
+    table = host.tables[table_id]
+    while table.game.phase != "DONE":
+        message = await transport.receive(table_id, seat, timeout=5)
+        if "legal" in message:
+            index = np.flatnonzero(table.game.legal_action_mask())[0]
+            assert await host.submit(table_id, seat, index)
+
+
+def test_numpy_index_and_failing_bot():
+    async def main():
+        transport = LocalTransport()
+        host = TableHost(transport, bot_workers=2)
+        await host.open_table("t", NAMES, bots={1: FailingPolicy(), 2: RandomPolicy(), 3: RandomPolicy()}, rng=1)
+        await asyncio.wait_for(_play_human(host, transport, "t", 0), 30)
+        assert host.tables["t"].game.phase == "DONE"
+        await host.close()
+
+    asyncio.run(main())
+
+
+def test_bad_input_keeps_table_alive():
+    async def main():
+        transport = LocalTransport()
+        host = TableHost(transport)
+        await host.open_table("t", NAMES, bots={1: RandomPolicy(), 2: RandomPolicy(), 3: RandomPolicy()}, rng=2)
+        with pytest.raises(TypeError):
+            await asyncio.wait_for(host.submit("t", 0, "not an action"), 5)
+        assert not await asyncio.wait_for(host.submit("t", 0, -1), 5)
+        await asyncio.wait_for(_play_human(host, transport, "t", 0), 30)
+        await host.close()
+
+    asyncio.run(main())
+
+
+def test_timed_out_bot_is_not_waited_for_nor_observed_while_deciding():
+    async def main():
+        transport = LocalTransport()
+        slow = SlowPolicy(0.2)
+        host = TableHost(transport, bot_workers=2, bot_timeout=0.01)
+        table = await host.open_table("t", NAMES, bots={1: slow, 2: RandomPolicy(), 3: RandomPolicy()}, rng=3)
+        turns_while_deciding = 0
+        while table.game.phase != "DONE":
+            message = await transport.receive("t", 0, timeout=5)
+            if "legal" in message:
+                turns_while_deciding += slow.deciding.is_set()
+                index = np.flatnonzero(table.game.legal_action_mask())[0]
+                assert await asyncio.wait_for(host.submit("t", 0, index), 5)
+        # the table went on while the late decision was still running
+        assert turns_while_deciding
+        assert slow.overlaps == 0
+        while table.behind:
+            await asyncio.sleep(0.05)
+        assert table.bots[1].state.actions == table.game.all_actions
+        await host.close()
+
+    asyncio.run(main())
@@ -0,0 +1,105 @@
+import random
+
+import numpy as np
+import pytest
+
+from marjapussi.probability import CardDistribution
+
+
+def _cards_of(mask: int) -> list[int]:
+    return [card for card in range(36) if mask >> card & 1]
+
+
+def _random_knowledge(rng: random.Random) -> tuple[list[int], list[int], list[int]]:
+    """Possible and secure masks and card counts of four players that fit a random deal of a few cards each."""
+    counts = [rng.randint(0, 3) for _ in range(4)]
+    cards = rng.sample(range(36), sum(counts))
+    hands, start = [], 0
+    for count in counts:
+        hands.append(sum(1 << card for card in cards[start:start + count]))
+        start += count
+    secure = [sum(1 << card for card in _cards_of(hand) if rng.random() < 0.2) for hand in hands]
+    unknown = sum(hands) & ~sum(secure)
+    possible = [hand & ~sec | sum(1 << card for card in _cards_of(unknown) if rng.random() < 0.7)
+                for hand, sec in zip(hands, secure)]
+    return possible, secure, counts
+
+
+def _or(masks: list[int]) -> int:
+    union = 0
+    for mask in masks:
+        union |= mask
+    return union
+
+
+def _deals(possible: list[int], secure: list[int], counts: list[int]) -> list[list[int]]:
+    """All deals of the unknown cards as card masks of the players, secure cards included."""
+    unknown = _cards_of(_or(possible))
+    needs = [count - sec.bit_count() for count, sec in zip(counts, secure)]
+    deals, hands = [], list(secure)
+
+    def deal(idx: int) -> None:
+        if idx == len(unknown):
+            if not any(needs):
+                deals.append(list(hands))
+            return
+        bit = 1 << unknown[idx]
+        for num in range(4):
+            if possible[num] & bit and needs[num] > 0:
+                hands[num] |= bit
+                needs[num] -= 1
+                deal(idx + 1)
+                needs[num] += 1
+                hands[num] ^= bit
+
+    deal(0)
+    return deals
+
+
+@pytest.mark.parametrize("seed", range(200))
+def test_counts_and_probabilities_are_exact(seed):
+    rng = random.Random(seed)
+    possible, secure, counts = _random_knowledge(rng)
+    deals = _deals(possible, secure, counts)
+    distribution = CardDistribution(possible, secure, counts)
+    assert distribution.total == len(deals) > 0
+
+    expected = np.zeros((4, 36))
+    for hands in deals:
+        for num, hand in enumerate(hands):
+            expected[num, _cards_of(hand)] += 1
+    assert np.allclose(distribution.marginals(), expected / len(deals))
+
+    pairs = [rng.sample(range(36), 2) for _ in range(3)]
+    masks = [sum(1 << card for card in pair) for pair in pairs]
+    for num in range(4):
+        for mask in masks:
+            has_all = sum(hands[num] & mask == mask for hands in deals) / len(deals)
+            has_any = sum(bool(hands[num] & mask) for hands in deals) / len(deals)
+            assert distribution.probability(num, mask) == pytest.approx(has_all)
+            assert distribution.probability_any(num, mask) == pytest.approx(has_any)
+        has_one_set = sum(any(hands[num] & mask == mask for mask in masks) for hands in deals) / len(deals)
+        assert distribution.probability_any_set(num, masks) == pytest.approx(has_one_set)
+
+
+def test_inconsistent_knowledge_is_rejected():
+    # the only possible card of player 0 can't fill their two cards
+    distribution = CardDistribution([0b1, 0, 0, 0], [0, 0, 0, 0], [2, 0, 0, 0])
+    assert distribution.total == 0
+    with pytest.raises(ValueError):
+        distribution.marginals()
+
+
+@pytest.mark.parametrize("seed", range(5))
+def test_samples_are_consistent_and_uniform(seed):
+    rng = random.Random(seed)
+    possible, secure, counts = _random_knowledge(rng)
+    while len(_deals(possible, secure, counts)) < 3:
+        possible, secure, counts = _random_knowledge(rng)
+    deals = _deals(possible, secure, counts)
+    samples = CardDistribution(possible, secure, counts).sample(20000, seed)
+    assert samples.shape == (20000, 4)
+    frequency = {tuple(deal): 0 for deal in deals}
+    for row in samples.tolist():
+        frequency[tuple(row)] += 1  # a deal that doesn't fit raises KeyError
+    assert max(abs(count / len(samples) - 1 / len(deals)) for count in frequency.values()) < 0.02
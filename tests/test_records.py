@@ -0,0 +1,82 @@
+import os
+import random
+
+import numpy as np
+import pytest
+
+from marjapussi.game import MarjaPussi
+from marjapussi.records import RecordReader, RecordWriter, index_path
+
+
+NAMES = ["0", "1", "2", "3"]
+
+
+def _play(seed: int) -> MarjaPussi:
+    game = MarjaPussi(NAMES, log=False, rng=seed)
+    rng = random.Random(seed)
+    while game.phase != "DONE":
+        game.act_action(rng.choice(game.legal_actions()))
+    return game
+
+
+def _write(path, seeds) -> list[MarjaPussi]:
+    games = [_play(seed) for seed in seeds]
+    with RecordWriter(str(path)) as writer:
+        for game in games:
+            writer.write_game(game)
+    return games
+
+
+def test_write_read_replay(tmp_path):
+    path = tmp_path / "games.mprc"
+    games = _write(path, range(10))
+    with RecordReader(str(path)) as reader:
+        assert len(reader) == len(games)
+        records = list(reader)
+        for k, game in enumerate(games):
+            assert records[k].actions == reader[k].actions == [game.encode_action(a) for a in game.all_actions]
+            assert np.array_equal(records[k].deal, reader[k].deal)
+            assert reader.replay(k).to_bytes() == game.to_bytes()
+        partial = reader.replay(3, 5)
+        assert partial.all_actions == games[3].all_actions[:5]
+
+
+def test_missing_index_is_rebuilt_before_appending(tmp_path):
+    path = tmp_path / "games.mprc"
+    games = _write(path, range(4))
+    os.remove(index_path(str(path)))
+    with RecordReader(str(path)) as reader:
+        assert len(reader) == 4
+    games += _write(path, range(4, 7))
+    with RecordReader(str(path)) as reader:
+        assert len(np.fromfile(index_path(str(path)), dtype="<u8")) == len(games)
+        for k, game in enumerate(games):
+            assert reader.replay(k).to_bytes() == game.to_bytes()
+
+
+def test_truncated_index_is_not_used(tmp_path):
+    path = tmp_path / "games.mprc"
+    games = _write(path, range(5))
+    offsets = np.fromfile(index_path(str(path)), dtype="<u8")
+    offsets[:3].tofile(index_path(str(path)))
+    with RecordReader(str(path)) as reader:
+        assert np.array_equal(reader.offsets, offsets)
+    games += _write(path, range(5, 6))
+    with RecordReader(str(path)) as reader:
+        assert [reader.replay(k).to_bytes() for k in range(len(reader))] == [game.to_bytes() for game in games]
+
+
+def test_other_game_values_are_rejected(tmp_path):
+    path = tmp_path / "games.mprc"
+    _write(path, range(1))
+    with pytest.raises(ValueError):
+        RecordWriter(str(path), max_game_value=140)
+
+
+def test_new_segment_drops_old_index(tmp_path):
+    path = tmp_path / "games.mprc"
+    _write(path, range(3))
+    os.remove(path)
+    games = _write(path, range(3, 5))
+    with RecordReader(str(path)) as reader:
+        assert len(np.fromfile(index_path(str(path)), dtype="<u8")) == len(reader) == len(games)
@@ -0,0 +1,53 @@
+import random
+
+import pytest
+
+from marjapussi.game import MarjaPussi
+
+
+NAMES = ["a", "b", "c", "d"]
+
+
+def _state(game: MarjaPussi) -> tuple:
+    return (game.phase, game.player_at_turn.number, game.game_value, game.trump,
+            tuple(player.cards.mask for player in game.players),
+            tuple(player.points_made for player in game.players),
+            tuple(tuple(trick.cards) for trick in game.tricks), game.legal_actions())
+
+
+@pytest.mark.parametrize("seed", range(20))
+def test_round_trip_at_every_step(seed):
+    game = MarjaPussi(NAMES, log=False, rng=seed)
+    rng = random.Random(seed)
+    size = len(game.to_bytes())
+    while True:
+        data = game.to_bytes()
+        assert len(data) == size
+        restored = MarjaPussi.from_bytes(data, NAMES)
+        assert _state(restored) == _state(game)
+        assert restored.to_bytes() == data
+        if game.phase == "DONE":
+            break
+        game.act_action(rng.choice(game.legal_actions()))
+
+
+@pytest.mark.parametrize("seed", range(5))
+def test_restored_game_plays_on_the_same(seed):
+    rng = random.Random(seed)
+    game = MarjaPussi(NAMES, log=False, rng=seed)
+    for _ in range(rng.randrange(1, 40)):
+        if game.phase == "DONE":
+            break
+        game.act_action(rng.choice(game.legal_actions()))
+    restored = MarjaPussi.from_bytes(game.to_bytes(), NAMES)
+    while game.phase != "DONE":
+        action = rng.choice(game.legal_actions())
+        assert game.act_action(action) and restored.act_action(action)
+    assert _state(restored) == _state(game)
+
+
+def test_unknown_version_is_rejected():
+    data = bytearray(MarjaPussi(NAMES, log=False, rng=0).to_bytes())
+    data[0] ^= 0xFF
+    with pytest.raises(ValueError):
+        MarjaPussi.from_bytes(bytes(data), NAMES)
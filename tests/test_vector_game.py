@@ -0,0 +1,50 @@
+import numpy as np
+import pytest
+
+from marjapussi.deals import deals
+from marjapussi.game import MarjaPussi
+from marjapussi.vector_game import VectorMarjaPussi, PHASES, random_actions
+
+
+@pytest.mark.parametrize("rules", [{}, {"max_game_value": 140}])
+def test_parity_with_object_engine(rules):
+    """Plays the same seeded random games on both engines and compares them at every step."""
+    n = 100
+    rng = np.random.default_rng(7)
+    dealt = deals(n, 1)
+    vec = VectorMarjaPussi(n, rules)
+    legal = vec.reset(dealt)
+    games = [MarjaPussi(["a", "b", "c", "d"], rules, log=False, deal=dealt[i]) for i in range(n)]
+    while True:
+        for i, game in enumerate(games):
+            assert PHASES[vec.phase[i]] == game.phase
+            if game.phase == "DONE":
+                continue
+            assert (game.legal_action_mask() == legal[i]).all()
+            assert vec.player_at_turn[i] == game.player_at_turn.number
+            assert [int(hand) for hand in vec.hands[i]] == [player.cards.mask for player in game.players]
+            assert list(vec.points[i]) == [player.points_made for player in game.players]
+            assert vec.game_value[i] == game.game_value
+        if vec.done.all():
+            break
+        actions = random_actions(legal, rng)
+        for i, game in enumerate(games):
+            if game.phase != "DONE":
+                assert game.act_action(game.decode_action(int(actions[i])))
+        legal, rewards, _ = vec.step(actions)
+        for i in np.flatnonzero(rewards.any(axis=1)):
+            playing = games[i].playing_player
+            made = playing.points_made + playing.partner.points_made
+            value = games[i].game_value
+            assert rewards[i, playing.number] == (value if made >= value else -value)
+    for i, game in enumerate(games):
+        assert list(vec.points[i]) == [player.points_made for player in game.players]
+        assert list(vec.tricks_won[i]) == [len(player.tricks) for player in game.players]
+
+
+def test_illegal_action_is_rejected():
+    vec = VectorMarjaPussi(2)
+    legal = vec.reset(rng=0)
+    actions = np.argmin(legal, axis=1)  # the first illegal action of every game
+    with pytest.raises(ValueError):
+        vec.step(actions)